@@ -195,6 +195,22 @@ class RankingAdmin(admin.ModelAdmin):
     ordering = ("tournament", "rank")
 
 
+@admin.register(models.TournamentRanking)
+class TournamentRankingAdmin(admin.ModelAdmin):
+    list_display = ("team", "tournament", "group", "position", "points", "matches_played")
+    list_filter = ("tournament",)
+    list_select_related = ("team__team", "tournament")
+    ordering = ("tournament", "group", "position")
+
+
+@admin.register(models.StandingsSnapshot)
+class StandingsSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("team", "tournament", "group", "position", "points", "goal_difference", "form")
+    list_filter = ("tournament",)
+    list_select_related = ("team__team", "tournament")
+    ordering = ("tournament", "group", "position")
+
+
 @admin.register(models.Transfer)
 class TransferAdmin(admin.ModelAdmin):
     list_display = ("player", "from_team", "to_team", "fee", "transfer_date")
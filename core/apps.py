@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        from django.conf import settings
+
+        from . import signals  # noqa: F401
+
+        if getattr(settings, 'LOG_QUEUE', False):
+            from .logger import enable_queue_logging
+            enable_queue_logging(settings.LOGGING.get('loggers', {}))
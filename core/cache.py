@@ -0,0 +1,139 @@
+"""
+Cache delle risposte delle API in sola lettura.
+
+Ogni risposta in cache dipende da uno o più *scope* (un modello, un torneo, la
+classifica di un torneo), ciascuno con un numero di versione salvato nella
+cache di Django. La chiave della risposta contiene le versioni correnti dei
+suoi scope: quando un segnale (o un servizio che scrive in blocco) incrementa
+la versione di uno scope, tutte le risposte che ne dipendono smettono di essere
+trovate senza doverle cercare ed eliminare una per una.
+
+La stessa chiave fa da ETag: se il client invia ``If-None-Match`` con il valore
+corrente si risponde 304 senza interrogare il database né serializzare nulla.
+Funziona con la cache locale in memoria e con Redis (``REDIS_URL``).
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+from rest_framework import status
+from rest_framework.response import Response
+
+VERSION_KEY = "api_version:{}"
+RESPONSE_KEY = "api_response:{}"
+RESPONSE_TIMEOUT = 60 * 15
+
+
+def model_scope(model):
+    """Scope che cambia a ogni modifica di un oggetto del modello"""
+    return f"model:{model._meta.label_lower}"
+
+
+def tournament_scope(tournament_id):
+    """Scope del dettaglio di un torneo"""
+    return f"tournament:{tournament_id}"
+
+
+def standings_scope(tournament_id):
+    """Scope della classifica di un torneo (risultati e righe di classifica)"""
+    return f"standings:{tournament_id}"
+
+
+def _initial_version():
+    # Se una versione viene rimossa dalla cache riparte da un valore mai usato prima
+    return time.time_ns()
+
+
+def get_versions(scopes):
+    """Versioni correnti degli scope, inizializzando quelle mancanti"""
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), None)
+            versions[key] = cache.get(key)
+    return tuple(versions[key] for key in keys)
+
+
+def bump_versions(*scopes):
+    """
+    Incrementa la versione degli scope, invalidando le risposte che ne dipendono.
+
+    L'incremento avviene dopo il commit della transazione in corso (subito, fuori
+    da una transazione): una richiesta concorrente che legge le righe non ancora
+    confermate non può salvarle in cache sotto la nuova versione.
+    """
+    transaction.on_commit(lambda: _bump(scopes))
+
+
+def _bump(scopes):
+    for scope in scopes:
+        key = VERSION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
+
+
+def invalidate_tournaments(tournament_ids, standings=True, detail=False):
+    """Invalida classifica e/o dettaglio dei tornei indicati"""
+    scopes = []
+    for tournament_id in set(tournament_ids):
+        if standings:
+            scopes.append(standings_scope(tournament_id))
+        if detail:
+            scopes.append(tournament_scope(tournament_id))
+    bump_versions(*scopes)
+
+
+def _etag_matches(request, etag):
+    header = request.headers.get('If-None-Match', '')
+    candidates = {value.strip().removeprefix('W/') for value in header.split(',')}
+    return etag in candidates or '*' in candidates
+
+
+class CachedResponseMixin:
+    """
+    Mixin per i viewset: mette in cache ``list`` e ``retrieve`` e gestisce l'ETag.
+
+    Le risposte dipendono dallo scope del modello del viewset e da quelli dei
+    modelli in ``cache_models`` (i modelli annidati nel serializer). I viewset
+    possono restringere gli scope ridefinendo ``get_cache_scopes``.
+    """
+    cache_models = ()
+    cache_timeout = RESPONSE_TIMEOUT
+
+    def get_cache_scopes(self):
+        return [model_scope(self.queryset.model)] + [model_scope(model) for model in self.cache_models]
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        """Restituisce la risposta in cache oppure la calcola con ``handler`` e la salva"""
+        versions = get_versions(self.get_cache_scopes())
+        fingerprint = f"{self.__class__.__name__}:{request.build_absolute_uri()}:{request.accepted_media_type}:{versions}"
+        key = hashlib.md5(fingerprint.encode()).hexdigest()
+        etag = f'"{key}"'
+
+        if _etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            data = cache.get(RESPONSE_KEY.format(key))
+            if data is None:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cache.set(RESPONSE_KEY.format(key), response.data, self.cache_timeout)
+            else:
+                response = Response(data)
+
+        response['ETag'] = etag
+        # Il client può riusare la copia locale solo dopo averla riconvalidata con l'ETag
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
@@ -1,7 +1,4 @@
-import math
-import random
 from datetime import timedelta
-from itertools import combinations
 from typing import List, Dict, Any, Optional, Tuple, Union
 
 from django.db import transaction
@@ -11,8 +8,12 @@ from core.logger import get_logger
 from core.models import (Match, Round, Season, Team, SeasonTeam, Tournament,
                          TournamentQualificationRule, TournamentRule,
                          TournamentRanking, TournamentStructure)
+from core.services.bracket import create_knockout, round_label
+from core.services.scheduling import kickoff_times, round_robin_rounds
 from core.services.standings import get_tournament_standings
 
+logger = get_logger()
+
 
 class TournamentFactory:
     """
@@ -20,6 +21,9 @@ class TournamentFactory:
     Gestisce la creazione della struttura del torneo, delle giornate/turni, e delle partite.
     """
 
+    # Fasi di ``create`` notificate a ``progress_callback``
+    PROGRESS_STEPS = 5
+
     def __init__(
         self,
         structure: TournamentStructure,
@@ -32,9 +36,11 @@ class TournamentFactory:
         qualification_rules: Dict = None,
         tournament_direct_qualification_rule=None,
         tournament_playoff_qualification_rule=None,
-        other_tournament=None
+        other_tournament=None,
+        seed=None,
+        progress_callback=None
     ):
-        self.logger = get_logger()
+        self.logger = logger
         # Aggiungiamo il metodo di validazione input
         self._validate_inputs(structure, season, name, teams, tournament_direct_qualification_rule, tournament_playoff_qualification_rule)
 
@@ -46,13 +52,16 @@ class TournamentFactory:
         self.parent_tournament = parent_tournament
         self.start_date = start_date
         self.qualification_rules = qualification_rules or {}
+        self.seed = seed  # seme per rendere riproducibili calendario e sorteggi
+        # Funzione (passo, totale, messaggio) chiamata a ogni fase della creazione
+        self.progress_callback = progress_callback
 
         # Parametri per retrocompatibilità
         self.tournament_direct_qualification_rule = tournament_direct_qualification_rule
         self.tournament_playoff_qualification_rule = tournament_playoff_qualification_rule
         self.other_tournament = other_tournament
 
-        self.logger.info(f"Inizializzato TournamentFactory per '{self.name}' ({self.structure}) con {len(self.teams)} squadre.")
+        self.logger.info("Inizializzato TournamentFactory per '%s' (%s) con %d squadre.", self.name, self.structure, len(self.teams))
 
     def _validate_inputs(self, structure, season, name, teams, tournament_direct_qualification_rule, tournament_playoff_qualification_rule):
         """Validazione degli input per la creazione di un torneo"""
@@ -69,7 +78,7 @@ class TournamentFactory:
             raise ValueError("Devi fornire un nome torneo")
 
         if Tournament.objects.filter(name=name, season=season).exists():
-            self.logger.error(f"Torneo '{name}' già esistente per la stagione {season.year}")
+            self.logger.error("Torneo '%s' già esistente per la stagione %s", name, season.year)
             raise ValueError(f"Torneo '{name}' già esistente per la stagione {season.year}")
 
         if not teams or len(teams) < 2:
@@ -106,42 +115,73 @@ class TournamentFactory:
         )
 
         # Associare le squadre al torneo tramite SeasonTeam
-        season_teams = []
-        for team in self.teams:
-            # Gestione sia per oggetti Team che per oggetti SeasonTeam
-            if hasattr(team, 'team'):  # È già un SeasonTeam
-                season_team = team
-            else:  # È un Team
-                season_team = SeasonTeam.objects.get_or_create(team=team, season=self.season)[0]
-            season_teams.append(season_team)
-
+        season_teams = self._resolve_season_teams()
         tournament.teams.set(season_teams)
         self.teams = season_teams  # 🔁 così i metodi interni usano SeasonTeam
-        self.logger.info(f"Torneo '{self.name}' creato con {len(self.teams)} squadre.")
+        self.logger.info("Torneo '%s' creato con %d squadre.", self.name, len(self.teams))
+        self._report_progress(1, "Torneo creato")
 
         # Creare le classifiche iniziali per ogni squadra
         self._initialize_rankings(tournament)
+        self._report_progress(2, "Classifiche inizializzate")
 
         # Creare la struttura del torneo in base al tipo
         if self.structure.is_cup:
             self._generate_knockout(tournament)
         else:
             self._generate_league(tournament)
+        self._report_progress(3, "Calendario generato")
 
         # Gestire le regole di qualificazione e promozione/retrocessione
         self._setup_qualification_rules(tournament)
+        self._report_progress(4, "Regole di qualificazione e playoff configurati")
 
         # Aggiornare lo stato del torneo a pronto
         tournament.status = 'active'
         tournament.save(update_fields=['status'])
 
-        self.logger.info(f"Torneo '{tournament.name}' completamente configurato e pronto.")
+        self.logger.info("Torneo '%s' completamente configurato e pronto.", tournament.name)
+        self._report_progress(5, "Torneo pronto")
         return tournament
 
+    def _report_progress(self, step, message):
+        """Notifica l'avanzamento della creazione, se è stata fornita una callback"""
+        if self.progress_callback:
+            self.progress_callback(step, self.PROGRESS_STEPS, message)
+
+    def _resolve_season_teams(self):
+        """
+        Restituisce le SeasonTeam delle squadre in input, nello stesso ordine.
+
+        Le SeasonTeam già esistenti vengono lette con una sola query e quelle mancanti
+        create con un unico ``bulk_create``.
+        """
+        # Gestione sia per oggetti Team che per oggetti SeasonTeam
+        plain_teams = [team for team in self.teams if not hasattr(team, 'team')]
+
+        existing = {}
+        if plain_teams:
+            for season_team in SeasonTeam.objects.filter(season=self.season, team__in=plain_teams).order_by('-id'):
+                existing[season_team.team_id] = season_team
+
+            missing = [SeasonTeam(team=team, season=self.season) for team in plain_teams if team.id not in existing]
+            for season_team in SeasonTeam.objects.bulk_create(missing):
+                existing[season_team.team_id] = season_team
+
+        season_teams = []
+        for team in self.teams:
+            if hasattr(team, 'team'):  # È già un SeasonTeam
+                season_teams.append(team)
+            else:  # È un Team
+                season_team = existing[team.id]
+                season_team.team = team
+                season_teams.append(season_team)
+        return season_teams
+
     def _create_qualification_rule(self, tournament, rule_type, rule_config):
         """Crea una regola di qualificazione in base al tipo e configurazione"""
         if not rule_config.get('to_tournament'):
-            self.logger.warning(f"Configurazione regola '{rule_type}' non valida: manca to_tournament")
+            self.logger.warning("Configurazione regola '%s' non valida: manca to_tournament", rule_type)
             return
 
         rule = TournamentQualificationRule.objects.create(
@@ -151,22 +191,15 @@ class TournamentFactory:
             max_rank=rule_config.get('max_rank', 1),
             qualification_type=rule_config.get('type', 'promotion')
         )
-        self.logger.info(f"Creata regola di qualificazione {rule_type}: {rule}")
+        self.logger.info("Creata regola di qualificazione %s: %s", rule_type, rule)
 
     def _initialize_rankings(self, tournament):
         """Inizializza la classifica per ogni squadra nel torneo"""
-        for team in self.teams:
-            TournamentRanking.objects.create(
-                tournament=tournament,
-                team=team,  # Già un oggetto SeasonTeam
-                matches_played=0,
-                win=0,
-                draw=0,
-                loss=0,
-                goals_for=0,
-                goals_against=0
-            )
-        self.logger.info(f"Inizializzate {len(self.teams)} posizioni in classifica per il torneo '{tournament.name}'")
+        TournamentRanking.objects.bulk_create([
+            TournamentRanking(tournament=tournament, team=team)  # Già un oggetto SeasonTeam
+            for team in self.teams
+        ])
+        self.logger.info("Inizializzate %d posizioni in classifica per il torneo '%s'", len(self.teams), tournament.name)
 
     def _setup_qualification_rules(self, tournament):
         """Configura le regole di qualificazione per promozione e playoff"""
@@ -186,7 +219,7 @@ class TournamentFactory:
                     max_rank=self.tournament_direct_qualification_rule.max_rank,
                     qualification_type='promotion'
                 )
-                self.logger.info(f"Regola di qualificazione diretta creata: {tournament_direct_qualification_rule}")
+                self.logger.info("Regola di qualificazione diretta creata: %s", tournament_direct_qualification_rule)
 
                 if self.structure.has_playoff and self.tournament_playoff_qualification_rule:
                     play_off = self._generate_playoff(tournament)
@@ -207,7 +240,7 @@ class TournamentFactory:
                         qualification_type='promotion'
                     )
 
-                    self.logger.info(f"Regola di qualificazione playoff creata: {tournament_playoff_qualification_rule}")
+                    self.logger.info("Regola di qualificazione playoff creata: %s", tournament_playoff_qualification_rule)
 
         return tournament
 
@@ -215,117 +248,46 @@ class TournamentFactory:
         """
         Genera un campionato a girone (all'italiana) con partite di andata ed eventualmente ritorno
         """
-        # Creare gli accoppiamenti tra le squadre
-        matchups = list(combinations(self.teams, 2))
-
-        # Se è un campionato con andata e ritorno, aggiungi anche le partite con le squadre invertite
-        if self.structure.legs > 1:
-            matchups += [(away, home) for home, away in matchups]
+        # Calendario con il metodo del cerchio: andata e, se previsto, ritorno speculare
+        giornate = round_robin_rounds(self.teams, legs=self.structure.legs, seed=self.seed)
 
-        # Mescoliamo le partite per avere un calendario più vario
-        random.shuffle(matchups)
-
-        # Calcola il numero di partite per giornata (metà del numero di squadre)
-        matches_per_round = len(self.teams) // 2
+        # Una giornata a settimana a partire dalla data di inizio
+        start_date = self.start_date or timezone.now().date()
+        kickoffs = kickoff_times(start_date, len(giornate))
 
-        # Dividiamo le partite in giornate
-        giornate = [matchups[i:i + matches_per_round] for i in range(0, len(matchups), matches_per_round)]
+        # Creiamo le giornate e le partite in memoria e le salviamo con due bulk_create
+        rounds = [Round(tournament=tournament, number=number) for number in range(1, len(giornate) + 1)]
+        Round.objects.bulk_create(rounds)
 
-        # Creiamo le giornate e le partite
-        start_date = self.start_date or timezone.now().date()
-        giornata_counter = 1
-        for matches in giornate:
-            # Creare la giornata
-            match_date = start_date + timedelta(days=(giornata_counter - 1) * 7) if start_date else None
-            round_obj = Round.objects.create(
-                tournament=tournament,
-                number=giornata_counter
-            )
-            self.logger.info(f"Creata giornata {giornata_counter} con {len(matches)} partite.")
-
-            # Creare le partite della giornata
-            for home, away in matches:
-                match = Match.objects.create(
+        matches = []
+        for round_obj, kickoff, fixtures in zip(rounds, kickoffs, giornate):
+            for home, away in fixtures:
+                matches.append(Match(
                     home_team=home.team,  # .team per ottenere il Team da SeasonTeam
                     away_team=away.team,
                     tournament=tournament,
+                    round=round_obj,
+                    kickoff_datetime=kickoff,
                     # Se il torneo richiede tempi supplementari o rigori in caso di pareggio, lo impostiamo qui
                     extra_time_played=False,
                     penalties_played=False
-                )
-                round_obj.matches.add(match)
-            giornata_counter += 1
+                ))
+        Match.objects.bulk_create(matches)
+        self.logger.info("Create %d giornate con %d partite.", len(rounds), len(matches))
 
     def _generate_knockout(self, tournament):
         """
         Genera un torneo a eliminazione diretta (coppa)
-        Supporta sia torneo con numero di squadre potenza di 2, sia con numero arbitrario
+        Supporta sia torneo con numero di squadre potenza di 2, sia con numero arbitrario:
+        il tabellone completo è salvato nel torneo e i turni successivi vengono creati
+        man mano che si conoscono le vincitrici
         """
-        round_num = 1
-        current_teams = self.teams.copy()
-        random.shuffle(current_teams)
-
-        start_date = self.start_date or timezone.now().date()
-
-        while len(current_teams) > 1:
-            num_teams = len(current_teams)
-            power = 2 ** math.floor(math.log2(num_teams))
-            matches_to_play = (num_teams - power)  # Numero di match da giocare in questo turno
-            teams_in_match = matches_to_play * 2
-
-            if matches_to_play == 0:  # Se numero di squadre è potenza di 2
-                teams_in_match = num_teams
-
-            # Calcola la data del turno (ogni turno dopo 2 settimane)
-            round_date = start_date + timedelta(days=(round_num - 1) * 14) if start_date else None
-
-            # Crea il turno
-            round_obj = Round.objects.create(
-                tournament=tournament,
-                number=round_num,
-                label=self._round_label(num_teams),
-                knockout_stage=True
-            )
-            self.logger.info(f"Creata fase '{round_obj.label}' (round {round_num}) con {num_teams} squadre.")
-
-            # Suddividi le squadre tra quelle che giocano e quelle che passano automaticamente
-            playing = current_teams[:teams_in_match]
-            advancing = current_teams[teams_in_match:]  # squadre che passano turno senza giocare
-
-            # Crea le partite per le squadre che giocano
-            for i in range(0, len(playing), 2):
-                if i + 1 < len(playing):  # Verifica che ci sia una squadra avversaria
-                    home, away = playing[i], playing[i + 1]
-                    match = Match.objects.create(
-                        home_team=home.team,  # .team per ottenere il Team da SeasonTeam
-                        away_team=away.team,
-                        tournament=tournament
-                    )
-                    round_obj.matches.add(match)
-                else:
-                    # Se il numero di squadre è dispari, l'ultima passa automaticamente
-                    advancing.append(playing[i])
-
-            # Per ora, consideriamo tutte le squadre come potenziali avanzanti al turno successivo
-            # (la logica per determinare chi avanza va implementata quando ci sono i risultati)
-            current_teams = advancing + playing
-            round_num += 1
-
-            # Per ora creiamo solo il primo turno, i turni successivi saranno creati dopo che avremo i risultati
-            # Questo permette di gestire correttamente l'avanzamento delle squadre in base ai risultati effettivi
-            break
+        bracket = create_knockout(tournament, self.teams, seed=self.seed)
+        first_round = bracket['rounds'][0]
+        self.logger.info("Creato tabellone di %d turni, primo turno '%s'.", len(bracket['rounds']), first_round['label'])
 
     def _round_label(self, n):
-        labels = {
-            2: "Finale",
-            4: "Semifinali",
-            8: "Quarti di finale",
-            16: "Ottavi di finale",
-            32: "Sedicesimi di finale",
-            64: "Trentaduesimi di finale",
-            128: "Sessantaquattresimi di finale"
-        }
-        return labels.get(n, f"Turno a {n}")
+        return round_label(n)
 
     def _generate_playoff(self, tournament):
         """
@@ -347,7 +309,7 @@ class TournamentFactory:
             parent_tournament=tournament,
             status='pending'
         )
-        self.logger.info(f"Creato torneo playoff '{playoff_name}' come figlio di '{tournament.name}'")
+        self.logger.info("Creato torneo playoff '%s' come figlio di '%s'", playoff_name, tournament.name)
 
         # Ottieni la classifica aggiornata (qui usiamo la funzione esistente per simulare)
         standings = get_tournament_standings(tournament)
@@ -363,7 +325,7 @@ class TournamentFactory:
                 qualified_teams.append(team)
 
         if len(qualified_teams) < 2:
-            self.logger.warning(f"Numero insufficiente di squadre qualificate per playoff: {len(qualified_teams)}")
+            self.logger.warning("Numero insufficiente di squadre qualificate per playoff: %d", len(qualified_teams))
             return
 
         # Associa le squadre qualificate al torneo playoff
@@ -372,44 +334,24 @@ class TournamentFactory:
             season_teams.append(season_team)
 
         playoff_tournament.teams.set(season_teams)
-        self.logger.info(f"Aggiunte {len(season_teams)} squadre al torneo playoff")
+        self.logger.info("Aggiunte %d squadre al torneo playoff", len(season_teams))
 
         # Inizializza le classifiche per il nuovo torneo
-        for season_team in qualified_teams:
-            TournamentRanking.objects.create(
-                tournament=playoff_tournament,
-                team=season_team,  # Usa SeasonTeam direttamente, non team.team
-                points=0,
-                matches_played=0
-            )
+        TournamentRanking.objects.bulk_create([
+            TournamentRanking(tournament=playoff_tournament, team=season_team)  # Usa SeasonTeam direttamente, non team.team
+            for season_team in qualified_teams
+        ])
 
         # Imposta la data di inizio dopo la fine del torneo principale
-        playoff_start_date = None
         if tournament.end_date:
-            playoff_start_date = tournament.end_date + timedelta(days=7)
-
-        # Crea il primo turno dei playoff
-        round_obj = Round.objects.create(
-            tournament=playoff_tournament,
-            number=1,
-            label=self._round_label(len(qualified_teams)),
-            knockout_stage=True
-        )
+            playoff_tournament.start_date = tournament.end_date + timedelta(days=7)
+            playoff_tournament.save(update_fields=['start_date'])
 
-        # Crea le partite del primo turno
-        for i in range(0, len(qualified_teams), 2):
-            if i + 1 < len(qualified_teams):
-                home, away = qualified_teams[i], qualified_teams[i + 1]
-                match = Match.objects.create(
-                    home_team=home.team,  # Usa Team, non SeasonTeam
-                    away_team=away.team,  # Usa Team, non SeasonTeam
-                    tournament=playoff_tournament
-                    # Il campo date e legs non sono nel modello Match
-                )
-                round_obj.matches.add(match)
+        # Tabellone con le teste di serie in ordine di classifica e primo turno
+        create_knockout(playoff_tournament, qualified_teams, draw=False)
 
         playoff_tournament.status = 'active'
         playoff_tournament.save(update_fields=['status'])
 
-        self.logger.info(f"Torneo playoff '{playoff_name}' configurato con {len(qualified_teams) // 2} partite nel primo turno")
+        self.logger.info("Torneo playoff '%s' configurato con %d squadre", playoff_name, len(qualified_teams))
         return playoff_tournament
@@ -1,35 +1,63 @@
+"""
+Accesso ai logger del progetto.
+
+La configurazione (handler, file e livelli) è definita una sola volta nel
+dizionario ``LOGGING`` di ``settings.py``, che instrada anche l'output dei test
+verso ``tests.log``: qui i logger vengono solo recuperati, senza ispezionare lo
+stack né ricreare handler. I messaggi vanno formattati in modo lazy
+(``logger.info("... %s", valore)``), così il costo è nullo quando il livello è
+disabilitato.
+
+Con ``LOG_QUEUE = True`` nelle impostazioni ``enable_queue_logging`` sposta la
+scrittura su disco in un thread dedicato (``QueueHandler``/``QueueListener``).
+"""
 from __future__ import annotations
 
-import inspect
+import atexit
 import logging
-import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
 
+_listener = None
 
-def get_logger():
-    logger = logging.getLogger("django")  # nome logger comune
-    logger.setLevel(logging.INFO)
 
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+def get_logger(name="django"):
+    """Restituisce il logger ``name`` configurato in ``settings.LOGGING``"""
+    return logging.getLogger(name)
 
-    # Verifica se siamo in test cercando 'tests' nello stack
-    stack = inspect.stack()
-    is_test = any('tests' in getattr(frame, 'filename', '') for frame in stack)
 
-    # Definisci i percorsi assoluti per i log file (modifica base_dir se serve)
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    tests_log_path = os.path.join(base_dir, '../logs/tests.log')
-    django_log_path = os.path.join(base_dir, '../logs/django.log')
+def enable_queue_logging(logger_names):
+    """
+    Sostituisce gli handler dei logger indicati con un unico ``QueueHandler``.
 
-    # Scegli file di log in base al contesto
-    log_file = tests_log_path if is_test else django_log_path
+    I record vengono messi in coda dal thread chiamante e scritti dagli handler
+    originali (file, console) in un ``QueueListener`` in background, quindi le
+    richieste non restano mai in attesa dell'I/O su disco. Le chiamate successive
+    alla prima non hanno effetto.
 
-    # Rimuovi eventuali handler già presenti per evitare duplicati
-    logger.handlers.clear()
+    Args:
+        logger_names: nomi dei logger da rendere non bloccanti
 
-    handler = logging.FileHandler(log_file)
-    handler.setLevel(logging.INFO)
-    handler.setFormatter(formatter)
+    Returns:
+        Il ``QueueListener`` avviato
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
 
-    logger.addHandler(handler)
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
 
-    return logger
+    targets = []
+    for name in logger_names:
+        logger = logging.getLogger(name)
+        for handler in logger.handlers:
+            if handler not in targets:
+                targets.append(handler)
+        logger.handlers = [queue_handler]
+
+    # Ogni handler mantiene il proprio livello come con la configurazione sincrona
+    _listener = QueueListener(log_queue, *targets, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
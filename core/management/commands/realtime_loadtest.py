@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.realtime import push, tournament_group, websocket_application
+
+
+class _FakeSocket:
+    """Client WebSocket simulato collegato direttamente all'applicazione ASGI"""
+
+    def __init__(self, loop):
+        self.connected = False
+        self.frames = 0
+        self.messages = 0
+        self.done = loop.create_future()
+        self.disconnect = loop.create_future()
+
+    async def receive(self):
+        if not self.connected:
+            self.connected = True
+            return {'type': 'websocket.connect'}
+        await self.disconnect
+        return {'type': 'websocket.disconnect', 'code': 1000}
+
+    async def send(self, message):
+        if message['type'] != 'websocket.send':
+            return
+        self.frames += 1
+        self.messages += message['text'].count('"type"')
+        if '"done"' in message['text'] and not self.done.done():
+            self.done.set_result(time.perf_counter())
+
+
+def _publish(group, messages, keys):
+    for i in range(messages):
+        push(group, 'score', {'match': i % keys, 'home_score': i}, key=f"match:{i % keys}")
+    push(group, 'done', {})
+
+
+async def _run(sockets, messages, keys, timeout):
+    loop = asyncio.get_running_loop()
+    group = tournament_group(0)
+    clients = [_FakeSocket(loop) for _ in range(sockets)]
+    tasks = [
+        asyncio.create_task(websocket_application({'type': 'websocket', 'path': '/ws/tournaments/0/'},
+                                                  client.receive, client.send))
+        for client in clients
+    ]
+    # Lascia a tutti i socket il tempo di iscriversi
+    while not all(client.connected for client in clients):
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    # La pubblicazione avviene da un altro thread, come dal codice sincrono di Django
+    await asyncio.to_thread(_publish, group, messages, keys)
+    published = time.perf_counter() - start
+    try:
+        finished = await asyncio.wait_for(asyncio.gather(*(client.done for client in clients)), timeout)
+    finally:
+        for client in clients:
+            if not client.disconnect.done():
+                client.disconnect.set_result(None)
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return {
+        'published': published,
+        'elapsed': max(finished) - start,
+        'frames': sum(client.frames for client in clients),
+        'delivered': sum(client.messages for client in clients),
+    }
+
+
+class Command(BaseCommand):
+    help = "Misura la consegna degli aggiornamenti WebSocket a molti socket simulati nel processo"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sockets', type=int, default=1000, help="Socket iscritti al gruppo")
+        parser.add_argument('--messages', type=int, default=1000, help="Messaggi pubblicati")
+        parser.add_argument('--keys', type=int, default=10, help="Chiavi di coalescenza distinte (es. partite)")
+        parser.add_argument('--timeout', type=float, default=60, help="Secondi massimi di attesa")
+
+    def handle(self, *args, **options):
+        if min(options['sockets'], options['messages'], options['keys']) < 1:
+            raise CommandError("Socket, messaggi e chiavi devono essere positivi")
+
+        try:
+            report = asyncio.run(_run(options['sockets'], options['messages'], options['keys'], options['timeout']))
+        except asyncio.TimeoutError:
+            raise CommandError("Non tutti i socket hanno ricevuto i messaggi entro il tempo massimo")
+
+        sent = (options['messages'] + 1) * options['sockets']
+        self.stdout.write(
+            f"{options['sockets']} socket, {options['messages']} messaggi pubblicati in {report['published']:.3f}s"
+        )
+        self.stdout.write(
+            f"Consegnati {report['delivered']} messaggi su {sent} in {report['frames']} frame "
+            f"({report['delivered'] / sent:.1%} dopo la coalescenza) in {report['elapsed']:.3f}s: "
+            f"{report['delivered'] / report['elapsed']:.0f} messaggi/s"
+        )
+        self.stdout.write(self.style.SUCCESS("Test di carico completato"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Tournament
+from core.services.standings import rebuild_tournament_rankings
+
+
+class Command(BaseCommand):
+    help = "Ricalcola da zero le classifiche dei tornei a partire dalle partite giocate"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tournament', type=int, action='append', help="Id del torneo da ricalcolare (ripetibile)")
+
+    def handle(self, *args, **options):
+        tournaments = Tournament.objects.select_related('structure')
+        if options['tournament']:
+            tournaments = tournaments.filter(id__in=options['tournament'])
+            if not tournaments.exists():
+                raise CommandError("Nessun torneo trovato con gli id indicati")
+
+        for tournament in tournaments:
+            rankings = rebuild_tournament_rankings(tournament)
+            self.stdout.write(f"Classifica '{tournament.name}' ricalcolata ({len(rankings)} squadre)")
+
+        self.stdout.write(self.style.SUCCESS("Ricalcolo classifiche completato"))
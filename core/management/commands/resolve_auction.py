@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import FantaLeague
+from core.services.auto_auction import allocate_auto_auction
+from core.services.silent_auction import resolve_silent_auction
+
+
+class Command(BaseCommand):
+    help = "Chiude l'asta di una lega fantacalcio e assegna i giocatori"
+
+    def add_arguments(self, parser):
+        parser.add_argument('league', type=int, help="Id della lega")
+        parser.add_argument('--seed', type=int, default=0, help="Seed dell'asta automatica")
+
+    def handle(self, *args, **options):
+        league = FantaLeague.objects.filter(id=options['league']).first()
+        if league is None:
+            raise CommandError(f"Nessuna lega trovata con id {options['league']}")
+
+        if league.auction_type == 'silent':
+            report = resolve_silent_auction(league)
+            self.stdout.write(
+                f"{len(report['assigned'])} giocatori assegnati, {len(report['unassigned'])} senza squadra "
+                f"in {report['seconds']:.3f}s"
+            )
+        elif league.auction_type == 'auto':
+            report = allocate_auto_auction(league, seed=options['seed'])
+            self.stdout.write(f"{len(report['prices'])} giocatori assegnati in {report['seconds']:.3f}s")
+        else:
+            raise CommandError(f"Asta di tipo '{league.get_auction_type_display()}' non gestita dal comando")
+
+        self.stdout.write(self.style.SUCCESS(f"Asta della lega '{league.name}' chiusa"))
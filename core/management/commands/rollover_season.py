@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Season
+from core.services.rollover import rollover_season
+
+
+class Command(BaseCommand):
+    help = "Chiude una stagione e crea la successiva applicando promozioni, retrocessioni e qualificazioni"
+
+    def add_arguments(self, parser):
+        parser.add_argument('season', type=int, help="Id della stagione da chiudere")
+        parser.add_argument('--year', type=int, help="Anno della nuova stagione (di default quello successivo)")
+
+    def handle(self, *args, **options):
+        season = Season.objects.select_related('league').filter(id=options['season']).first()
+        if season is None:
+            raise CommandError("Nessuna stagione trovata con l'id indicato")
+
+        new_season, tournaments = rollover_season(season, year=options['year'])
+        for tournament in tournaments.values():
+            self.stdout.write(f"Creato torneo '{tournament.name}' per la stagione {new_season.year}")
+
+        self.stdout.write(self.style.SUCCESS(f"Stagione {new_season.year} creata"))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import FantaLeague
+from core.services.market import DEFAULT_BATCH_SIZE, settle_pending
+
+
+class Command(BaseCommand):
+    help = "Regola le transazioni di mercato in attesa, a blocchi atomici"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--league', type=int, help="Id della lega di cui regolare le transazioni")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Transazioni per blocco")
+
+    def handle(self, *args, **options):
+        league = None
+        if options['league'] is not None:
+            league = FantaLeague.objects.filter(id=options['league']).first()
+            if league is None:
+                raise CommandError(f"Nessuna lega trovata con id {options['league']}")
+        if options['batch_size'] < 1:
+            raise CommandError("La dimensione del blocco deve essere positiva")
+
+        report = settle_pending(league=league, batch_size=options['batch_size'])
+        self.stdout.write(
+            f"{report['completed']} transazioni completate, {report['rejected']} rifiutate "
+            f"in {report['seconds']:.3f}s ({report['per_second']:.0f} transazioni/s)"
+        )
+        self.stdout.write(self.style.SUCCESS("Mercato regolato"))
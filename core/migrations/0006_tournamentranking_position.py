@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 06:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_remove_tournamentstructure_home_and_away_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournamentranking',
+            name='position',
+            field=models.PositiveIntegerField(blank=True, help_text='Posizione in classifica (calcolata)', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 06:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_tournamentranking_position'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournament',
+            name='bracket',
+            field=models.JSONField(blank=True, help_text='Tabellone a eliminazione diretta con accoppiamenti e vincitrici', null=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_cursor_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StandingsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group', models.CharField(blank=True, help_text='Gruppo di appartenenza per tornei con gironi', max_length=50)),
+                ('position', models.PositiveIntegerField(help_text='Posizione in classifica')),
+                ('played', models.PositiveIntegerField(default=0, help_text='Partite giocate')),
+                ('win', models.PositiveIntegerField(default=0, help_text='Vittorie (anche ai supplementari e ai rigori)')),
+                ('draw', models.PositiveIntegerField(default=0, help_text='Pareggi')),
+                ('loss', models.PositiveIntegerField(default=0, help_text='Sconfitte (anche ai supplementari e ai rigori)')),
+                ('goals_for', models.PositiveIntegerField(default=0, help_text='Gol segnati')),
+                ('goals_against', models.PositiveIntegerField(default=0, help_text='Gol subiti')),
+                ('goal_difference', models.IntegerField(default=0, help_text='Differenza reti')),
+                ('points', models.IntegerField(default=0, help_text='Punti in classifica')),
+                ('form', models.CharField(blank=True, help_text='Ultimi risultati, dal più vecchio: V, N, P', max_length=5)),
+                ('qualified', models.BooleanField(default=False)),
+                ('relegated', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='standings', to='core.seasonteam')),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='standings', to='core.tournament')),
+            ],
+            options={
+                'verbose_name': 'Classifica (snapshot)',
+                'verbose_name_plural': 'Classifiche (snapshot)',
+                'ordering': ['tournament', 'group', 'position'],
+                'indexes': [models.Index(fields=['tournament', 'group', 'position'], name='standings_position_idx')],
+                'unique_together': {('tournament', 'team', 'group')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_standingssnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuctionPreference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField(help_text='Posizione nella lista delle preferenze (1 = giocatore preferito)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('league', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='auction_preferences', to='core.fantaleague')),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='auction_preferences', to='core.player')),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='auction_preferences', to='core.fantateam')),
+            ],
+            options={
+                'verbose_name': 'Preferenza Asta',
+                'verbose_name_plural': 'Preferenze Asta',
+                'ordering': ['team', 'rank'],
+                'unique_together': {('league', 'team', 'player')},
+            },
+        ),
+    ]
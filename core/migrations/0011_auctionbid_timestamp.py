@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:08
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_auction_preference'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auctionbid',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -24,6 +24,7 @@ from .tournament_structure import TournamentStructure
 from .tournament_rule import TournamentRule
 from .tournament_qualification_rule import TournamentQualificationRule
 from .tournament_ranking import TournamentRanking
+from .standings_snapshot import StandingsSnapshot
 from .trophy import Trophy
 
 # 🗓️ Stagioni, Leghe, Giornate
@@ -47,7 +48,7 @@ from .fanta_team import FantaTeam, FantaTeamPlayer
 from .fanta_league import FantaLeague, FantaLeagueRule
 from .fanta_lineup import FantaLineup, FantaLineupPlayer, FantaLineupSubstitution
 from .fanta_score import FantaScore
-from .market_transaction import MarketTransaction, AuctionBid
+from .market_transaction import MarketTransaction, AuctionBid, AuctionPreference
 
 __all__ = [
     # Geografia e Identità
@@ -76,6 +77,7 @@ __all__ = [
     'TournamentRule',
     'TournamentQualificationRule',
     'TournamentRanking',
+    'StandingsSnapshot',
     'Trophy',
 
     # Stagioni, Leghe, Giornate
@@ -105,4 +107,5 @@ __all__ = [
     'FantaScore',
     'MarketTransaction',
     'AuctionBid',
+    'AuctionPreference',
 ]
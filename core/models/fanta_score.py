@@ -3,6 +3,42 @@ from .player import Player
 from .match import Match
 from .round import Round
 
+# Regolamento standard dei bonus/malus, condiviso con il calcolo in blocco di core.services.fanta_scoring
+
+# Voci bonus/malus, nell'ordine dei vettori dei coefficienti
+SCORING_FEATURES = (
+    'goals', 'assists', 'penalties_scored', 'penalties_saved', 'clean_sheet',
+    'yellow_cards', 'red_cards', 'own_goals', 'penalties_missed', 'goals_conceded',
+)
+
+# Coefficienti del regolamento standard
+DEFAULT_COEFFICIENTS = {
+    'goals': 3.0,
+    'assists': 1.0,
+    'penalties_scored': 2.0,
+    'penalties_saved': 3.0,
+    'clean_sheet': 1.0,
+    'yellow_cards': -0.5,
+    'red_cards': -1.0,
+    'own_goals': -2.0,
+    'penalties_missed': -3.0,
+    'goals_conceded': -1.0,
+}
+
+# Macro-ruoli a cui si applicano le voci legate alla porta
+CLEAN_SHEET_ROLES = ('P', 'D')
+GOALS_CONCEDED_ROLES = ('P',)
+
+
+def scoring_features(role, score):
+    """Restituisce le voci bonus/malus di un singolo voto, tenendo conto del macro-ruolo"""
+    features = {feature: float(getattr(score, feature)) for feature in SCORING_FEATURES}
+    if role not in CLEAN_SHEET_ROLES:
+        features['clean_sheet'] = 0.0
+    if role not in GOALS_CONCEDED_ROLES:
+        features['goals_conceded'] = 0.0
+    return features
+
 
 class FantaScore(models.Model):
     """
@@ -69,36 +105,12 @@ class FantaScore(models.Model):
         else:
             base_score = self.vote
 
-        # Calcola bonus
-        bonus = (
-            (3.0 * self.goals) +
-            (1.0 * self.assists) +
-            (2.0 * self.penalties_scored) +
-            (3.0 * self.penalties_saved)
-        )
-
-        # Calcola malus
-        malus = (
-            (-0.5 * self.yellow_cards) +
-            (-1.0 * self.red_cards) +
-            (-2.0 * self.own_goals) +
-            (-3.0 * self.penalties_missed)
-        )
-
-        # Per i portieri: -1 punto per ogni gol subito
-        if self.player.main_role == 'P':
-            malus += (-1.0 * self.goals_conceded)
-
-            # Bonus porta inviolata per portieri
-            if self.clean_sheet:
-                bonus += 1.0
-
-        # Bonus porta inviolata per difensori
-        elif self.player.main_role == 'D' and self.clean_sheet:
-            bonus += 1.0
+        # Bonus e malus del regolamento standard, in base al macro-ruolo
+        features = scoring_features(self.player.role_category(), self)
+        bonus_malus = sum(DEFAULT_COEFFICIENTS[feature] * value for feature, value in features.items())
 
         # Calcola punteggio finale
-        self.final_score = round(base_score + bonus + malus, 2)
+        self.final_score = round(base_score + bonus_malus, 2)
         self.save()
 
         return self.final_score
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 from .fanta_team import FantaTeam
 from .fanta_league import FantaLeague
@@ -51,77 +52,25 @@ class MarketTransaction(models.Model):
         verbose_name = "Transazione di Mercato"
         verbose_name_plural = "Transazioni di Mercato"
         ordering = ['-created_at']
+        # Indice per la paginazione a cursore delle transazioni
+        indexes = [models.Index(fields=['-created_at', '-id'], name='transaction_created_idx')]
 
     def complete_transaction(self):
         """
-        Completa la transazione aggiornando i roster e i budget delle squadre
+        Completa la transazione aggiornando i roster e i budget delle squadre.
+
+        La transazione viene regolata da ``core.services.market`` con le righe
+        delle squadre bloccate: se i crediti o i giocatori non sono più
+        disponibili viene rifiutata.
         """
-        from django.utils import timezone
+        from core.services.market import settle_batch
 
         if self.status != 'pending':
             return False
 
-        # Logica per i diversi tipi di transazione
-        if self.transaction_type == 'buy':
-            # Aggiorna il roster e il budget della squadra acquirente
-            self.team.fantateamplayer_set.create(
-                player=self.player,
-                purchase_price=self.price,
-                is_active=True
-            )
-            self.team.budget -= self.price
-            self.team.save()
-
-        elif self.transaction_type == 'sell':
-            # Rimuovi il giocatore dal roster e aggiorna il budget
-            team_player = self.team.fantateamplayer_set.get(player=self.player, is_active=True)
-            team_player.is_active = False
-            team_player.save()
-
-            self.team.budget += self.price
-            self.team.save()
-
-        elif self.transaction_type == 'trade':
-            # Gestisci lo scambio tra due squadre
-            if not all([self.team, self.team_counterparty, self.player, self.player_counterparty]):
-                self.status = 'rejected'
-                self.save()
-                return False
-
-            # Rimuovi giocatori dalle rispettive squadre
-            team1_player = self.team.fantateamplayer_set.get(player=self.player, is_active=True)
-            team1_player.is_active = False
-            team1_player.save()
-
-            team2_player = self.team_counterparty.fantateamplayer_set.get(player=self.player_counterparty, is_active=True)
-            team2_player.is_active = False
-            team2_player.save()
-
-            # Aggiungi i giocatori alle nuove squadre
-            self.team.fantateamplayer_set.create(
-                player=self.player_counterparty,
-                purchase_price=team2_player.purchase_price,
-                is_active=True
-            )
-
-            self.team_counterparty.fantateamplayer_set.create(
-                player=self.player,
-                purchase_price=team1_player.purchase_price,
-                is_active=True
-            )
-
-            # Gestisci il conguaglio economico
-            if self.price_adjustment != 0:
-                self.team.budget -= self.price_adjustment
-                self.team_counterparty.budget += self.price_adjustment
-                self.team.save()
-                self.team_counterparty.save()
-
-        # Aggiorna lo stato della transazione
-        self.status = 'completed'
-        self.completed_at = timezone.now()
-        self.save()
-        return True
+        completed, _ = settle_batch([self.pk])
+        self.refresh_from_db()
+        return bool(completed)
 
     def __str__(self):
         if self.transaction_type == 'trade':
@@ -143,7 +92,8 @@ class AuctionBid(models.Model):
     player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='bids')
     amount = models.IntegerField(help_text="Offerta in crediti")
     is_winning = models.BooleanField(default=False, help_text="Indica se questa è l'offerta vincente")
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Istante dell'offerta, non del salvataggio: le offerte dell'asta live vengono scritte a blocchi
+    timestamp = models.DateTimeField(default=timezone.now)
 
     class Meta:
         verbose_name = "Offerta Asta"
@@ -153,3 +103,25 @@ class AuctionBid(models.Model):
     def __str__(self):
         status = "vincente" if self.is_winning else "in corso"
         return f"{self.team.name}: {self.amount} crediti per {self.player.person.surname} ({status})"
+
+
+class AuctionPreference(models.Model):
+    """
+    Rappresenta la posizione di un giocatore nella lista delle preferenze di una squadra per l'asta automatica.
+    """
+    league = models.ForeignKey(FantaLeague, on_delete=models.CASCADE, related_name='auction_preferences')
+    team = models.ForeignKey(FantaTeam, on_delete=models.CASCADE, related_name='auction_preferences')
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='auction_preferences')
+    rank = models.PositiveIntegerField(help_text="Posizione nella lista delle preferenze (1 = giocatore preferito)")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Preferenza Asta"
+        verbose_name_plural = "Preferenze Asta"
+        ordering = ['team', 'rank']
+        unique_together = ('league', 'team', 'player')
+
+    def __str__(self):
+        return f"{self.team.name}: {self.rank}. {self.player.person.surname}"
@@ -7,7 +7,21 @@ from .tournament import Tournament
 class Match(models.Model):
     """
     Rappresenta una partita tra due squadre in un torneo.
+
+    La classifica viene aggiornata dai segnali di ``save()``/``delete()`` con la sola
+    variazione del risultato. ``QuerySet.update()``, ``bulk_update`` e ``bulk_create``
+    non inviano segnali: chi scrive risultati in blocco deve passare le coppie
+    (precedente, nuovo) ad ``apply_match_results`` (come ``simulate_round``) oppure
+    ricalcolare la classifica con ``rebuild_tournament_rankings``.
     """
+    # Campi che determinano il contributo della partita alla classifica
+    RESULT_FIELDS = (
+        'tournament_id', 'home_team_id', 'away_team_id', 'played',
+        'home_score', 'away_score',
+        'extra_time_played', 'home_score_extra_time', 'away_score_extra_time',
+        'penalties_played', 'home_score_penalties', 'away_score_penalties',
+    )
+
     # Squadre e risultato
     home_team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='home_matches', help_text="Squadra di casa")
     away_team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='away_matches', help_text="Squadra ospite")
@@ -54,6 +68,18 @@ class Match(models.Model):
         verbose_name_plural = "Partite"
         ordering = ['tournament', 'round', 'kickoff_datetime']
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Memorizza il risultato letto dal database per calcolare le variazioni di classifica
+        if all(field in instance.__dict__ for field in cls.RESULT_FIELDS):
+            instance._result_snapshot = instance.result_snapshot()
+        return instance
+
+    def result_snapshot(self):
+        """Restituisce i campi del risultato come dizionario (vedi ``RESULT_FIELDS``)"""
+        return {field: getattr(self, field) for field in self.RESULT_FIELDS}
+
     def is_upcoming(self):
         """Verifica se la partita è futura"""
         return self.kickoff_datetime and self.kickoff_datetime > timezone.now() and not self.played
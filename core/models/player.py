@@ -33,6 +33,14 @@ class Player(models.Model):
         ('A', 'Attaccante Generico'),
     ]
 
+    # Macro-ruolo del fantacalcio (P, D, C, A) per ogni ruolo specifico
+    ROLE_CATEGORIES = {
+        'P': 'P',
+        'DC': 'D', 'DS': 'D', 'DD': 'D', 'D': 'D',
+        'CC': 'C', 'CDC': 'C', 'COC': 'C', 'CS': 'C', 'CD': 'C', 'C': 'C',
+        'AS': 'A', 'AD': 'A', 'PC': 'A', 'A': 'A',
+    }
+
     main_role = models.CharField(max_length=20, choices=ROLE_CHOICES, null=True, blank=True, help_text="Ruolo principale del giocatore")
     secondary_role = models.CharField(max_length=20, choices=ROLE_CHOICES, null=True, blank=True, help_text="Ruolo secondario del giocatore")
 
@@ -107,5 +115,9 @@ class Player(models.Model):
 
         return base_value * role_multiplier.get(self.main_role, 1.0)
 
+    def role_category(self):
+        """Restituisce il macro-ruolo (P, D, C, A) del ruolo principale"""
+        return self.ROLE_CATEGORIES.get(self.main_role)
+
     def __str__(self):
         return f"{self.person.name} ({self.main_role}) - {self.person.main_nationality.name if self.person.main_nationality else 'N/A'}"
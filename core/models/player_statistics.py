@@ -80,31 +80,15 @@ class PlayerStatistics(models.Model):
 
     def update_fanta_stats(self):
         """Aggiorna le statistiche del fantacalcio"""
-        from .fanta_score import FantaScore
-        scores = FantaScore.objects.filter(player=self.player)
+        from core.services.player_stats import FANTA_FIELDS, fanta_stats_aggregates, scores_for
 
-        if self.season:
-            scores = scores.filter(match__tournament__season=self.season)
+        # Totale, media, bonus e malus in un'unica query aggregata
+        scores = scores_for(self.season, self.tournament).filter(player=self.player)
+        totals = scores.aggregate(valid=models.Count('id'), **fanta_stats_aggregates())
 
-        if self.tournament:
-            scores = scores.filter(match__tournament=self.tournament)
-
-        valid_scores = scores.exclude(final_score=0)
-
-        if valid_scores.count() > 0:
-            self.fanta_total = valid_scores.aggregate(models.Sum('final_score'))['final_score__sum'] or 0
-            self.fanta_average = valid_scores.aggregate(models.Avg('final_score'))['final_score__avg'] or 0
-            self.bonus_points = sum([
-                (s.goals * 3) + (s.assists * 1) + (s.penalties_scored * 2) +
-                (s.penalties_saved * 3) + (1 if s.clean_sheet else 0)
-                for s in valid_scores
-            ])
-            self.malus_points = sum([
-                (s.yellow_cards * 0.5) + (s.red_cards * 1) +
-                (s.own_goals * 2) + (s.penalties_missed * 3) +
-                (s.goals_conceded if self.player.main_role == 'P' else 0)
-                for s in valid_scores
-            ])
+        if totals['valid'] > 0:
+            for field in FANTA_FIELDS:
+                setattr(self, field, totals[field] or 0)
 
             self.save()
 
@@ -0,0 +1,42 @@
+from django.db import models
+from .tournament import Tournament
+from .season_team import SeasonTeam
+
+
+class StandingsSnapshot(models.Model):
+    """
+    Riga denormalizzata della classifica di un torneo, pronta per essere mostrata.
+
+    Viene riscritta insieme alle posizioni di ``TournamentRanking`` ogni volta che
+    la classifica viene ricalcolata dopo un nuovo risultato.
+    """
+    tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name='standings')
+    team = models.ForeignKey(SeasonTeam, on_delete=models.CASCADE, related_name='standings')
+    group = models.CharField(max_length=50, blank=True, help_text="Gruppo di appartenenza per tornei con gironi")
+    position = models.PositiveIntegerField(help_text="Posizione in classifica")
+
+    played = models.PositiveIntegerField(default=0, help_text="Partite giocate")
+    win = models.PositiveIntegerField(default=0, help_text="Vittorie (anche ai supplementari e ai rigori)")
+    draw = models.PositiveIntegerField(default=0, help_text="Pareggi")
+    loss = models.PositiveIntegerField(default=0, help_text="Sconfitte (anche ai supplementari e ai rigori)")
+    goals_for = models.PositiveIntegerField(default=0, help_text="Gol segnati")
+    goals_against = models.PositiveIntegerField(default=0, help_text="Gol subiti")
+    goal_difference = models.IntegerField(default=0, help_text="Differenza reti")
+    points = models.IntegerField(default=0, help_text="Punti in classifica")
+    form = models.CharField(max_length=5, blank=True, help_text="Ultimi risultati, dal più vecchio: V, N, P")
+
+    qualified = models.BooleanField(default=False)
+    relegated = models.BooleanField(default=False)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('tournament', 'team', 'group')
+        verbose_name = "Classifica (snapshot)"
+        verbose_name_plural = "Classifiche (snapshot)"
+        ordering = ['tournament', 'group', 'position']
+        indexes = [models.Index(fields=['tournament', 'group', 'position'], name='standings_position_idx')]
+
+    def __str__(self):
+        group_str = f" (Girone {self.group})" if self.group else ""
+        return f"{self.position}. {self.team}{group_str} - {self.tournament.name}"
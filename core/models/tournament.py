@@ -39,6 +39,9 @@ class Tournament(models.Model):
     end_date = models.DateField(null=True, blank=True, help_text="Data di fine del torneo")
     registration_deadline = models.DateField(null=True, blank=True, help_text="Scadenza per l'iscrizione")
 
+    # Tabellone delle fasi a eliminazione diretta (vedi core.services.bracket)
+    bracket = models.JSONField(null=True, blank=True, help_text="Tabellone a eliminazione diretta con accoppiamenti e vincitrici")
+
     # Media e presentazione
     logo = models.ImageField(upload_to='tournaments/', null=True, blank=True, help_text="Logo del torneo")
     trophy = models.ForeignKey(Trophy, on_delete=models.SET_NULL, null=True, blank=True, related_name='tournaments', help_text="Trofeo assegnato al vincitore")
@@ -61,13 +64,36 @@ class Tournament(models.Model):
 
     def get_winner(self):
         """Restituisce la squadra vincitrice del torneo, se disponibile"""
+        if self.status == 'completed' and self.bracket:
+            # Torneo a eliminazione diretta: vince chi si aggiudica la finale
+            winner_id = self.bracket['rounds'][-1]['ties'][0]['winner']
+            return self.teams.filter(team_id=winner_id).first()
+
         if self.status == 'completed':
-            from .tournament_ranking import TournamentRanking
-            rankings = TournamentRanking.objects.filter(tournament=self).order_by('squad_ranking')
-            if rankings.exists():
-                return rankings.first().team
+            rankings = self.tournament_rankings.select_related('team').order_by('group', 'position')
+            if rankings.filter(position__isnull=True).exists():
+                # Posizioni non ancora salvate: si usano quelle calcolate senza scriverle
+                positions = self.computed_positions()
+                return next((ranking.team for ranking in rankings if positions.get(ranking.id) == 1), None)
+            winner = rankings.filter(position=1).first()
+            if winner:
+                return winner.team
         return None
 
+    def computed_positions(self):
+        """
+        Posizioni {id riga di classifica: posizione} calcolate senza salvarle.
+
+        L'ordine viene calcolato una sola volta per istanza: le righe lette da
+        ``tournament_rankings`` o con ``prefetch_related('tournament')`` condividono
+        il torneo, quindi una lista di N righe non ripete il calcolo N volte.
+        """
+        if not hasattr(self, '_computed_positions'):
+            from core.services.ranking import compute_positions
+
+            self._computed_positions = compute_positions(self)[0]
+        return self._computed_positions
+
     def can_add_team(self):
         """Verifica se è possibile aggiungere altre squadre al torneo"""
         return (self.teams.count() < self.max_teams and
@@ -78,6 +104,45 @@ class Tournament(models.Model):
         """Verifica se il torneo consente pareggi"""
         return self.structure.allow_draws
 
+    def get_points_weights(self):
+        """
+        Restituisce i punti assegnati per ogni tipo di risultato.
+
+        Se il torneo ha regole attive valgono quelle, altrimenti si usano i
+        valori della struttura. Le chiavi corrispondono ai contatori di
+        ``TournamentRanking`` (win, draw, loss, win_penalty, ...).
+        """
+        weights = dict.fromkeys(
+            ['win', 'draw', 'loss', 'win_penalty', 'loss_penalty', 'win_extra_time', 'loss_extra_time'], 0
+        )
+
+        rules = list(self.rules.filter(is_active=True).values_list('rule_type', 'value'))
+        if rules:
+            rule_fields = {
+                'point_win': 'win',
+                'point_draw': 'draw',
+                'point_loss': 'loss',
+                'win_penalty': 'win_penalty',
+            }
+            for rule_type, value in rules:
+                if rule_type in rule_fields:
+                    weights[rule_fields[rule_type]] = value
+                elif rule_type == 'loss_penalty':
+                    weights['loss_penalty'] = -value
+        else:
+            structure = self.structure
+            weights.update({
+                'win': structure.POINTS_WIN,
+                'draw': structure.POINTS_DRAW,
+                'loss': structure.POINTS_LOSS,
+                'win_penalty': structure.POINTS_WIN_SHOOTOUT,
+                'loss_penalty': structure.POINTS_LOSS_SHOOTOUT,
+                'win_extra_time': structure.POINTS_WIN_EXTRA_TIME,
+                'loss_extra_time': structure.POINTS_LOSS_EXTRA_TIME,
+            })
+
+        return weights
+
     def get_draw_resolution_method(self):
         """Restituisce il metodo di risoluzione dei pareggi"""
         if self.allows_draws():
@@ -42,32 +42,37 @@ class TournamentQualificationRule(models.Model):
         """
         Applica la regola di qualificazione, aggiornando lo stato delle squadre nella classifica.
         """
-        from .tournament_ranking import TournamentRanking
+        from core.services.ranking import order_rankings
 
-        # Ottieni le classifiche del torneo di origine
-        rankings = TournamentRanking.objects.filter(tournament=self.from_tournament)
-
-        # Se specificato un gruppo, filtra per quel gruppo
-        if self.group:
-            rankings = rankings.filter(group=self.group)
-
-        # Ordina per punti (decrescente)
-        rankings = list(rankings)
-        rankings.sort(key=lambda r: (-r.points, -r.win, -(r.goals_for - r.goals_against)))
+        # Classifica del torneo di origine (eventualmente del solo girone indicato)
+        rankings = order_rankings(self.from_tournament, group=self.group)
 
         # Identifica le squadre che rientrano nel range di qualificazione
-        qualified_teams = []
-        for position, ranking in enumerate(rankings, start=1):
-            if self.min_rank <= position <= self.max_rank:
-                qualified_teams.append(ranking.team)
-
-                # Aggiorna lo stato di qualificazione o retrocessione
-                if self.qualification_type in ['promotion', 'qualification', 'playoff']:
-                    ranking.qualified = True
-                    ranking.save(update_fields=['qualified'])
-                elif self.qualification_type in ['relegation', 'playout']:
-                    ranking.relegated = True
-                    ranking.save(update_fields=['relegated'])
+        selected = rankings[max(self.min_rank, 1) - 1:self.max_rank]
+        qualified_teams = [ranking.team for ranking in selected]
+
+        # Aggiorna lo stato di qualificazione o retrocessione con un'unica scrittura
+        if self.qualification_type in ['promotion', 'qualification', 'playoff']:
+            flag = 'qualified'
+        elif self.qualification_type in ['relegation', 'playout']:
+            flag = 'relegated'
+        else:
+            flag = None
+
+        if flag and selected:
+            from core.cache import invalidate_tournaments
+
+            from .standings_snapshot import StandingsSnapshot
+            from .tournament_ranking import TournamentRanking
+
+            for ranking in selected:
+                setattr(ranking, flag, True)
+            TournamentRanking.objects.bulk_update(selected, [flag])
+            # Le posizioni non cambiano: si aggiornano solo i flag della classifica materializzata e quella in cache
+            StandingsSnapshot.objects.filter(
+                tournament_id=self.from_tournament_id, team_id__in=[ranking.team_id for ranking in selected]
+            ).update(**{flag: True})
+            invalidate_tournaments([self.from_tournament_id])
 
         return qualified_teams
 
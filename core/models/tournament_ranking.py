@@ -1,13 +1,69 @@
 from django.db import models
+from django.db.models import Q
 from .tournament import Tournament
 from .season_team import SeasonTeam
 
+# Contatori dei risultati che concorrono al calcolo dei punti
+RESULT_COUNTERS = ('win', 'draw', 'loss', 'win_penalty', 'loss_penalty', 'win_extra_time', 'loss_extra_time')
+
+
+def match_result_counters(result, allow_draws):
+    """
+    Traduce il risultato di una partita nei contatori di classifica delle due squadre.
+
+    Args:
+        result: dizionario con i campi di ``Match.RESULT_FIELDS``
+        allow_draws: se False i pareggi vengono risolti con supplementari/rigori
+
+    Returns:
+        Tupla (contatori casa, contatori trasferta), oppure (None, None) se la partita
+        non è stata giocata
+    """
+    hs, as_ = result['home_score'], result['away_score']
+    if not result['played'] or hs is None or as_ is None:
+        return None, None
+
+    home = {'goals_for': hs, 'goals_against': as_}
+    away = {'goals_for': as_, 'goals_against': hs}
+
+    if hs == as_ and not allow_draws:
+        # Determiniamo il vincitore in base al metodo di spareggio
+        hp, ap = result['home_score_penalties'] or 0, result['away_score_penalties'] or 0
+        penalties = result['penalties_played']
+        if result['extra_time_played']:
+            he, ae = result['home_score_extra_time'] or 0, result['away_score_extra_time'] or 0
+            if he != ae:
+                home['win_extra_time' if he > ae else 'loss_extra_time'] = 1
+                away['win_extra_time' if ae > he else 'loss_extra_time'] = 1
+            elif penalties:
+                # Se ancora pareggio, verifichiamo i rigori
+                home['win_penalty' if hp > ap else 'loss_penalty'] = 1
+                away['win_penalty' if ap > hp else 'loss_penalty'] = 1
+        elif penalties:
+            home['win_penalty' if hp > ap else 'loss_penalty'] = 1
+            away['win_penalty' if ap > hp else 'loss_penalty'] = 1
+    elif hs > as_:
+        home['win'], away['loss'] = 1, 1
+    elif hs < as_:
+        home['loss'], away['win'] = 1, 1
+    else:
+        home['draw'], away['draw'] = 1, 1
+
+    return home, away
+
 
 class TournamentRanking(models.Model):
     """
     Rappresenta la posizione di una squadra nella classifica di un torneo.
     Memorizza statistiche come vittorie, pareggi, sconfitte e calcola la posizione.
     """
+    # Campi che determinano l'ordine o compaiono nella classifica materializzata:
+    # cambiarli rende non più valide le posizioni salvate
+    STANDINGS_FIELDS = (
+        'tournament_id', 'team_id', 'group', 'matches_played', 'points', 'goals_for', 'goals_against',
+        'qualified', 'relegated',
+    ) + RESULT_COUNTERS
+
     tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name='tournament_rankings')
     team = models.ForeignKey(SeasonTeam, on_delete=models.CASCADE, related_name='team_tournament_rankings')
     group = models.CharField(max_length=50, blank=True, help_text="Gruppo di appartenenza per tornei con gironi")
@@ -34,6 +90,9 @@ class TournamentRanking(models.Model):
     points = models.IntegerField(default=0, help_text="Punti totali in classifica")
     points_penalty = models.IntegerField(default=0, help_text="Punti di penalizzazione")
 
+    # Posizione calcolata, aggiornata a ogni ricalcolo della classifica
+    position = models.PositiveIntegerField(null=True, blank=True, help_text="Posizione in classifica (calcolata)")
+
     # Flag per stato
     qualified = models.BooleanField(default=False, help_text="Indica se la squadra è qualificata al turno successivo")
     relegated = models.BooleanField(default=False, help_text="Indica se la squadra è retrocessa")
@@ -47,38 +106,23 @@ class TournamentRanking(models.Model):
         verbose_name_plural = "Classifiche Tornei"
         ordering = ['tournament', 'group', '-points', '-win', 'goals_against']
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Memorizza i valori letti per riconoscere i salvataggi che non cambiano la classifica
+        if all(field in instance.__dict__ for field in cls.STANDINGS_FIELDS):
+            instance._standings_snapshot = instance.standings_snapshot()
+        return instance
+
+    def standings_snapshot(self):
+        """Restituisce i campi della classifica come dizionario (vedi ``STANDINGS_FIELDS``)"""
+        return {field: getattr(self, field) for field in self.STANDINGS_FIELDS}
+
     def calculate_points(self):
         """Calcola i punti totali in base alle regole del torneo"""
-        base_points = 0
-
-        # Prima vediamo se ci sono regole specifiche
-        rules = self.tournament.rules.filter(is_active=True)
-
-        if rules.exists():
-            # Se ci sono regole specifiche, le seguiamo
-            for rule in rules:
-                if rule.rule_type == 'point_win':
-                    base_points += self.win * rule.value
-                elif rule.rule_type == 'point_draw':
-                    base_points += self.draw * rule.value
-                elif rule.rule_type == 'point_loss':
-                    base_points += self.loss * rule.value
-                elif rule.rule_type == 'win_penalty':
-                    base_points += self.win_penalty * rule.value
-                elif rule.rule_type == 'loss_penalty':
-                    base_points -= self.loss_penalty * rule.value
-        else:
-            # Altrimenti usiamo le regole generali dalla struttura del torneo
-            structure = self.tournament.structure
-            base_points += self.win * structure.POINTS_WIN
-            base_points += self.draw * structure.POINTS_DRAW
-            base_points += self.loss * structure.POINTS_LOSS
-
-            # Aggiungiamo punti per vittorie/sconfitte ai rigori e ai tempi supplementari
-            base_points += self.win_penalty * structure.POINTS_WIN_SHOOTOUT
-            base_points += self.loss_penalty * structure.POINTS_LOSS_SHOOTOUT
-            base_points += self.win_extra_time * structure.POINTS_WIN_EXTRA_TIME
-            base_points += self.loss_extra_time * structure.POINTS_LOSS_EXTRA_TIME
+        # Regole specifiche del torneo se presenti, altrimenti quelle della struttura
+        weights = self.tournament.get_points_weights()
+        base_points = sum(getattr(self, field) * value for field, value in weights.items())
 
         # Sottraiamo eventuali penalizzazioni
         total_points = base_points - self.points_penalty
@@ -94,103 +138,29 @@ class TournamentRanking(models.Model):
         """Aggiorna le statistiche partite (gol fatti/subiti)"""
         from .match import Match
 
-        # Partite in casa
-        home_matches = Match.objects.filter(
-            tournament=self.tournament,
-            home_team=self.team.team,
-            played=True
-        )
-
-        # Partite in trasferta
-        away_matches = Match.objects.filter(
+        # Partite giocate in casa e in trasferta in un'unica query
+        team_id = self.team.team_id
+        matches = Match.objects.filter(
+            Q(home_team_id=team_id) | Q(away_team_id=team_id),
             tournament=self.tournament,
-            away_team=self.team.team,
-            played=True
-        )
+            played=True,
+        ).values(*Match.RESULT_FIELDS)
 
         # Reset statistiche
-        self.win = 0
-        self.draw = 0
-        self.loss = 0
-        self.win_penalty = 0
-        self.loss_penalty = 0
-        self.win_extra_time = 0
-        self.loss_extra_time = 0
-        self.goals_for = 0
-        self.goals_against = 0
-
-        # Conta vittorie, pareggi, sconfitte e gol per partite in casa
-        for match in home_matches:
-            if match.home_score is not None and match.away_score is not None:
-                self.goals_for += match.home_score
-                self.goals_against += match.away_score
-
-                # Se il torneo non consente pareggi, verifichiamo il vincitore considerando tempi supplementari/rigori
-                if match.home_score == match.away_score and not self.tournament.structure.allow_draws:
-                    # Determiniamo il vincitore in base al metodo di spareggio
-                    if match.extra_time_played:
-                        if match.home_score_extra_time > match.away_score_extra_time:
-                            self.win_extra_time += 1
-                        elif match.away_score_extra_time > match.home_score_extra_time:
-                            self.loss_extra_time += 1
-                        # Se ancora pareggio, verifichiamo i rigori
-                        elif match.penalties_played:
-                            if match.home_score_penalties > match.away_score_penalties:
-                                self.win_penalty += 1
-                            else:
-                                self.loss_penalty += 1
-                    # Se solo rigori senza supplementari
-                    elif match.penalties_played:
-                        if match.home_score_penalties > match.away_score_penalties:
-                            self.win_penalty += 1
-                        else:
-                            self.loss_penalty += 1
-                else:
-                    # Gestione normale per partite con risultato definito
-                    if match.home_score > match.away_score:
-                        self.win += 1
-                    elif match.home_score == match.away_score:
-                        self.draw += 1
-                    else:
-                        self.loss += 1
-
-        # Conta vittorie, pareggi, sconfitte e gol per partite in trasferta
-        for match in away_matches:
-            if match.home_score is not None and match.away_score is not None:
-                self.goals_for += match.away_score
-                self.goals_against += match.home_score
-
-                # Se il torneo non consente pareggi, verifichiamo il vincitore considerando tempi supplementari/rigori
-                if match.home_score == match.away_score and not self.tournament.structure.allow_draws:
-                    # Determiniamo il vincitore in base al metodo di spareggio
-                    if match.extra_time_played:
-                        if match.away_score_extra_time > match.home_score_extra_time:
-                            self.win_extra_time += 1
-                        elif match.home_score_extra_time > match.away_score_extra_time:
-                            self.loss_extra_time += 1
-                        # Se ancora pareggio, verifichiamo i rigori
-                        elif match.penalties_played:
-                            if match.away_score_penalties > match.home_score_penalties:
-                                self.win_penalty += 1
-                            else:
-                                self.loss_penalty += 1
-                    # Se solo rigori senza supplementari
-                    elif match.penalties_played:
-                        if match.away_score_penalties > match.home_score_penalties:
-                            self.win_penalty += 1
-                        else:
-                            self.loss_penalty += 1
-                else:
-                    # Gestione normale per partite con risultato definito
-                    if match.away_score > match.home_score:
-                        self.win += 1
-                    elif match.away_score == match.home_score:
-                        self.draw += 1
-                    else:
-                        self.loss += 1
+        for field in RESULT_COUNTERS + ('goals_for', 'goals_against'):
+            setattr(self, field, 0)
+
+        allow_draws = self.tournament.structure.allow_draws
+        for result in matches:
+            home, away = match_result_counters(result, allow_draws)
+            if home is None:
+                continue
+            counters = home if result['home_team_id'] == team_id else away
+            for field, value in counters.items():
+                setattr(self, field, getattr(self, field) + value)
 
         # Aggiorna il totale partite giocate
-        self.matches_played = self.win + self.draw + self.loss + self.win_penalty + self.loss_penalty + self.win_extra_time + self.loss_extra_time
+        self.matches_played = sum(getattr(self, field) for field in RESULT_COUNTERS)
 
         # Calcola i punti
         self.calculate_points()
@@ -199,20 +169,12 @@ class TournamentRanking(models.Model):
 
     def get_ranking_position(self):
         """Calcola la posizione in classifica del team"""
-        filters = {'tournament': self.tournament}
-
-        # Se il torneo ha gironi, filtra per lo stesso girone
-        if self.group:
-            filters['group'] = self.group
+        # Posizione già calcolata: lettura immediata
+        if self.position is not None:
+            return self.position
 
-        rankings = list(TournamentRanking.objects.filter(**filters))
-        # Ordina per punti (decrescente), vittorie, differenza reti, ecc.
-        rankings.sort(key=lambda r: (-r.points, -r.win, -(r.goals_for - r.goals_against), -r.goals_for, r.team.team.name))
-
-        for index, ranking in enumerate(rankings, start=1):
-            if ranking.id == self.id:
-                return index
-        return None
+        # Posizioni non ancora salvate: l'ordine del torneo si calcola una volta, senza scriverlo
+        return self.tournament.computed_positions().get(self.id)
 
     def get_goal_difference(self):
         """Calcola la differenza reti"""
@@ -220,13 +182,9 @@ class TournamentRanking(models.Model):
 
     def get_complete_ranking(self):
         """Restituisce la classifica completa del torneo/girone"""
-        filters = {'tournament': self.tournament}
-
-        if self.group:
-            filters['group'] = self.group
+        from core.services.ranking import order_rankings
 
-        rankings = list(TournamentRanking.objects.filter(**filters))
-        rankings.sort(key=lambda r: (-r.points, -r.win, -(r.goals_for - r.goals_against), -r.goals_for, r.team.team.name))
+        rankings = order_rankings(self.tournament, group=self.group)
 
         result = []
         for position, ranking in enumerate(rankings, start=1):
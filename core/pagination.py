@@ -0,0 +1,44 @@
+"""
+Paginazione delle API.
+
+Tutte le liste del router sono paginate per numero di pagina
+(``StandardPagination``). Le collezioni più grandi (giocatori, partite,
+punteggi fanta, transazioni) usano invece una paginazione a cursore
+(keyset): ogni pagina è una query ``WHERE chiave > ultimo valore LIMIT n`` su
+un ordinamento coperto da indice, quindi il costo non cresce con la posizione
+della pagina e non serve un ``COUNT(*)`` sull'intera tabella.
+"""
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class StandardPagination(PageNumberPagination):
+    """Paginazione per numero di pagina, con dimensione scelta dal client (``?page_size=``)"""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Senza un ordinamento le pagine non sono stabili: si ordina per chiave primaria
+        if hasattr(queryset, 'ordered') and not queryset.ordered:
+            queryset = queryset.order_by('pk')
+        return super().paginate_queryset(queryset, request, view)
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Paginazione a cursore (``?cursor=``).
+
+    L'ordinamento è letto dall'attributo ``cursor_ordering`` del viewset e deve
+    essere stabile e coperto da un indice. Il cursore si posiziona solo sul
+    primo campo, che non può essere nullo (un valore NULL nel cursore non è
+    valido) e in caso di valori uguali usa uno scostamento: va quindi scelto un
+    campo non nullo e quasi univoco.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = 'id'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', None) or self.ordering
+        return (ordering,) if isinstance(ordering, str) else tuple(ordering)
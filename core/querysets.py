@@ -0,0 +1,113 @@
+"""
+Ottimizzazione delle queryset dei viewset a partire dai serializer.
+
+``serializer_relations`` percorre l'albero dei campi di un serializer e
+ricava le relazioni che verrebbero lette durante la serializzazione:
+le relazioni a valore singolo (ForeignKey, OneToOne) raggiungibili senza
+passare da una relazione multipla finiscono in ``select_related``, tutte le
+altre (ManyToMany, relazioni inverse e ciò che sta sotto di esse) in
+``prefetch_related``. In questo modo una lista costa un numero di query
+costante, indipendente dal numero di oggetti.
+"""
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField, RelatedField
+
+
+def _needs_object(field):
+    """True se il campo legge l'oggetto collegato e non solo la sua chiave"""
+    if isinstance(field, PrimaryKeyRelatedField):
+        return not field.use_pk_only_optimization()
+    return True
+
+
+def _walk(serializer, model, prefix, in_prefetch, select, prefetch):
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+
+        nested = None
+        source_attrs = field.source_attrs
+        if isinstance(field, serializers.ListSerializer):
+            nested = field.child
+        elif isinstance(field, serializers.BaseSerializer):
+            nested = field
+        elif isinstance(field, ManyRelatedField):
+            # Anche le sole chiavi di una relazione multipla richiedono una query
+            pass
+        elif isinstance(field, RelatedField):
+            if not _needs_object(field):
+                # La chiave dell'ultima relazione si legge dall'oggetto che la contiene
+                source_attrs = source_attrs[:-1]
+        else:
+            continue
+
+        # Segue la sorgente del campo (es. 'team' o 'team.owner') sul modello
+        current_model, path, many = model, prefix, in_prefetch
+        for attr in source_attrs:
+            try:
+                model_field = current_model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                current_model = None
+                break
+            if not model_field.is_relation:
+                current_model = None
+                break
+            path = f"{path}__{attr}" if path else attr
+            many = many or model_field.many_to_many or model_field.one_to_many
+            (prefetch if many else select).add(path)
+            current_model = model_field.related_model
+
+        if nested is not None and current_model is not None:
+            _walk(nested, current_model, path, many, select, prefetch)
+
+
+@lru_cache(maxsize=None)
+def serializer_relations(serializer_class):
+    """
+    Relazioni da caricare in anticipo per serializzare il modello del serializer.
+
+    Returns:
+        Tupla (campi per ``select_related``, campi per ``prefetch_related``)
+    """
+    serializer = serializer_class()
+    select, prefetch = set(), set()
+    _walk(serializer, serializer.Meta.model, '', False, select, prefetch)
+
+    # select_related('a__b') include già 'a'; prefetch_related('a__b') prefetcha anche 'a'
+    select = {path for path in select if not any(other.startswith(f"{path}__") for other in select)}
+    prefetch = {path for path in prefetch if not any(other.startswith(f"{path}__") for other in prefetch)}
+    return tuple(sorted(select)), tuple(sorted(prefetch))
+
+
+def optimize_queryset(queryset, serializer_class):
+    """Applica a ``queryset`` le relazioni ricavate da ``serializer_class``"""
+    select, prefetch = serializer_relations(serializer_class)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+class OptimizedQuerysetMixin:
+    """
+    Mixin per i viewset: carica in anticipo le relazioni lette dal serializer.
+
+    Le relazioni possono essere indicate a mano con ``select_related_fields`` e
+    ``prefetch_related_fields``; di default vengono ricavate dal serializer.
+    """
+    select_related_fields = None
+    prefetch_related_fields = None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.select_related_fields is None and self.prefetch_related_fields is None:
+            return optimize_queryset(queryset, self.get_serializer_class())
+        if self.select_related_fields:
+            queryset = queryset.select_related(*self.select_related_fields)
+        if self.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*self.prefetch_related_fields)
+        return queryset
@@ -0,0 +1,269 @@
+"""
+Aggiornamenti in tempo reale via WebSocket.
+
+I client si iscrivono a un gruppo aprendo ``/ws/leagues/<id>/`` (offerte e
+aggiudicazioni dell'asta live della lega, riservate all'amministratore e alle
+squadre della lega, riconosciuti dalla sessione) oppure ``/ws/tournaments/<id>/``
+(risultati ed eventi delle partite del torneo, pubblici come le API). Il codice sincrono pubblica
+con ``push``, che non blocca mai: i messaggi vengono appoggiati nel buffer di
+ogni iscritto e inviati dal suo task di scrittura.
+
+Il buffer di ogni socket coalesce i messaggi con la stessa chiave (es. il
+punteggio di una partita o l'offerta in testa su un giocatore): un client lento
+riceve solo lo stato più recente. Se il buffer supera ``MAX_PENDING`` messaggi
+viene svuotato e il client riceve un messaggio ``resync``, con cui rilegge lo
+stato dalle API REST: la memoria per socket resta limitata e chi pubblica non
+aspetta mai i client lenti.
+
+``InMemoryChannelLayer`` distribuisce i messaggi nel solo processo corrente;
+con più processi ASGI va indicato in ``REALTIME_CHANNEL_LAYER`` un layer con
+la stessa interfaccia basato su un broker condiviso.
+"""
+import asyncio
+import itertools
+import json
+import re
+import threading
+from collections import OrderedDict
+from importlib import import_module
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.http import parse_cookie
+from django.utils.module_loading import import_string
+
+from core.models import FantaLeague
+
+MAX_PENDING = 256
+DEFAULT_CHANNEL_LAYER = 'core.realtime.InMemoryChannelLayer'
+
+
+def league_group(league_id):
+    """Gruppo degli aggiornamenti dell'asta di una ``FantaLeague``"""
+    return f"league:{league_id}"
+
+
+def tournament_group(tournament_id):
+    """Gruppo dei risultati e degli eventi delle partite di un torneo"""
+    return f"tournament:{tournament_id}"
+
+
+class Subscription:
+    """
+    Buffer dei messaggi destinati a un socket.
+
+    ``put`` può essere chiamato da qualunque thread; ``get`` va atteso nel loop
+    del socket e restituisce tutti i messaggi accumulati dall'ultimo invio.
+    """
+
+    def __init__(self, loop, max_pending=MAX_PENDING):
+        self.loop = loop
+        self.max_pending = max_pending
+        self._pending = OrderedDict()
+        self._overflow = False
+        self._lock = threading.Lock()
+        self._ready = asyncio.Event()
+        self._sequence = itertools.count()
+
+    def put(self, message, key=None):
+        """Accoda un messaggio; un messaggio con la stessa chiave di uno in attesa lo sostituisce"""
+        if key is None:
+            key = ('unique', next(self._sequence))
+        with self._lock:
+            wake = not self._pending and not self._overflow
+            if key in self._pending:
+                self._pending[key] = message
+            elif len(self._pending) >= self.max_pending:
+                # Client troppo lento: i messaggi vengono scartati e lo stato andrà riletto
+                self._pending.clear()
+                self._overflow = True
+            else:
+                self._pending[key] = message
+        if wake:
+            try:
+                self.loop.call_soon_threadsafe(self._ready.set)
+            except RuntimeError:
+                # Loop già chiuso: il socket si sta disconnettendo
+                pass
+
+    def drain(self):
+        """
+        Svuota il buffer.
+
+        Returns:
+            Tupla (messaggi in ordine di arrivo, True se dei messaggi sono stati scartati)
+        """
+        with self._lock:
+            messages = list(self._pending.values())
+            overflow = self._overflow
+            self._pending.clear()
+            self._overflow = False
+            self._ready.clear()
+        return messages, overflow
+
+    async def get(self):
+        """Attende e restituisce i messaggi accumulati (vedi ``drain``)"""
+        while True:
+            await self._ready.wait()
+            messages, overflow = self.drain()
+            if messages or overflow:
+                return messages, overflow
+
+
+class InMemoryChannelLayer:
+    """Layer che distribuisce i messaggi agli iscritti dei gruppi nel processo corrente"""
+
+    def __init__(self):
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, group, subscription):
+        with self._lock:
+            self._groups.setdefault(group, set()).add(subscription)
+
+    def unsubscribe(self, group, subscription):
+        with self._lock:
+            subscribers = self._groups.get(group)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._groups[group]
+
+    def subscribers(self, group):
+        with self._lock:
+            return len(self._groups.get(group, ()))
+
+    def publish(self, group, message, key=None):
+        with self._lock:
+            subscribers = list(self._groups.get(group, ()))
+        for subscription in subscribers:
+            subscription.put(message, key)
+
+
+_layer = None
+_layer_lock = threading.Lock()
+
+
+def get_channel_layer():
+    """Layer configurato in ``REALTIME_CHANNEL_LAYER``, creato alla prima richiesta"""
+    global _layer
+    with _layer_lock:
+        if _layer is None:
+            _layer = import_string(getattr(settings, 'REALTIME_CHANNEL_LAYER', DEFAULT_CHANNEL_LAYER))()
+        return _layer
+
+
+def push(group, message_type, payload, key=None):
+    """
+    Pubblica un messaggio agli iscritti di un gruppo.
+
+    Args:
+        group: gruppo di destinazione (vedi ``league_group`` e ``tournament_group``)
+        message_type: tipo del messaggio (es. 'bid', 'score', 'event')
+        payload: dizionario serializzabile in JSON
+        key: chiave di coalescenza; None per i messaggi che vanno consegnati tutti
+    """
+    get_channel_layer().publish(group, {'type': message_type, **payload}, key)
+
+
+def push_match_result(match_id, result):
+    """Invia il nuovo risultato ai client del torneo (gli aggiornamenti ravvicinati della stessa partita vengono accorpati)"""
+    payload = {'match': match_id, **{field: value for field, value in result.items() if field != 'tournament_id'}}
+    transaction.on_commit(
+        lambda: push(tournament_group(result['tournament_id']), 'score', payload, key=f"match:{match_id}")
+    )
+
+
+def session_user(scope):
+    """Utente della sessione indicata dal cookie della richiesta di apertura del socket"""
+    headers = dict(scope.get('headers', ()))
+    cookies = parse_cookie(headers.get(b'cookie', b'').decode('latin-1'))
+    session = import_module(settings.SESSION_ENGINE).SessionStore(cookies.get(settings.SESSION_COOKIE_NAME))
+    return get_user(SimpleNamespace(session=session))
+
+
+def is_league_member(scope, league_id):
+    """Indica se l'utente della sessione amministra la lega o vi partecipa con una squadra"""
+    user = session_user(scope)
+    if not user.is_authenticated:
+        return False
+    return FantaLeague.objects.filter(Q(admin=user) | Q(teams__owner=user), pk=league_id).exists()
+
+
+# Percorso, gruppo e controllo di accesso (None per i gruppi pubblici)
+ROUTES = (
+    (re.compile(r'^/ws/leagues/(?P<id>\d+)/?$'), league_group, is_league_member),
+    (re.compile(r'^/ws/tournaments/(?P<id>\d+)/?$'), tournament_group, None),
+)
+
+
+def resolve_group(path):
+    """
+    Gruppo corrispondente al percorso del socket.
+
+    Returns:
+        Tupla (gruppo, id, controllo di accesso), oppure None se il percorso non è valido
+    """
+    for pattern, group, check in ROUTES:
+        match = pattern.match(path)
+        if match:
+            object_id = int(match.group('id'))
+            return group(object_id), object_id, check
+    return None
+
+
+async def _write(subscription, send):
+    while True:
+        messages, overflow = await subscription.get()
+        if overflow:
+            messages = [{'type': 'resync'}] + messages
+        # Un solo frame per tutti i messaggi accumulati durante l'invio precedente
+        await send({'type': 'websocket.send', 'text': json.dumps({'messages': messages}, cls=DjangoJSONEncoder)})
+
+
+async def websocket_application(scope, receive, send):
+    """Applicazione ASGI dei socket: iscrive il client al gruppo del percorso e gli invia i messaggi"""
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    route = resolve_group(scope['path'])
+    if route is None:
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+    group, object_id, check = route
+    if check is not None and not await sync_to_async(check)(scope, object_id):
+        await send({'type': 'websocket.close', 'code': 4403})
+        return
+    await send({'type': 'websocket.accept'})
+
+    layer = get_channel_layer()
+    subscription = Subscription(asyncio.get_running_loop(), getattr(settings, 'REALTIME_MAX_PENDING', MAX_PENDING))
+    layer.subscribe(group, subscription)
+    writer = asyncio.create_task(_write(subscription, send))
+    try:
+        while True:
+            # I messaggi del client vengono ignorati: il canale è in sola lettura
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+    finally:
+        layer.unsubscribe(group, subscription)
+        writer.cancel()
+        try:
+            await writer
+        except (asyncio.CancelledError, OSError):
+            pass
+
+
+def router(http_application):
+    """Applicazione ASGI che serve i socket e passa tutto il resto a ``http_application``"""
+    async def application(scope, receive, send):
+        if scope['type'] == 'websocket':
+            return await websocket_application(scope, receive, send)
+        return await http_application(scope, receive, send)
+    return application
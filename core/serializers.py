@@ -174,6 +174,18 @@ class PlayerStatisticsSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class FantaScoreSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = models.FantaScore
+        fields = '__all__'
+
+
+class MarketTransactionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = models.MarketTransaction
+        fields = '__all__'
+
+
 class TrophySerializer(serializers.ModelSerializer):
     class Meta:
         model = models.Trophy
@@ -295,3 +307,70 @@ class TournamentSerializer(serializers.ModelSerializer):
             instance.teams.set(team_instances)  # sostituisce tutti i team
 
         return instance
+
+
+class TournamentGenerationSerializer(serializers.Serializer):
+    """Parametri per la generazione asincrona di un torneo con ``TournamentFactory``"""
+    structure = serializers.PrimaryKeyRelatedField(queryset=models.TournamentStructure.objects.all())
+    season = serializers.PrimaryKeyRelatedField(queryset=models.Season.objects.all())
+    name = serializers.CharField(max_length=100)
+    teams = serializers.PrimaryKeyRelatedField(queryset=models.Team.objects.all(), many=True)
+    description = serializers.CharField(required=False, allow_blank=True, default="")
+    start_date = serializers.DateField(required=False, allow_null=True, default=None)
+    other_tournament = serializers.PrimaryKeyRelatedField(
+        queryset=models.Tournament.objects.all(), required=False, allow_null=True, default=None
+    )
+    direct_rule = serializers.PrimaryKeyRelatedField(
+        queryset=models.TournamentQualificationRule.objects.all(), required=False, allow_null=True, default=None
+    )
+    playoff_rule = serializers.PrimaryKeyRelatedField(
+        queryset=models.TournamentQualificationRule.objects.all(), required=False, allow_null=True, default=None
+    )
+    seed = serializers.IntegerField(required=False, allow_null=True, default=None)
+
+    def validate_teams(self, value):
+        if len(value) < 2:
+            raise serializers.ValidationError("Devi fornire almeno 2 squadre")
+        return value
+
+    def validate(self, attrs):
+        if models.Tournament.objects.filter(name=attrs['name'], season=attrs['season']).exists():
+            raise serializers.ValidationError({'name': "Torneo già esistente per la stagione"})
+        return attrs
+
+    def to_task_params(self):
+        """Parametri serializzabili in JSON per ``core.task.generate_tournament``"""
+        data = self.validated_data
+        return {
+            'structure': data['structure'].pk,
+            'season': data['season'].pk,
+            'name': data['name'],
+            'teams': [team.pk for team in data['teams']],
+            'description': data['description'],
+            'start_date': data['start_date'].isoformat() if data['start_date'] else None,
+            'other_tournament': data['other_tournament'].pk if data['other_tournament'] else None,
+            'direct_rule': data['direct_rule'].pk if data['direct_rule'] else None,
+            'playoff_rule': data['playoff_rule'].pk if data['playoff_rule'] else None,
+            'seed': data['seed'],
+        }
+
+
+class LiveBidSerializer(serializers.Serializer):
+    """Offerta nell'asta live di una lega"""
+    player = serializers.IntegerField()
+    amount = serializers.IntegerField(min_value=1)
+
+
+class StandingsSnapshotSerializer(serializers.ModelSerializer):
+    """Riga di classifica pronta per essere mostrata"""
+    team_id = serializers.IntegerField(source='team.team_id', read_only=True)
+    team_name = serializers.CharField(source='team.team.name', read_only=True)
+    team_code = serializers.CharField(source='team.team.code', read_only=True)
+
+    class Meta:
+        model = models.StandingsSnapshot
+        fields = [
+            'position', 'group', 'team', 'team_id', 'team_name', 'team_code',
+            'played', 'win', 'draw', 'loss', 'goals_for', 'goals_against', 'goal_difference',
+            'points', 'form', 'qualified', 'relegated',
+        ]
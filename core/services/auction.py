@@ -0,0 +1,401 @@
+"""
+Asta live del fantacalcio.
+
+Durante un'asta live le offerte arrivano a raffica da tutte le squadre della
+lega: ``LiveAuction`` tiene in memoria, per ogni giocatore all'asta, un heap di
+offerte ordinato per importo e arrivo, con un timer che riparte a ogni rilancio.
+Budget e posti liberi in rosa di ogni squadra sono contatori aggiornati a ogni
+offerta, così la validazione costa O(log n) e non tocca il database.
+
+Le offerte accettate e le aggiudicazioni vengono scritte a blocchi in
+``AuctionBid`` e ``MarketTransaction``; le aggiudicazioni sono poi regolate da
+``core.services.market`` insieme ai budget e alle rose. Offerte e
+aggiudicazioni vengono inviate ai client iscritti alla lega (vedi ``core.realtime``).
+
+Lo stato dell'asta vive nella memoria del processo che la gestisce: le API di
+``/api/fanta_league/<id>/auction/`` usano ``get_live_auction`` e un thread del
+processo chiama ``tick`` a intervalli regolari, così i giocatori vengono
+aggiudicati allo scadere del timer anche senza nuove offerte. Ogni asta deve
+quindi girare in un solo processo: il primo che la apre ne diventa proprietario
+con una chiave nella cache condivisa (``REDIS_URL``) e gli altri rifiutano le
+offerte con ``AuctionUnavailable``; con più worker le richieste dell'asta vanno
+instradate a un unico processo.
+"""
+import heapq
+import itertools
+import logging
+import os
+import socket
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.utils import timezone
+
+from core.models import AuctionBid, FantaTeamPlayer, MarketTransaction, Player
+from core.realtime import league_group, push
+from core.services.market import settle_batch
+
+logger = logging.getLogger("transfer")
+
+# Posti in rosa per macro-ruolo (rosa classica da 25 giocatori)
+ROLE_QUOTAS = {'P': 3, 'D': 8, 'C': 8, 'A': 6}
+MIN_INCREMENT = 1
+BID_TIMER = 10
+FLUSH_SIZE = 50
+TICK_INTERVAL = 1.0
+OWNER_KEY = "live_auction_owner:{}"
+OWNER_TIMEOUT = 60
+
+
+class AuctionUnavailable(Exception):
+    """L'asta live della lega è gestita da un altro processo"""
+
+
+class _Lot:
+    """Giocatore all'asta: heap delle offerte e scadenza del timer"""
+
+    def __init__(self, player_id, role, deadline):
+        self.player_id = player_id
+        self.role = role
+        self.deadline = deadline
+        # Elementi (-importo, progressivo, id squadra, AuctionBid): in testa l'offerta più alta e, a parità, la prima
+        self.book = []
+
+    @property
+    def leader(self):
+        """Tupla (id squadra, importo) dell'offerta in testa"""
+        amount, _, team_id, _ = self.book[0]
+        return team_id, -amount
+
+
+class _TeamState:
+    """Budget e posti in rosa di una squadra, compresi quelli impegnati dalle offerte in testa"""
+
+    def __init__(self, team_id, owner_id, budget, roles):
+        self.team_id = team_id
+        self.owner_id = owner_id
+        self.budget = budget
+        self.committed = 0
+        self.roles = Counter(roles)
+        self.leading = Counter()
+
+    def open_slots(self, quotas, role=None):
+        if role is not None:
+            return quotas.get(role, 0) - self.roles[role] - self.leading[role]
+        return sum(quotas.values()) - sum(self.roles.values()) - sum(self.leading.values())
+
+
+class LiveAuction:
+    """
+    Motore di un'asta live per una ``FantaLeague``.
+
+    Args:
+        league: lega dell'asta; budget e rose delle sue squadre vengono letti una volta sola
+        quotas: posti in rosa per macro-ruolo
+        timer: secondi senza rilanci dopo i quali il giocatore viene aggiudicato
+        min_increment: rilancio minimo in crediti
+        flush_size: offerte accettate da accumulare prima di scriverle nel database
+        clock: funzione che restituisce l'istante corrente in secondi
+    """
+
+    def __init__(self, league, quotas=None, timer=BID_TIMER, min_increment=MIN_INCREMENT,
+                 flush_size=FLUSH_SIZE, clock=time.monotonic):
+        self.league = league
+        self.quotas = dict(quotas or ROLE_QUOTAS)
+        self.timer = timer
+        self.min_increment = min_increment
+        self.flush_size = flush_size
+        self.clock = clock
+
+        # ``_lock`` protegge lo stato in memoria; ``_write_lock`` mette in fila le scritture, che
+        # avvengono fuori da ``_lock`` così le offerte non aspettano il database
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._sequence = itertools.count()
+        self._lots = {}
+        # Elementi (scadenza, progressivo, id giocatore); le scadenze superate dai rilanci vengono scartate
+        self._deadlines = []
+        self._pending_bids = []
+        self._pending_wins = []
+        self._winning_bids = []
+
+        roles = {}
+        owned = set()
+        rows = FantaTeamPlayer.objects.filter(fanta_team__leagues=league, is_active=True)
+        for team_id, player_id, role in rows.values_list('fanta_team_id', 'player_id', 'player__main_role'):
+            roles.setdefault(team_id, []).append(Player.ROLE_CATEGORIES.get(role))
+            owned.add(player_id)
+        self._owned = owned
+        self._teams = {
+            team_id: _TeamState(team_id, owner_id, budget, roles.get(team_id, []))
+            for team_id, owner_id, budget in league.teams.values_list('id', 'owner_id', 'budget')
+        }
+
+    def _max_bid(self, team):
+        """Offerta massima: la squadra deve poter completare la rosa con un rilancio minimo per posto"""
+        available = team.budget - team.committed
+        return available - (team.open_slots(self.quotas) - 1) * self.min_increment
+
+    def bid(self, team_id, player_id, amount):
+        """
+        Registra un'offerta; la prima offerta su un giocatore lo mette all'asta.
+
+        Returns:
+            Stato del giocatore all'asta dopo l'offerta (vedi ``lot_state``)
+
+        Raises:
+            ValueError: se l'offerta non è valida
+        """
+        with self._lock:
+            now = self.clock()
+            self._close_expired(now)
+
+            team = self._teams.get(team_id)
+            if team is None:
+                raise ValueError("La squadra non partecipa all'asta")
+
+            lot = self._lots.get(player_id)
+            if lot is None:
+                if player_id in self._owned:
+                    raise ValueError("Il giocatore è già stato acquistato")
+                role = Player.ROLE_CATEGORIES.get(
+                    Player.objects.filter(pk=player_id).values_list('main_role', flat=True).first()
+                )
+                if role not in self.quotas:
+                    raise ValueError("Giocatore inesistente o senza ruolo")
+                lot = _Lot(player_id, role, now + self.timer)
+                minimum = self.min_increment
+                leader_id = None
+            else:
+                leader_id, leading_amount = lot.leader
+                minimum = leading_amount + self.min_increment
+                if leader_id == team_id:
+                    raise ValueError("La squadra ha già l'offerta più alta")
+
+            if amount < minimum:
+                raise ValueError(f"L'offerta minima è di {minimum} crediti")
+            if team.open_slots(self.quotas, lot.role) < 1:
+                raise ValueError(f"Nessun posto libero in rosa per il ruolo {lot.role}")
+            if amount > self._max_bid(team):
+                raise ValueError("Budget insufficiente")
+
+            # Il precedente leader libera crediti e posto in rosa
+            if leader_id is not None:
+                previous = self._teams[leader_id]
+                previous.committed -= leading_amount
+                previous.leading[lot.role] -= 1
+            team.committed += amount
+            team.leading[lot.role] += 1
+
+            bid = AuctionBid(
+                league_id=self.league.id, team_id=team_id, player_id=player_id, amount=amount, timestamp=timezone.now()
+            )
+            self._pending_bids.append(bid)
+            self._lots[player_id] = lot
+            heapq.heappush(lot.book, (-amount, next(self._sequence), team_id, bid))
+            lot.deadline = now + self.timer
+            heapq.heappush(self._deadlines, (lot.deadline, next(self._sequence), player_id))
+
+            full = len(self._pending_bids) >= self.flush_size
+            state = self.lot_state(player_id)
+            push(league_group(self.league.id), 'bid', state, key=f"lot:{player_id}")
+
+        if full:
+            self.flush()
+        return state
+
+    def lot_state(self, player_id):
+        """Offerta in testa e secondi rimanenti per un giocatore all'asta, oppure None"""
+        with self._lock:
+            lot = self._lots.get(player_id)
+            if lot is None:
+                return None
+            team_id, amount = lot.leader
+            return {
+                'player': player_id,
+                'team': team_id,
+                'amount': amount,
+                'bids': len(lot.book),
+                'remaining': max(0.0, lot.deadline - self.clock()),
+            }
+
+    def lots_state(self):
+        """Stato di tutti i giocatori all'asta (vedi ``lot_state``)"""
+        with self._lock:
+            return [self.lot_state(player_id) for player_id in self._lots]
+
+    def budget_state(self, team_id):
+        """Crediti e posti in rosa ancora disponibili per una squadra"""
+        with self._lock:
+            team = self._teams[team_id]
+            return {
+                'budget': team.budget,
+                'available': team.budget - team.committed,
+                'open_slots': {role: team.open_slots(self.quotas, role) for role in self.quotas},
+            }
+
+    def tick(self):
+        """
+        Aggiudica i giocatori il cui timer è scaduto e scrive offerte e aggiudicazioni.
+
+        Returns:
+            Lista di tuple (id giocatore, id squadra, importo) aggiudicate
+        """
+        with self._lock:
+            won = self._close_expired(self.clock())
+        if won:
+            self.flush()
+        return won
+
+    def _close_expired(self, now):
+        won = []
+        while self._deadlines and self._deadlines[0][0] <= now:
+            deadline, _, player_id = heapq.heappop(self._deadlines)
+            lot = self._lots.get(player_id)
+            if lot is None or lot.deadline != deadline:
+                continue
+            team_id, amount = lot.leader
+            # L'offerta vincente non ancora scritta viene inserita già come vincente
+            winning_bid = lot.book[0][3]
+            winning_bid.is_winning = True
+            self._winning_bids.append(winning_bid)
+            team = self._teams[team_id]
+            team.committed -= amount
+            team.budget -= amount
+            team.leading[lot.role] -= 1
+            team.roles[lot.role] += 1
+            del self._lots[player_id]
+            self._owned.add(player_id)
+            self._pending_wins.append((player_id, team_id, amount))
+            won.append((player_id, team_id, amount))
+            # Sostituisce nei buffer dei client l'ultima offerta non ancora inviata
+            push(league_group(self.league.id), 'awarded', {'player': player_id, 'team': team_id, 'amount': amount},
+                 key=f"lot:{player_id}")
+            logger.info("Asta lega %s: giocatore %s aggiudicato alla squadra %s per %s crediti",
+                        self.league.id, player_id, team_id, amount)
+        return won
+
+    def flush(self):
+        """
+        Scrive in blocco le offerte accettate e regola le aggiudicazioni.
+
+        I buffer vengono scambiati sotto ``_lock`` e scritti fuori, uno scambio
+        alla volta: le offerte di un blocco precedente hanno già la chiave
+        primaria quando un blocco successivo le segna come vincenti.
+        """
+        with self._write_lock:
+            with self._lock:
+                bids, self._pending_bids = self._pending_bids, []
+                wins, self._pending_wins = self._pending_wins, []
+                winning, self._winning_bids = self._winning_bids, []
+            self._write(bids, wins, winning)
+
+    def _write(self, bids, wins, winning):
+        if bids:
+            AuctionBid.objects.bulk_create(bids)
+        if winning:
+            AuctionBid.objects.filter(pk__in=[bid.pk for bid in winning]).update(is_winning=True)
+        if not wins:
+            return
+
+        transactions = MarketTransaction.objects.bulk_create([
+            MarketTransaction(
+                transaction_type='buy', league_id=self.league.id, created_by_id=self._teams[team_id].owner_id,
+                team_id=team_id, player_id=player_id, price=amount, notes="Asta live",
+            )
+            for player_id, team_id, amount in wins
+        ])
+        settle_batch([tx.pk for tx in transactions])
+
+    def close(self):
+        """Aggiudica tutti i giocatori ancora all'asta e scrive tutto nel database"""
+        with self._lock:
+            won = self._close_expired(float('inf'))
+        self.flush()
+        return won
+
+
+_auctions = {}
+_auctions_lock = threading.Lock()
+_ticker = None
+
+
+def _process_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def get_live_auction(league, **options):
+    """
+    Motore dell'asta live della lega, creato alla prima richiesta e condiviso nel processo.
+
+    Raises:
+        AuctionUnavailable: se l'asta della lega è già aperta in un altro processo
+    """
+    with _auctions_lock:
+        auction = _auctions.get(league.id)
+        if auction is None:
+            key, owner = OWNER_KEY.format(league.id), _process_id()
+            if not cache.add(key, owner, OWNER_TIMEOUT) and cache.get(key) != owner:
+                raise AuctionUnavailable(f"L'asta della lega {league.id} è gestita da un altro processo")
+            auction = _auctions[league.id] = LiveAuction(league, **options)
+            _start_ticker()
+        return auction
+
+
+def close_live_auction(league):
+    """Chiude l'asta live della lega, aggiudicando i giocatori ancora aperti"""
+    with _auctions_lock:
+        auction = _auctions.pop(league.id, None)
+    if auction is None:
+        return []
+    won = auction.close()
+    cache.delete(OWNER_KEY.format(league.id))
+    return won
+
+
+def tick_live_auctions():
+    """
+    Aggiudica i giocatori scaduti in tutte le aste del processo e rinnova la
+    proprietà delle leghe nella cache condivisa.
+
+    Returns:
+        Lista di tuple (id giocatore, id squadra, importo) aggiudicate
+    """
+    with _auctions_lock:
+        auctions = list(_auctions.values())
+    won = []
+    for auction in auctions:
+        cache.touch(OWNER_KEY.format(auction.league.id), OWNER_TIMEOUT)
+        try:
+            won.extend(auction.tick())
+        except Exception:
+            logger.exception("Asta lega %s: aggiudicazione non riuscita", auction.league.id)
+    return won
+
+
+def _run_ticker(interval):
+    global _ticker
+    while True:
+        time.sleep(interval)
+        with _auctions_lock:
+            if not _auctions:
+                # Nessuna asta aperta: il thread termina e riparte con la prossima
+                _ticker = None
+                return
+        try:
+            tick_live_auctions()
+        finally:
+            close_old_connections()
+
+
+def _start_ticker():
+    """Avvia il thread che chiama ``tick`` ogni ``LIVE_AUCTION_TICK`` secondi (0 lo disattiva)"""
+    global _ticker
+    interval = getattr(settings, 'LIVE_AUCTION_TICK', TICK_INTERVAL)
+    if _ticker is None and interval:
+        _ticker = threading.Thread(target=_run_ticker, args=(interval,), name="live-auction-ticker", daemon=True)
+        _ticker.start()
@@ -0,0 +1,231 @@
+"""
+Asta automatica del fantacalcio.
+
+Nelle leghe con asta automatica nessuno fa offerte: ogni squadra ordina i
+giocatori che desidera (``AuctionPreference``) e ``allocate_auto_auction``
+distribuisce la rosa completa a tutte le squadre. Il problema si divide per
+macro-ruolo, perché ogni giocatore occupa solo i posti del proprio ruolo: per
+ogni ruolo si risolve un problema di assegnazione tra i posti delle squadre e i
+giocatori disponibili, minimizzando il costo con l'algoritmo ungherese.
+
+L'utilità di un giocatore per una squadra è il suo ``fanta_value`` normalizzato
+più un bonus per la posizione nella lista delle preferenze. Il k-esimo posto di
+ogni squadra in un ruolo pesa ``1 / (k + 1)``: come in un draft a serpentina, i
+giocatori migliori vengono distribuiti tra le squadre invece di finire tutti
+nella stessa. Un rumore minimo generato dal seed rompe le parità, così lo
+stesso seed produce sempre la stessa assegnazione.
+
+I prezzi sono proporzionali al ``fanta_value``, con lo stesso fattore per tutta
+la lega, scelto in modo che ogni rosa stia nel budget della squadra.
+"""
+import logging
+import math
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+from django.db import transaction
+
+from core.models import AuctionPreference, FantaTeam, FantaTeamPlayer, MarketTransaction, Player
+from core.services.auction import ROLE_QUOTAS
+from core.services.market import settle_batch
+
+logger = logging.getLogger("transfer")
+
+PREFERENCE_WEIGHT = 1.0
+TIE_BREAK_NOISE = 1e-6
+
+
+def solve_assignment(cost):
+    """
+    Assegnazione di costo minimo per una matrice rettangolare (algoritmo ungherese).
+
+    Ogni riga viene assegnata a una colonna diversa; se le righe sono più delle
+    colonne restano senza colonna le righe in eccesso.
+
+    Args:
+        cost: matrice NumPy (righe x colonne) dei costi
+
+    Returns:
+        Lista di tuple (riga, colonna) assegnate
+    """
+    cost = np.asarray(cost, dtype=float)
+    if cost.size == 0:
+        return []
+    if cost.shape[0] > cost.shape[1]:
+        return sorted((row, col) for col, row in solve_assignment(cost.T))
+
+    n, m = cost.shape
+    # Potenziali di righe e colonne; le colonne sono indicizzate da 1, la colonna 0 è fittizia
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    owner = np.zeros(m + 1, dtype=int)
+    way = np.zeros(m + 1, dtype=int)
+
+    for row in range(1, n + 1):
+        owner[0] = row
+        col = 0
+        min_reduced = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        # Cammino aumentante più corto dalla nuova riga a una colonna libera
+        while True:
+            used[col] = True
+            current = owner[col]
+            free = ~used[1:]
+            reduced = cost[current - 1] - u[current] - v[1:]
+            better = free & (reduced < min_reduced[1:])
+            min_reduced[1:][better] = reduced[better]
+            way[1:][better] = col
+            candidates = np.where(free, min_reduced[1:], np.inf)
+            next_col = int(np.argmin(candidates)) + 1
+            delta = candidates[next_col - 1]
+            used_cols = np.flatnonzero(used)
+            u[owner[used_cols]] += delta
+            v[used_cols] -= delta
+            min_reduced[1:][free] -= delta
+            col = next_col
+            if owner[col] == 0:
+                break
+        # Inverte il cammino aumentante
+        while col:
+            previous = way[col]
+            owner[col] = owner[previous]
+            col = previous
+
+    return [(owner[col] - 1, col - 1) for col in range(1, m + 1) if owner[col]]
+
+
+def allocate(teams, players, preferences, quotas=None, seed=0):
+    """
+    Calcola l'assegnazione dei giocatori ai posti liberi delle squadre.
+
+    Args:
+        teams: dizionario {id squadra: Counter dei posti già occupati per macro-ruolo}
+        players: dizionario {id giocatore: (macro-ruolo, fanta_value)}
+        preferences: dizionario {id squadra: lista di id giocatore dal preferito}
+        quotas: posti in rosa per macro-ruolo
+        seed: seed del rumore che rompe le parità
+
+    Returns:
+        Dizionario {id squadra: lista di id giocatore assegnati}
+    """
+    quotas = quotas or ROLE_QUOTAS
+    rng = np.random.default_rng(seed)
+    team_ids = sorted(teams)
+    top_value = max((value for _, value in players.values()), default=0) or 1
+
+    bonus = {}
+    for team_id, ranked in preferences.items():
+        for position, player_id in enumerate(ranked):
+            bonus[team_id, player_id] = PREFERENCE_WEIGHT * (len(ranked) - position) / len(ranked)
+
+    allocation = {team_id: [] for team_id in team_ids}
+    for role, quota in quotas.items():
+        pool = sorted(player_id for player_id, (player_role, _) in players.items() if player_role == role)
+        slots = [
+            (team_id, k) for team_id in team_ids
+            for k in range(teams[team_id][role], quota)
+        ]
+        if not pool or not slots:
+            continue
+
+        values = np.array([players[player_id][1] for player_id in pool], dtype=float) / top_value
+        team_rows = {team_id: row for row, team_id in enumerate(team_ids)}
+        columns = {player_id: col for col, player_id in enumerate(pool)}
+        utility = np.tile(values, (len(team_ids), 1))
+        for (team_id, player_id), extra in bonus.items():
+            if team_id in team_rows and player_id in columns:
+                utility[team_rows[team_id], columns[player_id]] += extra
+        utility += rng.uniform(0, TIE_BREAK_NOISE, utility.shape)
+
+        weights = np.array([1 / (k + 1) for _, k in slots])
+        cost = -utility[[team_rows[team_id] for team_id, _ in slots]] * weights[:, None]
+        for slot, col in solve_assignment(cost):
+            allocation[slots[slot][0]].append(pool[col])
+    return allocation
+
+
+def price_allocation(allocation, values, budgets):
+    """
+    Prezzi dei giocatori assegnati, proporzionali al ``fanta_value``.
+
+    Ogni giocatore costa almeno un credito; il fattore di conversione è lo
+    stesso per tutta la lega e fa sì che nessuna rosa superi il budget della squadra.
+
+    Returns:
+        Dizionario {id giocatore: prezzo in crediti}
+    """
+    factors = []
+    for team_id, player_ids in allocation.items():
+        total = sum(values[player_id] for player_id in player_ids)
+        if total:
+            factors.append(max(0, budgets[team_id] - len(player_ids)) / total)
+    factor = min(factors, default=0)
+    return {
+        player_id: 1 + math.floor(values[player_id] * factor)
+        for player_ids in allocation.values() for player_id in player_ids
+    }
+
+
+def allocate_auto_auction(league, players=None, quotas=None, seed=0):
+    """
+    Esegue l'asta automatica di una lega e registra gli acquisti.
+
+    Args:
+        league: ``FantaLeague`` dell'asta
+        players: queryset dei giocatori all'asta (di default tutti quelli non ancora in una rosa della lega)
+        quotas: posti in rosa per macro-ruolo (di default ``ROLE_QUOTAS``)
+        seed: seed per rendere riproducibile l'assegnazione
+
+    Returns:
+        Dizionario con giocatori assegnati a ogni squadra, prezzi e secondi impiegati
+    """
+    start = time.perf_counter()
+    with transaction.atomic():
+        team_ids = list(league.teams.order_by('pk').values_list('pk', flat=True))
+        teams = FantaTeam.objects.select_for_update().filter(pk__in=team_ids).order_by('pk')
+        budgets, owners = {}, {}
+        for team_id, budget, owner_id in teams.values_list('pk', 'budget', 'owner_id'):
+            # Il budget dell'asta è quello iniziale della lega, se la squadra non ha già speso crediti
+            budgets[team_id], owners[team_id] = min(budget, league.initial_budget), owner_id
+
+        rosters = {team_id: Counter() for team_id in team_ids}
+        owned = set()
+        rows = FantaTeamPlayer.objects.filter(fanta_team_id__in=team_ids, is_active=True)
+        for team_id, player_id, role in rows.values_list('fanta_team_id', 'player_id', 'player__main_role'):
+            rosters[team_id][Player.ROLE_CATEGORIES.get(role)] += 1
+            owned.add(player_id)
+
+        pool = {}
+        for player_id, role, value in (players if players is not None else Player.objects.all()).values_list(
+            'pk', 'main_role', 'fanta_value'
+        ):
+            if player_id not in owned and Player.ROLE_CATEGORIES.get(role):
+                pool[player_id] = (Player.ROLE_CATEGORIES[role], value)
+
+        preferences = defaultdict(list)
+        ranked = AuctionPreference.objects.filter(league=league, team_id__in=team_ids).order_by('team_id', 'rank', 'pk')
+        for team_id, player_id in ranked.values_list('team_id', 'player_id'):
+            if player_id in pool:
+                preferences[team_id].append(player_id)
+
+        allocation = allocate(rosters, pool, preferences, quotas, seed)
+        prices = price_allocation(allocation, {player_id: value for player_id, (_, value) in pool.items()}, budgets)
+
+        transactions = MarketTransaction.objects.bulk_create([
+            MarketTransaction(
+                transaction_type='buy', league=league, created_by_id=owners[team_id],
+                team_id=team_id, player_id=player_id, price=prices[player_id], notes="Asta automatica",
+            )
+            for team_id, player_ids in allocation.items() for player_id in player_ids
+        ])
+        # Rose e budget sono aggiornati in blocco dall'esecutore del mercato, con le squadre già bloccate
+        _, rejected = settle_batch([tx.pk for tx in transactions])
+    elapsed = time.perf_counter() - start
+
+    report = {'allocation': allocation, 'prices': prices, 'seconds': elapsed}
+    logger.info(
+        "Asta automatica lega %s: %d giocatori assegnati a %d squadre (%d rifiutati) in %.3fs",
+        league.id, len(prices), len(allocation), len(rejected), elapsed,
+    )
+    return report
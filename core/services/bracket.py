@@ -0,0 +1,338 @@
+"""
+Motore dei tabelloni a eliminazione diretta.
+
+L'intero tabellone viene calcolato alla creazione del torneo e salvato in forma
+compatta nel campo ``Tournament.bracket``: un elenco di turni, ognuno con i
+suoi accoppiamenti (squadra di casa, squadra in trasferta, vincitrice). Con un
+numero di squadre che non è potenza di due le teste di serie più alte passano
+il primo turno senza giocare.
+
+Le ``Round`` e le ``Match`` vengono create solo quando servono: la gara
+successiva di un accoppiamento dopo che la precedente è stata giocata, il turno
+successivo quando tutti gli accoppiamenti del turno corrente hanno una vincitrice.
+Il passaggio del turno considera il risultato complessivo, i gol in trasferta
+(se abilitati nella struttura) e i rigori dell'ultima gara.
+"""
+import logging
+import random
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Match, Round, Tournament
+from core.services.scheduling import KICKOFF_TIME
+
+logger = logging.getLogger("simulation")
+
+DAYS_BETWEEN_ROUNDS = 14
+DAYS_BETWEEN_LEGS = 7
+
+ROUND_LABELS = {
+    2: "Finale",
+    4: "Semifinali",
+    8: "Quarti di finale",
+    16: "Ottavi di finale",
+    32: "Sedicesimi di finale",
+    64: "Trentaduesimi di finale",
+    128: "Sessantaquattresimi di finale"
+}
+
+
+def round_label(n):
+    """Nome del turno in base al numero di squadre del tabellone in quel turno"""
+    return ROUND_LABELS.get(n, f"Turno a {n}")
+
+
+def seeding_order(size):
+    """
+    Ordine delle teste di serie nel tabellone (1-based), es. 8 -> [1, 8, 4, 5, 2, 7, 3, 6].
+
+    Le prime due teste di serie possono incontrarsi solo in finale.
+    """
+    order = [1]
+    while len(order) < size:
+        total = len(order) * 2 + 1
+        order = [seed for current in order for seed in (current, total - current)]
+    return order
+
+
+def build_bracket(team_ids, legs=1):
+    """
+    Calcola il tabellone completo a partire dalle squadre in ordine di testa di serie.
+
+    Args:
+        team_ids: id ``Team`` ordinati per testa di serie
+        legs: gare per accoppiamento
+
+    Returns:
+        Dizionario serializzabile in JSON con i turni e gli accoppiamenti
+    """
+    size = 1
+    while size < len(team_ids):
+        size *= 2
+
+    slots = [team_ids[seed - 1] if seed <= len(team_ids) else None for seed in seeding_order(size)]
+
+    rounds = []
+    teams_in_round = size
+    while teams_in_round > 1:
+        rounds.append({
+            'number': len(rounds) + 1,
+            'label': round_label(teams_in_round),
+            'round_id': None,
+            'ties': [{'home': None, 'away': None, 'winner': None} for _ in range(teams_in_round // 2)],
+        })
+        teams_in_round //= 2
+
+    for i, tie in enumerate(rounds[0]['ties']):
+        tie['home'], tie['away'] = slots[2 * i], slots[2 * i + 1]
+
+    bracket = {'legs': legs, 'rounds': rounds}
+
+    # Chi non ha avversario passa il turno senza giocare
+    for i, tie in enumerate(rounds[0]['ties']):
+        if tie['away'] is None:
+            _set_winner(bracket, 0, i, tie['home'])
+    return bracket
+
+
+def _set_winner(bracket, round_index, tie_index, winner):
+    """Registra la vincitrice e la colloca nell'accoppiamento del turno successivo"""
+    bracket['rounds'][round_index]['ties'][tie_index]['winner'] = winner
+    if round_index + 1 < len(bracket['rounds']):
+        next_tie = bracket['rounds'][round_index + 1]['ties'][tie_index // 2]
+        next_tie['home' if tie_index % 2 == 0 else 'away'] = winner
+
+
+def _kickoff(tournament, round_number, leg):
+    start_date = tournament.start_date or timezone.now().date()
+    day = start_date + timedelta(days=DAYS_BETWEEN_ROUNDS * (round_number - 1) + DAYS_BETWEEN_LEGS * leg)
+    return timezone.make_aware(datetime.combine(day, KICKOFF_TIME))
+
+
+def _leg_match(tournament, round_obj, tie, leg):
+    """Gara ``leg`` (0-based) di un accoppiamento: le squadre si alternano in casa"""
+    home, away = (tie['home'], tie['away']) if leg % 2 == 0 else (tie['away'], tie['home'])
+    return Match(
+        home_team_id=home, away_team_id=away, tournament=tournament, round=round_obj,
+        kickoff_datetime=_kickoff(tournament, round_obj.number, leg),
+    )
+
+
+def _materialize_round(tournament, bracket, round_index):
+    """Crea la ``Round`` e le gare di andata degli accoppiamenti da giocare"""
+    entry = bracket['rounds'][round_index]
+    round_obj = Round.objects.create(
+        tournament=tournament, number=entry['number'], label=entry['label'], knockout_stage=True
+    )
+    entry['round_id'] = round_obj.id
+
+    matches = [
+        _leg_match(tournament, round_obj, tie, 0)
+        for tie in entry['ties'] if tie['winner'] is None
+    ]
+    Match.objects.bulk_create(matches)
+    logger.info("Creata fase '%s' di '%s' con %d partite", entry['label'], tournament.name, len(matches))
+    return round_obj
+
+
+def create_knockout(tournament, season_teams, seed=None, draw=True):
+    """
+    Genera il tabellone di un torneo a eliminazione diretta e ne crea il primo turno.
+
+    Args:
+        tournament: ``Tournament`` a eliminazione diretta
+        season_teams: ``SeasonTeam`` partecipanti, in ordine di testa di serie
+        seed: seme del sorteggio
+        draw: se True l'ordine delle squadre viene sorteggiato, altrimenti è
+            usato come ordine delle teste di serie (es. classifica per i playoff)
+
+    Returns:
+        Il tabellone salvato in ``tournament.bracket``
+    """
+    team_ids = [season_team.team_id for season_team in season_teams]
+    if draw:
+        random.Random(seed).shuffle(team_ids)
+
+    bracket = build_bracket(team_ids, legs=tournament.structure.legs)
+    _materialize_round(tournament, bracket, 0)
+
+    tournament.bracket = bracket
+    tournament.save(update_fields=['bracket'])
+    return bracket
+
+
+def _tie_result(tie, matches, legs, away_goals_rule):
+    """
+    Valuta un accoppiamento a partire dalle sue gare, in ordine di calendario.
+
+    Returns:
+        Tupla (vincitrice o None, True se va creata la gara successiva, True se tutte
+        le gare sono state giocate ma l'accoppiamento resta in parità senza rigori)
+    """
+    if any(not m['played'] for m in matches):
+        return None, False, False
+    if len(matches) < legs:
+        return None, True, False
+
+    goals = {tie['home']: 0, tie['away']: 0}
+    away_goals = {tie['home']: 0, tie['away']: 0}
+    for m in matches:
+        home_goals = (m['home_score'] or 0) + (m['home_score_extra_time'] or 0)
+        visitor_goals = (m['away_score'] or 0) + (m['away_score_extra_time'] or 0)
+        goals[m['home_team_id']] += home_goals
+        goals[m['away_team_id']] += visitor_goals
+        away_goals[m['away_team_id']] += visitor_goals
+
+    home, away = tie['home'], tie['away']
+    if goals[home] != goals[away]:
+        return (home if goals[home] > goals[away] else away), False, False
+    if legs > 1 and away_goals_rule and away_goals[home] != away_goals[away]:
+        return (home if away_goals[home] > away_goals[away] else away), False, False
+
+    # Rigori dell'ultima gara
+    last = matches[-1]
+    if last['penalties_played'] and last['home_score_penalties'] != last['away_score_penalties']:
+        if (last['home_score_penalties'] or 0) > (last['away_score_penalties'] or 0):
+            return last['home_team_id'], False, False
+        return last['away_team_id'], False, False
+    return None, False, True
+
+
+def level_aggregates(tournament, round_id, fixtures):
+    """
+    Indica quali gare di un turno a eliminazione diretta chiudono un accoppiamento in parità.
+
+    Una gara è decisiva se è l'unica dell'accoppiamento o se le altre sono già
+    state giocate; l'accoppiamento è in parità se lo è il totale dei gol e la
+    regola dei gol in trasferta, quando prevista, non lo risolve. Solo queste
+    gare vanno ai supplementari e ai rigori.
+
+    Args:
+        tournament: torneo con tabellone
+        round_id: id del turno delle gare
+        fixtures: sequenza di tuple (id casa, id trasferta, gol casa, gol trasferta) dei tempi regolamentari
+
+    Returns:
+        Lista di booleani allineata a ``fixtures``
+    """
+    legs = tournament.bracket['legs']
+    away_goals_rule = tournament.structure.tiebreaker_away_goals
+
+    played = {}
+    for m in Match.objects.filter(round_id=round_id, played=True, cancelled=False).values(
+        'home_team_id', 'away_team_id', 'home_score', 'away_score', 'home_score_extra_time', 'away_score_extra_time',
+    ):
+        pair = frozenset((m['home_team_id'], m['away_team_id']))
+        played.setdefault(pair, []).append((
+            m['home_team_id'], m['away_team_id'],
+            (m['home_score'] or 0) + (m['home_score_extra_time'] or 0),
+            (m['away_score'] or 0) + (m['away_score_extra_time'] or 0),
+        ))
+
+    level = []
+    for home, away, home_score, away_score in fixtures:
+        previous = played.get(frozenset((home, away)), [])
+        if len(previous) + 1 < legs:
+            level.append(False)
+            continue
+        goals = {home: 0, away: 0}
+        away_goals = {home: 0, away: 0}
+        for leg_home, leg_away, leg_home_score, leg_away_score in [*previous, (home, away, home_score, away_score)]:
+            goals[leg_home] += leg_home_score
+            goals[leg_away] += leg_away_score
+            away_goals[leg_away] += leg_away_score
+        level.append(
+            goals[home] == goals[away]
+            and not (legs > 1 and away_goals_rule and away_goals[home] != away_goals[away])
+        )
+    return level
+
+
+def advance_bracket(tournament):
+    """
+    Fa avanzare il tabellone in base alle partite giocate.
+
+    Crea le gare di ritorno mancanti, registra le vincitrici, crea il turno
+    successivo quando quello corrente è concluso e chiude il torneo dopo la
+    finale. È idempotente: può essere chiamata dopo ogni risultato.
+
+    Un accoppiamento concluso in parità senza rigori non ha una vincitrice e
+    blocca il tabellone: viene segnato con ``awaiting_decision`` nel tabellone
+    salvato, con un avviso nel log, finché un amministratore non inserisce i
+    rigori o corregge il risultato.
+
+    Returns:
+        True se il tabellone è cambiato
+    """
+    with transaction.atomic():
+        tournament = Tournament.objects.select_for_update().select_related('structure').get(pk=tournament.pk)
+        bracket = tournament.bracket
+        if not bracket or tournament.status == 'completed':
+            return False
+
+        legs = bracket['legs']
+        away_goals_rule = tournament.structure.tiebreaker_away_goals
+        open_rounds = {
+            entry['round_id']: index for index, entry in enumerate(bracket['rounds'])
+            if entry['round_id'] and any(tie['winner'] is None for tie in entry['ties'])
+        }
+        if not open_rounds:
+            return False
+
+        matches_by_round = {}
+        for m in Match.objects.filter(round_id__in=open_rounds, cancelled=False).order_by('kickoff_datetime', 'id').values(
+            'round_id', 'home_team_id', 'away_team_id', 'played', 'home_score', 'away_score',
+            'home_score_extra_time', 'away_score_extra_time', 'penalties_played',
+            'home_score_penalties', 'away_score_penalties',
+        ):
+            pair = frozenset((m['home_team_id'], m['away_team_id']))
+            matches_by_round.setdefault(m['round_id'], {}).setdefault(pair, []).append(m)
+
+        changed = False
+        flagged = False
+        next_legs = []
+        for round_id, round_index in sorted(open_rounds.items(), key=lambda item: item[1]):
+            round_obj = Round(id=round_id, number=bracket['rounds'][round_index]['number'])
+            for tie_index, tie in enumerate(bracket['rounds'][round_index]['ties']):
+                if tie['winner'] is not None:
+                    continue
+                matches = matches_by_round.get(round_id, {}).get(frozenset((tie['home'], tie['away'])), [])
+                winner, needs_leg, undecided = _tie_result(tie, matches, legs, away_goals_rule)
+                if undecided:
+                    if not tie.get('awaiting_decision'):
+                        tie['awaiting_decision'] = True
+                        flagged = True
+                        logger.warning(
+                            "Torneo '%s', %s: accoppiamento %s-%s in parità senza rigori, serve una decisione",
+                            tournament.name, bracket['rounds'][round_index]['label'], tie['home'], tie['away'],
+                        )
+                    continue
+                if tie.pop('awaiting_decision', None):
+                    flagged = True
+                if needs_leg:
+                    next_legs.append(_leg_match(tournament, round_obj, tie, len(matches)))
+                elif winner is not None:
+                    _set_winner(bracket, round_index, tie_index, winner)
+                    changed = True
+
+        Match.objects.bulk_create(next_legs)
+
+        # Turno successivo quando tutti gli accoppiamenti sono definiti
+        for index, entry in enumerate(bracket['rounds']):
+            if entry['round_id'] is None and all(tie['home'] is not None and tie['away'] is not None for tie in entry['ties']):
+                _materialize_round(tournament, bracket, index)
+                changed = True
+
+        update_fields = ['bracket']
+        if bracket['rounds'][-1]['ties'][0]['winner'] is not None:
+            tournament.status = 'completed'
+            tournament.end_date = timezone.now().date()
+            update_fields += ['status', 'end_date']
+            logger.info("Torneo '%s' concluso", tournament.name)
+
+        if changed or next_legs or flagged:
+            tournament.bracket = bracket
+            tournament.save(update_fields=update_fields)
+        return changed
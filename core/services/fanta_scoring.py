@@ -0,0 +1,212 @@
+"""
+Calcolo dei punteggi fantacalcio di un'intera giornata.
+
+Carica tutti i ``FantaScore`` della giornata con il ruolo del giocatore in una
+sola query e calcola i punteggi finali come prodotto tra la matrice delle
+statistiche (una riga per voto) e i vettori dei coefficienti bonus/malus.
+Ogni ``FantaLeagueRule`` viene compilata una sola volta in un vettore e tenuta
+in cache, così la stessa giornata si valuta per centinaia di leghe con una sola
+moltiplicazione di matrici.
+"""
+import logging
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import FantaLeagueRule, FantaScore, Player
+from core.models.fanta_score import CLEAN_SHEET_ROLES, DEFAULT_COEFFICIENTS, GOALS_CONCEDED_ROLES, SCORING_FEATURES
+
+logger = logging.getLogger("simulation")
+
+# Colonne numeriche lette per ogni voto, nell'ordine della matrice
+STAT_FIELDS = (
+    'minutes_played', 'goals', 'assists', 'penalties_scored', 'penalties_saved', 'clean_sheet',
+    'yellow_cards', 'red_cards', 'own_goals', 'penalties_missed', 'goals_conceded',
+)
+
+# Campo di FantaLeagueRule che ridefinisce ogni voce (le altre restano standard)
+RULE_FIELDS = {
+    'goals': 'goal_value',
+    'assists': 'assist_value',
+    'penalties_saved': 'penalty_saved_value',
+    'clean_sheet': 'clean_sheet_value',
+    'yellow_cards': 'yellow_card_value',
+    'red_cards': 'red_card_value',
+    'own_goals': 'own_goal_value',
+    'penalties_missed': 'penalty_missed_value',
+    'goals_conceded': 'goal_conceded_value',
+}
+
+MIN_MINUTES_UNRATED = 15  # sotto questa soglia un giocatore senza voto prende 0
+DEFAULT_VOTE = 6.0  # voto d'ufficio per chi ha giocato senza essere votato
+
+COEFFICIENTS_CACHE_KEY = "fanta_coefficients:{}"
+COEFFICIENTS_CACHE_TIMEOUT = 60 * 60
+
+
+def compile_rule(rule):
+    """
+    Compila una ``FantaLeagueRule`` nel vettore dei coefficienti (ordine ``SCORING_FEATURES``).
+
+    Senza regola si usa il regolamento standard.
+    """
+    coefficients = dict(DEFAULT_COEFFICIENTS)
+    if rule is not None:
+        for feature, field in RULE_FIELDS.items():
+            coefficients[feature] = getattr(rule, field)
+    return np.array([coefficients[feature] for feature in SCORING_FEATURES], dtype=np.float64)
+
+
+DEFAULT_VECTOR = compile_rule(None)
+
+
+def league_coefficients(league_ids):
+    """
+    Restituisce la matrice dei coefficienti ``(voci, leghe)`` allineata a ``league_ids``.
+
+    I vettori compilati restano in cache finché la regola della lega non cambia;
+    per le leghe non in cache le regole vengono lette con una sola query. Se una
+    lega ha più regole vale quella modificata più di recente.
+    """
+    league_ids = list(league_ids)
+    cached = cache.get_many([COEFFICIENTS_CACHE_KEY.format(league_id) for league_id in league_ids])
+    vectors = {
+        league_id: cached[COEFFICIENTS_CACHE_KEY.format(league_id)]
+        for league_id in league_ids if COEFFICIENTS_CACHE_KEY.format(league_id) in cached
+    }
+
+    missing = [league_id for league_id in league_ids if league_id not in vectors]
+    if missing:
+        latest = {}
+        for rule in FantaLeagueRule.objects.filter(fanta_league_id__in=missing).order_by('updated_at', 'id'):
+            latest[rule.fanta_league_id] = rule
+
+        compiled = {league_id: compile_rule(latest.get(league_id)) for league_id in missing}
+        cache.set_many(
+            {COEFFICIENTS_CACHE_KEY.format(league_id): vector for league_id, vector in compiled.items()},
+            COEFFICIENTS_CACHE_TIMEOUT,
+        )
+        vectors.update(compiled)
+
+    if not league_ids:
+        return np.zeros((len(SCORING_FEATURES), 0))
+    return np.column_stack([vectors[league_id] for league_id in league_ids])
+
+
+def invalidate_league_coefficients(league_id):
+    """Rimuove dalla cache il vettore compilato di una lega"""
+    cache.delete(COEFFICIENTS_CACHE_KEY.format(league_id))
+
+
+def load_round_stats(round_obj):
+    """
+    Estrae in una sola query i voti della giornata.
+
+    Returns:
+        Dizionario con id dei ``FantaScore``, id dei giocatori, voti (NaN per i
+        senza voto), macro-ruoli e matrice statistiche con colonne ``STAT_FIELDS``
+    """
+    rows = list(
+        FantaScore.objects.filter(round=round_obj)
+        .order_by('id')
+        .values_list('id', 'player_id', 'vote', 'player__main_role', *STAT_FIELDS)
+    )
+
+    return {
+        'ids': np.array([row[0] for row in rows], dtype=np.int64),
+        'player_ids': np.array([row[1] for row in rows], dtype=np.int64),
+        'votes': np.array([np.nan if row[2] is None else row[2] for row in rows], dtype=np.float64),
+        'roles': np.array([Player.ROLE_CATEGORIES.get(row[3]) for row in rows], dtype=object),
+        'stats': np.array([row[4:] for row in rows], dtype=np.float64).reshape(len(rows), len(STAT_FIELDS)),
+    }
+
+
+def feature_matrix(roles, stats):
+    """
+    Costruisce la matrice delle voci bonus/malus ``(voti, SCORING_FEATURES)``.
+
+    Porta inviolata e gol subiti valgono solo per i macro-ruoli previsti.
+    """
+    columns = [STAT_FIELDS.index(feature) for feature in SCORING_FEATURES]
+    features = stats[:, columns].copy()
+    features[:, SCORING_FEATURES.index('clean_sheet')] *= np.isin(roles, CLEAN_SHEET_ROLES)
+    features[:, SCORING_FEATURES.index('goals_conceded')] *= np.isin(roles, GOALS_CONCEDED_ROLES)
+    return features
+
+
+def compute_final_scores(votes, roles, stats, coefficients=None):
+    """
+    Calcola i punteggi finali come prodotto matrice statistiche x coefficienti.
+
+    Args:
+        votes: array dei voti (NaN = senza voto)
+        roles: array dei macro-ruoli (P, D, C, A)
+        stats: matrice statistiche con colonne ``STAT_FIELDS``
+        coefficients: vettore (una lega) o matrice ``(voci, leghe)``; di default
+            il regolamento standard
+
+    Returns:
+        Punteggi finali arrotondati a due decimali, con la stessa forma del
+        prodotto (un vettore oppure una matrice ``(voti, leghe)``)
+    """
+    coefficients = DEFAULT_VECTOR if coefficients is None else coefficients
+
+    unrated = np.isnan(votes)
+    base = np.where(unrated, DEFAULT_VOTE, votes)
+    bonus_malus = feature_matrix(roles, stats) @ coefficients
+    if bonus_malus.ndim == 2:
+        base = base[:, None]
+
+    final = np.round(base + bonus_malus, 2)
+    # Senza voto e con meno di 15 minuti il giocatore non viene considerato
+    final[unrated & (stats[:, STAT_FIELDS.index('minutes_played')] < MIN_MINUTES_UNRATED)] = 0.0
+    return final
+
+
+def score_round(round_obj):
+    """
+    Ricalcola e salva il punteggio finale (regolamento standard) di tutti i voti di una giornata.
+
+    Returns:
+        Dizionario {id FantaScore: punteggio finale}
+    """
+    data = load_round_stats(round_obj)
+    if data['ids'].size == 0:
+        return {}
+
+    final = compute_final_scores(data['votes'], data['roles'], data['stats'])
+
+    now = timezone.now()
+    scores = [FantaScore(id=int(score_id), final_score=float(value), updated_at=now) for score_id, value in zip(data['ids'], final)]
+    with transaction.atomic():
+        FantaScore.objects.bulk_update(scores, ['final_score', 'updated_at'], batch_size=500)
+
+    logger.info("Calcolati %d punteggi fantacalcio per %s", len(scores), round_obj)
+    return {score.id: score.final_score for score in scores}
+
+
+def score_round_for_leagues(round_obj, league_ids):
+    """
+    Calcola i punteggi di una giornata secondo le regole di più leghe.
+
+    I voti vengono letti una volta sola e valutati per tutte le leghe con un
+    unico prodotto di matrici; il risultato non viene salvato perché
+    ``FantaScore.final_score`` segue il regolamento standard.
+
+    Returns:
+        Dizionario {id lega: {id giocatore: punteggio}}
+    """
+    league_ids = list(league_ids)
+    data = load_round_stats(round_obj)
+    if data['ids'].size == 0 or not league_ids:
+        return {league_id: {} for league_id in league_ids}
+
+    final = compute_final_scores(data['votes'], data['roles'], data['stats'], league_coefficients(league_ids))
+
+    player_ids = data['player_ids'].tolist()
+    return {
+        league_id: dict(zip(player_ids, final[:, i].tolist()))
+        for i, league_id in enumerate(league_ids)
+    }
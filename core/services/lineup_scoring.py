@@ -0,0 +1,136 @@
+"""
+Chiusura di una giornata di fantacalcio.
+
+Per una ``Round`` carica tutte le formazioni, i loro giocatori e i voti in un
+numero fisso di query, applica le sostituzioni automatiche dalla panchina
+(stesso macro-ruolo, in ordine di panchina, così il modulo resta valido) e
+scrive punteggi, sostituzioni e totali con operazioni bulk.
+"""
+import logging
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import FantaLineup, FantaLineupPlayer, FantaLineupSubstitution, Player
+from core.services.fanta_scoring import (DEFAULT_VOTE, MIN_MINUTES_UNRATED, STAT_FIELDS,
+                                         compute_final_scores, load_round_stats)
+
+logger = logging.getLogger("simulation")
+
+MAX_SUBSTITUTIONS = 3
+NOT_PLAYED_REASON = "Non ha preso voto"
+
+
+def _player_results(round_obj):
+    """
+    Calcola voto base e bonus/malus di ogni giocatore che ha preso voto nella giornata.
+
+    Returns:
+        Dizionario {id giocatore: (voto base, bonus/malus)}
+    """
+    data = load_round_stats(round_obj)
+    if data['ids'].size == 0:
+        return {}
+
+    votes, stats = data['votes'], data['stats']
+    unrated = np.isnan(votes)
+    played = ~(unrated & (stats[:, STAT_FIELDS.index('minutes_played')] < MIN_MINUTES_UNRATED))
+    base = np.where(unrated, DEFAULT_VOTE, votes)
+    final = compute_final_scores(votes, data['roles'], stats)
+
+    return {
+        player_id: (base_vote, round(total - base_vote, 2))
+        for player_id, base_vote, total, ok in zip(data['player_ids'].tolist(), base.tolist(), final.tolist(), played.tolist())
+        if ok
+    }
+
+
+def _auto_substitutions(lineup, lineup_players, max_substitutions):
+    """
+    Sceglie le sostituzioni per i titolari senza voto.
+
+    I titolari vengono esaminati in ordine di posizione; per ognuno entra la prima
+    riserva con voto dello stesso macro-ruolo non ancora utilizzata.
+    """
+    starters = [lp for lp in lineup_players if lp.is_starter]
+    bench = [lp for lp in lineup_players if not lp.is_starter]
+
+    substitutions = []
+    used = set()
+    for starter in starters:
+        if len(substitutions) >= max_substitutions:
+            break
+        if starter.score is not None:
+            continue
+
+        role = Player.ROLE_CATEGORIES.get(starter.player.main_role)
+        for reserve in bench:
+            if reserve.id in used or reserve.score is None:
+                continue
+            if Player.ROLE_CATEGORIES.get(reserve.player.main_role) != role:
+                continue
+            used.add(reserve.id)
+            substitutions.append(FantaLineupSubstitution(
+                fanta_lineup=lineup, player_out=starter, substitute=reserve,
+                reason=NOT_PLAYED_REASON, is_applied=True,
+            ))
+            break
+
+    return substitutions
+
+
+def close_round(round_obj, max_substitutions=MAX_SUBSTITUTIONS):
+    """
+    Calcola i punteggi di tutte le formazioni di una giornata.
+
+    Le sostituzioni automatiche generate in una chiusura precedente vengono rimpiazzate, quindi
+    la funzione può essere rieseguita dopo una correzione dei voti. Il totale segue
+    le stesse regole di ``FantaLineup.calculate_score``.
+
+    Args:
+        round_obj: ``Round`` da chiudere
+        max_substitutions: numero massimo di cambi automatici per formazione
+
+    Returns:
+        Lista delle ``FantaLineup`` aggiornate
+    """
+    lineups = list(FantaLineup.objects.filter(round=round_obj).order_by('id'))
+    if not lineups:
+        return []
+
+    results = _player_results(round_obj)
+
+    players_by_lineup = defaultdict(list)
+    lineup_players = list(
+        FantaLineupPlayer.objects.filter(fanta_lineup__round=round_obj)
+        .select_related('player')
+        .order_by('fanta_lineup_id', 'position')
+    )
+    for lp in lineup_players:
+        lp.score, lp.bonus_points = results.get(lp.player_id, (None, 0.0))
+        players_by_lineup[lp.fanta_lineup_id].append(lp)
+
+    substitutions = []
+    now = timezone.now()
+    for lineup in lineups:
+        players = players_by_lineup.get(lineup.id, [])
+        lineup_substitutions = _auto_substitutions(lineup, players, max_substitutions)
+        substitutions.extend(lineup_substitutions)
+
+        score = sum(lp.get_final_score() for lp in players if lp.is_starter)
+        for sub in lineup_substitutions:
+            score += sub.substitute.get_final_score() - sub.player_out.get_final_score()
+        lineup.total_score = round(score, 2)
+        lineup.updated_at = now
+
+    with transaction.atomic():
+        # Solo le sostituzioni automatiche vengono rigenerate: quelle inserite a mano restano
+        FantaLineupSubstitution.objects.filter(fanta_lineup__round=round_obj, reason=NOT_PLAYED_REASON).delete()
+        FantaLineupPlayer.objects.bulk_update(lineup_players, ['score', 'bonus_points'], batch_size=1000)
+        FantaLineupSubstitution.objects.bulk_create(substitutions, batch_size=1000)
+        FantaLineup.objects.bulk_update(lineups, ['total_score', 'updated_at'], batch_size=1000)
+
+    logger.info("Chiusa %s: %d formazioni, %d sostituzioni", round_obj, len(lineups), len(substitutions))
+    return lineups
@@ -0,0 +1,189 @@
+"""
+Esecuzione delle transazioni di mercato.
+
+Le transazioni in attesa vengono regolate a blocchi, ognuno in un'unica
+transazione del database: prima si bloccano le transazioni e poi le squadre
+coinvolte, sempre in ordine di id, così due esecutori concorrenti non possono
+andare in deadlock. I budget sono aggiornati con un solo ``UPDATE`` basato su
+``F()`` e le rose con inserimenti e aggiornamenti in blocco.
+"""
+import logging
+import time
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from core.models import FantaTeam, FantaTeamPlayer, MarketTransaction
+
+logger = logging.getLogger("transfer")
+
+DEFAULT_BATCH_SIZE = 500
+
+
+class _Roster:
+    """Stato in memoria delle righe ``FantaTeamPlayer`` coinvolte nel blocco"""
+
+    def __init__(self, rows):
+        self.rows = {(row.fanta_team_id, row.player_id): row for row in rows}
+        self.created = {}
+        self.changed = {}
+
+    def active(self, team_id, player_id):
+        row = self.rows.get((team_id, player_id))
+        return row if row is not None and row.is_active else None
+
+    def remove(self, row):
+        row.is_active = False
+        if row.pk:
+            self.changed[row.pk] = row
+
+    def add(self, team_id, player_id, price):
+        row = self.rows.get((team_id, player_id))
+        if row is None:
+            # Nuovo giocatore in rosa
+            row = FantaTeamPlayer(fanta_team_id=team_id, player_id=player_id, purchase_price=price, is_active=True)
+            self.rows[(team_id, player_id)] = row
+            self.created[(team_id, player_id)] = row
+            return
+        # Il giocatore era già stato in rosa: la riga viene riattivata (vincolo di unicità)
+        row.purchase_price = price
+        row.is_active = True
+        if row.pk:
+            self.changed[row.pk] = row
+
+
+def _apply(tx, roster, budgets):
+    """
+    Applica una transazione allo stato in memoria.
+
+    Returns:
+        True se la transazione è valida, False se va rifiutata
+    """
+    if tx.transaction_type == 'buy':
+        if tx.team_id is None or tx.player_id is None or roster.active(tx.team_id, tx.player_id):
+            return False
+        if budgets[tx.team_id] < tx.price:
+            return False
+        roster.add(tx.team_id, tx.player_id, tx.price)
+        budgets[tx.team_id] -= tx.price
+
+    elif tx.transaction_type == 'sell':
+        row = roster.active(tx.team_id, tx.player_id)
+        if row is None:
+            return False
+        roster.remove(row)
+        budgets[tx.team_id] += tx.price
+
+    elif tx.transaction_type == 'trade':
+        if not all([tx.team_id, tx.team_counterparty_id, tx.player_id, tx.player_counterparty_id]):
+            return False
+        given = roster.active(tx.team_id, tx.player_id)
+        received = roster.active(tx.team_counterparty_id, tx.player_counterparty_id)
+        if given is None or received is None:
+            return False
+        if budgets[tx.team_id] < tx.price_adjustment or budgets[tx.team_counterparty_id] < -tx.price_adjustment:
+            return False
+        roster.remove(given)
+        roster.remove(received)
+        roster.add(tx.team_id, tx.player_counterparty_id, received.purchase_price)
+        roster.add(tx.team_counterparty_id, tx.player_id, given.purchase_price)
+        budgets[tx.team_id] -= tx.price_adjustment
+        budgets[tx.team_counterparty_id] += tx.price_adjustment
+
+    # Gli altri tipi (prestito, offerta, svincolato) non modificano rose e budget
+    return True
+
+
+def settle_batch(transaction_ids):
+    """
+    Regola in un'unica transazione del database le transazioni indicate ancora in attesa.
+
+    Returns:
+        Tupla (transazioni completate, transazioni rifiutate)
+    """
+    with transaction.atomic():
+        pending = list(
+            MarketTransaction.objects.select_for_update()
+            .filter(pk__in=transaction_ids, status='pending')
+            .order_by('pk')
+        )
+        if not pending:
+            return [], []
+
+        team_ids = sorted({
+            team_id for tx in pending for team_id in (tx.team_id, tx.team_counterparty_id) if team_id is not None
+        })
+        player_ids = {player_id for tx in pending for player_id in (tx.player_id, tx.player_counterparty_id) if player_id}
+
+        # Blocchi sempre nello stesso ordine (transazioni, poi squadre per id)
+        teams = FantaTeam.objects.select_for_update().filter(pk__in=team_ids).order_by('pk').only('id', 'budget')
+        budgets = {team.id: team.budget for team in teams}
+        initial_budgets = dict(budgets)
+        roster = _Roster(FantaTeamPlayer.objects.filter(fanta_team_id__in=team_ids, player_id__in=player_ids))
+
+        now = timezone.now()
+        completed, rejected = [], []
+        for tx in pending:
+            if _apply(tx, roster, budgets):
+                tx.status, tx.completed_at = 'completed', now
+                completed.append(tx)
+            else:
+                tx.status = 'rejected'
+                rejected.append(tx)
+            tx.updated_at = now
+
+        deltas = {team_id: budgets[team_id] - initial_budgets[team_id] for team_id in budgets}
+        deltas = {team_id: delta for team_id, delta in deltas.items() if delta}
+        if deltas:
+            FantaTeam.objects.filter(pk__in=deltas).update(
+                budget=F('budget') + Case(
+                    *[When(pk=team_id, then=Value(delta)) for team_id, delta in deltas.items()],
+                    output_field=IntegerField(),
+                )
+            )
+
+        FantaTeamPlayer.objects.bulk_update(list(roster.changed.values()), ['is_active', 'purchase_price'])
+        FantaTeamPlayer.objects.bulk_create(list(roster.created.values()))
+        MarketTransaction.objects.bulk_update(pending, ['status', 'completed_at', 'updated_at'])
+
+    return completed, rejected
+
+
+def settle_pending(league=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Regola tutte le transazioni in attesa, in ordine di creazione e a blocchi.
+
+    Args:
+        league: se indicata, limita l'esecuzione a una ``FantaLeague``
+        batch_size: transazioni regolate in ogni transazione del database
+
+    Returns:
+        Dizionario con transazioni completate, rifiutate, secondi impiegati e
+        transazioni regolate al secondo
+    """
+    queryset = MarketTransaction.objects.filter(status='pending')
+    if league is not None:
+        queryset = queryset.filter(league=league)
+    ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+
+    start = time.perf_counter()
+    completed = rejected = 0
+    for i in range(0, len(ids), batch_size):
+        done, refused = settle_batch(ids[i:i + batch_size])
+        completed += len(done)
+        rejected += len(refused)
+    elapsed = time.perf_counter() - start
+
+    settled = completed + rejected
+    report = {
+        'completed': completed,
+        'rejected': rejected,
+        'seconds': elapsed,
+        'per_second': settled / elapsed if elapsed > 0 else 0.0,
+    }
+    logger.info(
+        "Regolate %d transazioni (%d completate, %d rifiutate) in %.3fs: %.0f transazioni/s",
+        settled, completed, rejected, elapsed, report['per_second'],
+    )
+    return report
@@ -0,0 +1,211 @@
+"""
+Motore di simulazione delle partite.
+
+Trasforma gli attributi dei titolari (overall, forma, infortuni, squalifiche) in
+gol attesi e campiona i risultati di un'intera giornata in un unico passaggio
+vettoriale NumPy, scrivendoli poi con un solo ``bulk_update`` e aggiornando la
+classifica in modo incrementale.
+"""
+import logging
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Match, RosterSlot
+from core.realtime import push_match_result
+from core.services.bracket import advance_bracket, level_aggregates
+from core.services.standings import apply_match_results
+
+logger = logging.getLogger("simulation")
+
+# Parametri del modello di gol attesi
+STARTERS = 11
+DEFAULT_STRENGTH = 50.0  # forza usata per le squadre senza titolari in rosa
+BASE_GOALS = 1.35  # media gol per squadra a parità di forza
+HOME_ADVANTAGE = 1.10  # moltiplicatore per la squadra di casa
+STRENGTH_SCALE = 0.035  # sensibilità dei gol attesi alla differenza di forza
+EXTRA_TIME_FACTOR = 1 / 3  # i supplementari durano un terzo dei tempi regolamentari
+PENALTY_KICKS = 5
+PENALTY_CONVERSION = 0.75
+
+SIMULATED_FIELDS = [
+    'home_score', 'away_score', 'played',
+    'extra_time_played', 'home_score_extra_time', 'away_score_extra_time',
+    'penalties_played', 'home_score_penalties', 'away_score_penalties',
+    'updated_at',
+]
+
+
+def team_strengths(team_ids, season_id):
+    """
+    Calcola la forza di ogni squadra a partire dai titolari della rosa stagionale.
+
+    La forza è la media su 11 posti del valore effettivo dei titolari
+    (overall * forma), dove infortunati e squalificati valgono zero.
+
+    Args:
+        team_ids: sequenza di id ``Team``
+        season_id: stagione di riferimento per le ``RosterSlot``
+
+    Returns:
+        Array NumPy di float allineato a ``team_ids``
+    """
+    team_ids = np.asarray(team_ids, dtype=np.int64)
+    if team_ids.size == 0:
+        return np.zeros(0)
+
+    unique_ids, inverse = np.unique(team_ids, return_inverse=True)
+
+    rows = list(
+        RosterSlot.objects.filter(
+            is_starting=True,
+            team__season_id=season_id,
+            team__team_id__in=unique_ids.tolist(),
+        ).values_list(
+            'team__team_id',
+            'player__overall',
+            'player__fitness_level',
+            'player__is_injured',
+            'player__is_suspended',
+        )
+    )
+
+    strengths = np.full(unique_ids.size, DEFAULT_STRENGTH)
+    if rows:
+        data = np.array(rows, dtype=np.float64)
+        slot_team = np.searchsorted(unique_ids, data[:, 0].astype(np.int64))
+        available = (data[:, 3] == 0) & (data[:, 4] == 0)
+        rating = data[:, 1] * np.clip(data[:, 2], 0, 100) / 100.0 * available
+
+        total = np.bincount(slot_team, weights=rating, minlength=unique_ids.size)
+        count = np.bincount(slot_team, minlength=unique_ids.size)
+        has_roster = count > 0
+        strengths[has_roster] = total[has_roster] / STARTERS
+
+    return strengths[inverse]
+
+
+def expected_goals(home_strength, away_strength):
+    """Restituisce i gol attesi (casa, trasferta) per ogni coppia di forze."""
+    diff = np.asarray(home_strength, dtype=np.float64) - np.asarray(away_strength, dtype=np.float64)
+    home_lambda = BASE_GOALS * HOME_ADVANTAGE * np.exp(STRENGTH_SCALE * diff)
+    away_lambda = BASE_GOALS / HOME_ADVANTAGE * np.exp(-STRENGTH_SCALE * diff)
+    return home_lambda, away_lambda
+
+
+def sample_tie_breakers(rng, tied, home_lambda, away_lambda, draw_resolution):
+    """
+    Risolve in modo vettoriale i pareggi quando il torneo non li consente.
+
+    Returns:
+        Dizionario di array (supplementari e rigori) allineati a ``tied``
+    """
+    size = tied.size
+    result = {
+        'extra_time_played': np.zeros(size, dtype=bool),
+        'home_score_extra_time': np.zeros(size, dtype=np.int64),
+        'away_score_extra_time': np.zeros(size, dtype=np.int64),
+        'penalties_played': np.zeros(size, dtype=bool),
+        'home_score_penalties': np.zeros(size, dtype=np.int64),
+        'away_score_penalties': np.zeros(size, dtype=np.int64),
+    }
+
+    still_tied = tied.copy()
+    if draw_resolution != 'penalties':
+        result['extra_time_played'] = tied.copy()
+        result['home_score_extra_time'] = np.where(tied, rng.poisson(home_lambda * EXTRA_TIME_FACTOR), 0)
+        result['away_score_extra_time'] = np.where(tied, rng.poisson(away_lambda * EXTRA_TIME_FACTOR), 0)
+        still_tied = tied & (result['home_score_extra_time'] == result['away_score_extra_time'])
+
+    home_pen = rng.binomial(PENALTY_KICKS, PENALTY_CONVERSION, size)
+    away_pen = rng.binomial(PENALTY_KICKS, PENALTY_CONVERSION, size)
+    # Oltre la serie regolamentare si va a oltranza: un gol in più a chi vince la sudden death
+    sudden_death_home = rng.random(size) < 0.5
+    equal = home_pen == away_pen
+    home_pen = home_pen + (equal & sudden_death_home)
+    away_pen = away_pen + (equal & ~sudden_death_home)
+
+    result['penalties_played'] = still_tied
+    result['home_score_penalties'] = np.where(still_tied, home_pen, 0)
+    result['away_score_penalties'] = np.where(still_tied, away_pen, 0)
+    return result
+
+
+def simulate_round(round_obj, seed=None, rng=None):
+    """
+    Simula tutte le partite non ancora giocate di una giornata.
+
+    I gol di ogni partita sono estratti da una Poisson con media derivata dalla
+    forza delle due squadre; i risultati vengono salvati con un solo ``bulk_update``.
+
+    Args:
+        round_obj: oggetto ``Round`` da simulare
+        seed: seme opzionale per rendere la simulazione riproducibile
+        rng: ``numpy.random.Generator`` già inizializzato (ha priorità su ``seed``)
+
+    Returns:
+        Lista delle ``Match`` simulate
+    """
+    tournament = round_obj.tournament
+    structure = tournament.structure
+
+    matches = list(
+        Match.objects.filter(round=round_obj, played=False, cancelled=False)
+        .only('id', 'home_team_id', 'away_team_id', 'tournament_id')
+        .order_by('id')
+    )
+    if not matches:
+        logger.info("Nessuna partita da simulare per %s", round_obj)
+        return []
+
+    rng = rng if rng is not None else np.random.default_rng(seed)
+
+    home_ids = np.fromiter((m.home_team_id for m in matches), dtype=np.int64, count=len(matches))
+    away_ids = np.fromiter((m.away_team_id for m in matches), dtype=np.int64, count=len(matches))
+
+    strengths = team_strengths(np.concatenate([home_ids, away_ids]), tournament.season_id)
+    home_lambda, away_lambda = expected_goals(strengths[:len(matches)], strengths[len(matches):])
+
+    home_goals = rng.poisson(home_lambda)
+    away_goals = rng.poisson(away_lambda)
+
+    tied = home_goals == away_goals
+    if tournament.bracket:
+        # Negli accoppiamenti a eliminazione diretta conta il totale: supplementari e rigori solo nella gara decisiva
+        tied = np.array(level_aggregates(tournament, round_obj.id, zip(
+            home_ids.tolist(), away_ids.tolist(), home_goals.tolist(), away_goals.tolist()
+        )), dtype=bool)
+        tie_breakers = sample_tie_breakers(rng, tied, home_lambda, away_lambda, structure.draw_resolution)
+    elif not structure.allow_draws:
+        tie_breakers = sample_tie_breakers(rng, tied, home_lambda, away_lambda, structure.draw_resolution)
+    else:
+        tie_breakers = sample_tie_breakers(rng, np.zeros_like(tied), home_lambda, away_lambda, 'penalties')
+
+    now = timezone.now()
+    for i, match in enumerate(matches):
+        match.home_score = int(home_goals[i])
+        match.away_score = int(away_goals[i])
+        match.played = True
+        match.extra_time_played = bool(tie_breakers['extra_time_played'][i])
+        match.penalties_played = bool(tie_breakers['penalties_played'][i])
+        match.home_score_extra_time = int(tie_breakers['home_score_extra_time'][i]) if match.extra_time_played else None
+        match.away_score_extra_time = int(tie_breakers['away_score_extra_time'][i]) if match.extra_time_played else None
+        match.home_score_penalties = int(tie_breakers['home_score_penalties'][i]) if match.penalties_played else None
+        match.away_score_penalties = int(tie_breakers['away_score_penalties'][i]) if match.penalties_played else None
+        match.updated_at = now
+
+    with transaction.atomic():
+        Match.objects.bulk_update(matches, SIMULATED_FIELDS)
+        # Le partite non erano giocate: in classifica entra solo il nuovo risultato
+        results = [match.result_snapshot() for match in matches]
+        apply_match_results((None, result) for result in results)
+        # Anche i client WebSocket vanno avvisati qui, dopo il commit
+        for match, result in zip(matches, results):
+            push_match_result(match.pk, result)
+        # Il bulk_update non invia segnali: il tabellone va fatto avanzare qui
+        if tournament.bracket:
+            advance_bracket(tournament)
+
+    logger.info("Simulate %d partite per %s", len(matches), round_obj)
+    return matches
@@ -0,0 +1,142 @@
+"""
+Kernel Monte Carlo per la simulazione delle stagioni.
+
+Questo modulo lavora solo su array NumPy e non importa modelli Django, così può
+essere eseguito nei processi del pool senza inizializzare l'ORM.
+"""
+import numpy as np
+
+# Ordine dei pesi punti passati al kernel
+WEIGHT_KEYS = ('win', 'draw', 'loss', 'win_penalty', 'loss_penalty')
+
+# Statistiche per squadra della situazione attuale (vettori) e degli scontri diretti
+# (matrici: riga = squadra, colonna = avversaria)
+TEAM_STATS = ('points', 'goal_diff', 'goals_for', 'away_goals', 'win', 'name_rank')
+PAIR_STATS = ('points', 'goal_diff', 'goals_for', 'away_goals')
+
+# Voci degli scontri diretti per modalità di ``TournamentStructure.tiebreaker_head_to_head``
+HEAD_TO_HEAD_KEYS = {
+    'all': ('points', 'goal_diff', 'goals_for'),
+    'goals': ('goal_diff',),
+    'away_goals': ('away_goals',),
+}
+
+
+def _head_to_head(pair, points, mode):
+    """Statistiche di ogni squadra contro le sole squadre a pari punti, per stagione simulata"""
+    tied = points[:, :, None] == points[:, None, :]
+    return [(pair[key] * tied).sum(axis=-1) for key in HEAD_TO_HEAD_KEYS[mode]]
+
+
+def simulate_positions(seed_sequence, iterations, home_idx, away_idx, home_lambda, away_lambda,
+                       base, weights, allow_draws, criteria, head_to_head='none', batch_size=2000):
+    """
+    Simula ``iterations`` volte le partite rimanenti e conta le posizioni finali.
+
+    Args:
+        seed_sequence: ``numpy.random.SeedSequence`` dedicata al worker
+        iterations: numero di stagioni da simulare
+        home_idx, away_idx: indici delle squadre per ogni partita rimanente
+        home_lambda, away_lambda: gol attesi per ogni partita rimanente
+        base: situazione attuale, dizionario con i vettori ``TEAM_STATS`` e, sotto
+            la chiave 'pairs', le matrici ``PAIR_STATS`` degli scontri diretti
+        weights: punti per (vittoria, pareggio, sconfitta, vittoria ai rigori, sconfitta ai rigori)
+        allow_draws: se False i pareggi vengono decisi ai rigori (50%)
+        criteria: criteri di ordinamento (vedi ``core.services.ranking.tiebreaker_criteria``)
+        head_to_head: modalità degli scontri diretti della struttura
+        batch_size: stagioni simulate per blocco, limita la memoria usata
+
+    Returns:
+        Matrice ``(squadre, posizioni)`` con il numero di volte in cui ogni squadra
+        ha chiuso in ogni posizione
+    """
+    rng = np.random.default_rng(seed_sequence)
+    n_teams = base['points'].size
+    n_matches = home_idx.size
+    w_win, w_draw, w_loss, w_win_pen, w_loss_pen = weights
+    use_pairs = 'head_to_head' in criteria
+
+    counts = np.zeros((n_teams, n_teams), dtype=np.int64)
+    done = 0
+    while done < iterations:
+        size = min(batch_size, iterations - done)
+        rows = np.arange(size)[:, None] * n_teams
+
+        stats = {key: np.broadcast_to(base[key], (size, n_teams)).astype(np.float64) for key in TEAM_STATS}
+        pairs = {}
+        if use_pairs:
+            pairs = {
+                key: np.broadcast_to(base['pairs'][key], (size, n_teams, n_teams)).astype(np.float64)
+                for key in PAIR_STATS
+            }
+
+        if n_matches:
+            home_goals = rng.poisson(home_lambda, size=(size, n_matches))
+            away_goals = rng.poisson(away_lambda, size=(size, n_matches))
+
+            home_win = home_goals > away_goals
+            away_win = home_goals < away_goals
+            draw = home_goals == away_goals
+
+            # Punti degli scontri diretti: solo il risultato dei tempi regolamentari
+            home_regular = np.where(home_win, w_win, np.where(draw, w_draw, w_loss))
+            away_regular = np.where(home_win, w_loss, np.where(draw, w_draw, w_win))
+            if allow_draws:
+                home_points, away_points = home_regular, away_regular
+            else:
+                home_shootout = rng.random((size, n_matches)) < 0.5
+                home_points = np.where(home_win, w_win, np.where(draw, np.where(home_shootout, w_win_pen, w_loss_pen), w_loss))
+                away_points = np.where(home_win, w_loss, np.where(draw, np.where(home_shootout, w_loss_pen, w_win_pen), w_win))
+
+            home_slots = (rows + home_idx).ravel()
+            away_slots = (rows + away_idx).ravel()
+            minlength = size * n_teams
+
+            def scatter(home_values, away_values):
+                total = np.bincount(home_slots, weights=home_values.ravel(), minlength=minlength)
+                total += np.bincount(away_slots, weights=away_values.ravel(), minlength=minlength)
+                return total.reshape(size, n_teams)
+
+            stats['points'] = stats['points'] + scatter(home_points, away_points)
+            stats['goal_diff'] = stats['goal_diff'] + scatter(home_goals - away_goals, away_goals - home_goals)
+            stats['goals_for'] = stats['goals_for'] + scatter(home_goals, away_goals)
+            stats['away_goals'] = stats['away_goals'] + scatter(np.zeros_like(away_goals), away_goals)
+            stats['win'] = stats['win'] + scatter(home_win, away_win)
+
+            if use_pairs:
+                blocks = np.arange(size)[:, None] * n_teams * n_teams
+                home_pairs = (blocks + home_idx * n_teams + away_idx).ravel()
+                away_pairs = (blocks + away_idx * n_teams + home_idx).ravel()
+                pair_length = size * n_teams * n_teams
+
+                def scatter_pairs(home_values, away_values):
+                    total = np.bincount(home_pairs, weights=home_values.ravel(), minlength=pair_length)
+                    total += np.bincount(away_pairs, weights=away_values.ravel(), minlength=pair_length)
+                    return total.reshape(size, n_teams, n_teams)
+
+                pairs['points'] = pairs['points'] + scatter_pairs(home_regular, away_regular)
+                pairs['goal_diff'] = pairs['goal_diff'] + scatter_pairs(home_goals - away_goals, away_goals - home_goals)
+                pairs['goals_for'] = pairs['goals_for'] + scatter_pairs(home_goals, away_goals)
+                pairs['away_goals'] = pairs['away_goals'] + scatter_pairs(np.zeros_like(away_goals), away_goals)
+
+        # Stesso ordine di core.services.ranking.order_rankings; np.lexsort usa l'ultima chiave come principale
+        values = {
+            'points': [-stats['points']],
+            'goal_difference': [-stats['goal_diff']],
+            'goals_for': [-stats['goals_for']],
+            'away_goals': [-stats['away_goals']],
+            'win': [-stats['win']],
+            'name': [stats['name_rank']],
+        }
+        if use_pairs:
+            values['head_to_head'] = [-value for value in _head_to_head(pairs, stats['points'], head_to_head)]
+        keys = [key for criterion in criteria for key in values[criterion]]
+        order = np.lexsort(keys[::-1], axis=-1)
+        positions = np.empty_like(order)
+        np.put_along_axis(positions, order, np.arange(n_teams)[None, :], axis=-1)
+
+        team_slots = np.arange(n_teams)[None, :] * n_teams + positions
+        counts += np.bincount(team_slots.ravel(), minlength=n_teams * n_teams).reshape(n_teams, n_teams)
+        done += size
+
+    return counts
@@ -0,0 +1,125 @@
+"""
+Aggiornamento delle statistiche fantacalcio dei giocatori.
+
+Totale, media, bonus e malus vengono calcolati dal database con una sola query
+raggruppata per giocatore e salvati con operazioni bulk. Bonus e malus usano
+i coefficienti del regolamento standard; come nelle statistiche originali la
+porta inviolata conta per ogni ruolo, mentre i gol subiti solo per i portieri.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Avg, Case, Count, F, FloatField, Sum, Value, When
+from django.utils import timezone
+
+from core.models import FantaScore, Player, PlayerStatistics
+from core.services.fanta_scoring import DEFAULT_COEFFICIENTS, GOALS_CONCEDED_ROLES
+
+logger = logging.getLogger("player")
+
+FANTA_FIELDS = ('fanta_total', 'fanta_average', 'bonus_points', 'malus_points')
+
+
+def _roles_in(categories):
+    """Ruoli specifici che appartengono ai macro-ruoli indicati"""
+    return [role for role, category in Player.ROLE_CATEGORIES.items() if category in categories]
+
+
+def _feature_expression(feature, coefficient):
+    """Espressione SQL del contributo di una voce bonus/malus per un singolo voto"""
+    value = Value(coefficient, output_field=FloatField())
+    if feature == 'clean_sheet':
+        # Nelle statistiche il bonus porta inviolata è contato a tutti i ruoli, non solo a P/D
+        return Case(When(clean_sheet=True, then=value), default=Value(0.0), output_field=FloatField())
+
+    expression = F(feature) * value
+    if feature == 'goals_conceded':
+        return Case(
+            When(player__main_role__in=_roles_in(GOALS_CONCEDED_ROLES), then=expression),
+            default=Value(0.0), output_field=FloatField(),
+        )
+    return expression
+
+
+def fanta_stats_aggregates():
+    """
+    Aggregati per ``FANTA_FIELDS`` da applicare a un queryset di ``FantaScore``.
+
+    I coefficienti positivi formano il bonus, quelli negativi il malus (in valore assoluto).
+    """
+    bonus, malus = [], []
+    for feature, coefficient in DEFAULT_COEFFICIENTS.items():
+        if coefficient > 0:
+            bonus.append(_feature_expression(feature, coefficient))
+        elif coefficient < 0:
+            malus.append(_feature_expression(feature, -coefficient))
+
+    def total(expressions):
+        expression = expressions[0]
+        for other in expressions[1:]:
+            expression = expression + other
+        return Sum(expression, output_field=FloatField())
+
+    return {
+        'fanta_total': Sum('final_score'),
+        'fanta_average': Avg('final_score'),
+        'bonus_points': total(bonus),
+        'malus_points': total(malus),
+    }
+
+
+def scores_for(season=None, tournament=None):
+    """Voti validi (punteggio diverso da zero) nel periodo indicato"""
+    scores = FantaScore.objects.exclude(final_score=0)
+    if season:
+        scores = scores.filter(match__tournament__season=season)
+    if tournament:
+        scores = scores.filter(match__tournament=tournament)
+    return scores
+
+
+def refresh_fanta_stats(season=None, tournament=None):
+    """
+    Ricalcola le statistiche fantacalcio di tutti i giocatori di una stagione o di un torneo.
+
+    Le righe ``PlayerStatistics`` mancanti per i giocatori con almeno un voto
+    vengono create; quelle dei giocatori senza voti restano invariate, come in
+    ``PlayerStatistics.update_fanta_stats``.
+
+    Returns:
+        Numero di righe statistiche aggiornate o create
+    """
+    totals = {
+        row['player_id']: row
+        for row in scores_for(season, tournament).values('player_id').annotate(
+            valid=Count('id'), **fanta_stats_aggregates()
+        ).order_by()
+    }
+    if not totals:
+        return 0
+
+    existing = {
+        stats.player_id: stats
+        for stats in PlayerStatistics.objects.filter(season=season, tournament=tournament, player_id__in=totals)
+    }
+
+    # bulk_update non applica auto_now: la data di aggiornamento va impostata a mano
+    now = timezone.now()
+    updated, created = [], []
+    for player_id, row in totals.items():
+        stats = existing.get(player_id)
+        if stats is None:
+            stats = PlayerStatistics(player_id=player_id, season=season, tournament=tournament)
+            created.append(stats)
+        else:
+            updated.append(stats)
+        for field in FANTA_FIELDS:
+            setattr(stats, field, row[field] or 0)
+        stats.updated_at = now
+
+    with transaction.atomic():
+        PlayerStatistics.objects.bulk_update(updated, FANTA_FIELDS + ('updated_at',), batch_size=1000)
+        PlayerStatistics.objects.bulk_create(created, batch_size=1000)
+
+    logger.info("Statistiche fantacalcio aggiornate: %d righe, %d nuove", len(updated), len(created))
+    return len(updated) + len(created)
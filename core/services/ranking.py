@@ -0,0 +1,222 @@
+"""
+Motore di ordinamento delle classifiche.
+
+Applica i criteri di spareggio definiti in ``TournamentStructure``: a parità di
+punti le squadre formano un gruppo (cluster) che viene risolto con una
+classifica avulsa degli scontri diretti, poi con differenza reti, gol segnati e
+gol in trasferta se abilitati. Tutti i chiamanti usano lo stesso ordinamento.
+"""
+from collections import defaultdict
+from itertools import groupby
+
+from django.db import transaction
+
+from core.cache import invalidate_tournaments
+from core.models import Match, Tournament, TournamentRanking
+from core.services.standings_snapshot import write_snapshot
+
+
+def _head_to_head_keys(cluster, matches_by_team, weights, mode):
+    """
+    Calcola la chiave degli scontri diretti per le squadre di un cluster a pari punti.
+
+    Scorre solo le partite delle squadre del cluster, quindi il costo complessivo
+    su tutti i cluster è proporzionale al numero di partite.
+    """
+    members = {ranking.team.team_id for ranking in cluster}
+    stats = {team_id: {'points': 0, 'goal_diff': 0, 'goals_for': 0, 'away_goals': 0} for team_id in members}
+
+    for team_id in members:
+        team_stats = stats[team_id]
+        for home_id, away_id, hs, as_ in matches_by_team.get(team_id, ()):
+            is_home = home_id == team_id
+            opponent = away_id if is_home else home_id
+            if opponent not in members:
+                continue
+
+            scored, conceded = (hs, as_) if is_home else (as_, hs)
+            team_stats['goals_for'] += scored
+            team_stats['goal_diff'] += scored - conceded
+            if not is_home:
+                team_stats['away_goals'] += scored
+
+            if scored > conceded:
+                team_stats['points'] += weights['win']
+            elif scored == conceded:
+                team_stats['points'] += weights['draw']
+            else:
+                team_stats['points'] += weights['loss']
+
+    keys = {}
+    for team_id, s in stats.items():
+        if mode == 'all':
+            keys[team_id] = (-s['points'], -s['goal_diff'], -s['goals_for'])
+        elif mode == 'goals':
+            keys[team_id] = (-s['goal_diff'],)
+        elif mode == 'away_goals':
+            keys[team_id] = (-s['away_goals'],)
+    return keys
+
+
+def tiebreaker_criteria(structure):
+    """
+    Criteri di ordinamento della classifica di una struttura, dal più importante.
+
+    Valori possibili: 'points', 'head_to_head', 'goal_difference', 'goals_for',
+    'away_goals', 'win', 'name'. Lo stesso elenco è usato da ``order_rankings`` e
+    dal simulatore Monte Carlo delle stagioni (``core.services.monte_carlo``).
+    """
+    criteria = ['points']
+    if structure.tiebreaker_head_to_head != 'none':
+        criteria.append('head_to_head')
+    if structure.tiebreaker_goal_difference:
+        criteria.append('goal_difference')
+    if structure.tiebreaker_goals_scored:
+        criteria.append('goals_for')
+    if structure.tiebreaker_away_goals:
+        criteria.append('away_goals')
+    criteria.extend(['win', 'name'])
+    return criteria
+
+
+def order_rankings(tournament, group=None, rankings=None):
+    """
+    Ordina le righe di classifica di un torneo secondo i criteri della struttura.
+
+    Ordine dei criteri (vedi ``tiebreaker_criteria``): punti, scontri diretti
+    (``tiebreaker_head_to_head``), differenza reti, gol segnati, gol in trasferta
+    (se abilitati nella struttura), vittorie e infine nome della squadra.
+
+    Args:
+        tournament: ``Tournament`` di riferimento
+        group: se indicato, limita la classifica a un girone
+        rankings: righe ``TournamentRanking`` già caricate (opzionale)
+
+    Returns:
+        Lista ordinata di ``TournamentRanking``
+    """
+    structure = tournament.structure
+
+    if rankings is None:
+        rankings = TournamentRanking.objects.filter(tournament=tournament).select_related('team__team')
+        if group:
+            rankings = rankings.filter(group=group)
+    rankings = list(rankings)
+    if len(rankings) < 2:
+        return rankings
+
+    h2h_mode = structure.tiebreaker_head_to_head
+    needs_matches = h2h_mode != 'none' or structure.tiebreaker_away_goals
+
+    matches_by_team = defaultdict(list)
+    away_goals = defaultdict(int)
+    if needs_matches:
+        played = Match.objects.filter(
+            tournament=tournament, played=True, home_score__isnull=False, away_score__isnull=False
+        ).values_list('home_team_id', 'away_team_id', 'home_score', 'away_score')
+        for match in played:
+            home_id, away_id, _, as_ = match
+            matches_by_team[home_id].append(match)
+            matches_by_team[away_id].append(match)
+            away_goals[away_id] += as_
+
+    h2h_keys = {}
+    if h2h_mode != 'none':
+        weights = tournament.get_points_weights()
+        rankings.sort(key=lambda r: -r.points)
+        for _, cluster in groupby(rankings, key=lambda r: r.points):
+            cluster = list(cluster)
+            if len(cluster) > 1:
+                h2h_keys.update(_head_to_head_keys(cluster, matches_by_team, weights, h2h_mode))
+
+    criteria = tiebreaker_criteria(structure)
+
+    def sort_key(ranking):
+        team_id = ranking.team.team_id
+        values = {
+            'points': (-ranking.points,),
+            'head_to_head': h2h_keys.get(team_id, ()),
+            'goal_difference': (-(ranking.goals_for - ranking.goals_against),),
+            'goals_for': (-ranking.goals_for,),
+            'away_goals': (-away_goals[team_id],),
+            'win': (-ranking.win,),
+            'name': (ranking.team.team.name,),
+        }
+        return [value for criterion in criteria for value in values[criterion]]
+
+    # Le chiavi degli scontri diretti hanno la stessa lunghezza all'interno di ogni cluster,
+    # quindi il confronto tra chiavi di squadre a pari punti è sempre omogeneo
+    rankings.sort(key=sort_key)
+    return rankings
+
+
+def compute_positions(tournament):
+    """
+    Ordina le righe di classifica del torneo girone per girone, senza scrivere nulla.
+
+    Returns:
+        Tupla (dizionario {id TournamentRanking: posizione}, dizionario {girone: righe in ordine})
+    """
+    rankings = TournamentRanking.objects.filter(tournament=tournament).select_related('team__team').order_by('group')
+
+    positions = {}
+    ordered_groups = {}
+    for group, group_rankings in groupby(rankings, key=lambda r: r.group):
+        ordered_groups[group] = order_rankings(tournament, group=group, rankings=group_rankings)
+        for position, ranking in enumerate(ordered_groups[group], start=1):
+            positions[ranking.id] = position
+    return positions, ordered_groups
+
+
+def refresh_positions(tournament):
+    """
+    Ricalcola e salva la posizione di ogni riga di classifica del torneo.
+
+    Le righe vengono caricate una sola volta, ordinate girone per girone con
+    ``order_rankings`` e scritte con un solo ``bulk_update``; nella stessa
+    transazione viene riscritta la classifica materializzata (``StandingsSnapshot``).
+
+    Returns:
+        Dizionario {id TournamentRanking: posizione}
+    """
+    positions, ordered_groups = compute_positions(tournament)
+    updated = []
+    for group_rankings in ordered_groups.values():
+        for ranking in group_rankings:
+            if ranking.position != positions[ranking.id]:
+                ranking.position = positions[ranking.id]
+                updated.append(ranking)
+
+    with transaction.atomic():
+        TournamentRanking.objects.bulk_update(updated, ['position'])
+        write_snapshot(tournament, ordered_groups)
+    return positions
+
+
+def invalidate_positions(tournament_ids):
+    """
+    Azzera le posizioni salvate e invalida le classifiche in cache dei tornei;
+    posizioni e classifica materializzata vengono ricalcolate dopo il commit.
+    """
+    tournament_ids = list(tournament_ids)
+    TournamentRanking.objects.filter(tournament_id__in=tournament_ids, position__isnull=False).update(position=None)
+    invalidate_tournaments(tournament_ids)
+    # A transazione conclusa ricalcoliamo posizioni e classifica materializzata
+    transaction.on_commit(lambda: refresh_tournaments(tournament_ids))
+
+
+def refresh_tournaments(tournament_ids):
+    """
+    Ricalcola posizioni e classifica materializzata dei tornei indicati che hanno
+    ancora posizioni azzerate, poi invalida le loro classifiche in cache.
+
+    Più scritture nella stessa transazione accodano più chiamate: dopo la prima
+    i tornei sono già aggiornati e le successive costano una sola query.
+    """
+    tournaments = list(
+        Tournament.objects.select_related('structure')
+        .filter(pk__in=tournament_ids, tournament_rankings__position__isnull=True).distinct()
+    )
+    for tournament in tournaments:
+        refresh_positions(tournament)
+    invalidate_tournaments([tournament.id for tournament in tournaments])
@@ -0,0 +1,196 @@
+"""
+Passaggio alla stagione successiva.
+
+Percorre il grafo delle regole di qualificazione dei tornei di una stagione,
+calcola una sola volta l'ordine finale di ogni torneo e crea in un'unica
+transazione la nuova stagione con le sue ``SeasonTeam``, i tornei, le
+iscrizioni (tenendo conto di promozioni, retrocessioni e playoff), le classifiche
+iniziali e le regole tra i tornei ricreati.
+"""
+import logging
+from collections import defaultdict
+
+from django.db import transaction
+
+from core.cache import bump_versions, invalidate_tournaments, model_scope
+from core.models import Season, SeasonTeam, Tournament, TournamentQualificationRule, TournamentRanking
+from core.services.ranking import order_rankings, refresh_positions
+
+logger = logging.getLogger("simulation")
+
+# Tipi di regola che spostano una squadra in un altro torneo la stagione successiva
+MOVE_TYPES = ('promotion', 'relegation')
+QUALIFIED_TYPES = ('promotion', 'qualification', 'playoff')
+RELEGATED_TYPES = ('relegation', 'playout')
+
+# Campi copiati nei tornei della nuova stagione
+TOURNAMENT_FIELDS = ('name', 'description', 'structure_id', 'max_teams', 'min_teams', 'trophy_id')
+
+
+def _bracket_order(tournament, season_teams):
+    """Ordine finale di un torneo a eliminazione diretta: prima chi è uscito più tardi"""
+    by_team = {season_team.team_id: season_team for season_team in season_teams}
+    order = []
+    final = tournament.bracket['rounds'][-1]['ties'][0]
+    if final['winner'] is not None:
+        order.append(final['winner'])
+
+    for entry in reversed(tournament.bracket['rounds']):
+        for tie in entry['ties']:
+            if tie['winner'] is None:
+                continue
+            loser = tie['away'] if tie['winner'] == tie['home'] else tie['home']
+            if loser is not None:
+                order.append(loser)
+    return [by_team[team_id] for team_id in order if team_id in by_team]
+
+
+class FinalStandings:
+    """Ordine finale dei tornei, calcolato al più una volta per torneo e girone"""
+
+    def __init__(self, tournaments):
+        self.tournaments = {tournament.id: tournament for tournament in tournaments}
+        self.rankings = defaultdict(list)
+        for ranking in TournamentRanking.objects.filter(tournament__in=tournaments).select_related('team__team'):
+            self.rankings[ranking.tournament_id].append(ranking)
+        self._cache = {}
+
+    def order(self, tournament, group=''):
+        """
+        Restituisce le righe ``TournamentRanking`` del torneo (o del girone) in ordine finale.
+        """
+        key = (tournament.id, group)
+        if key not in self._cache:
+            rankings = self.rankings.get(tournament.id, [])
+            if tournament.bracket:
+                positions = {st.id: i for i, st in enumerate(_bracket_order(tournament, [r.team for r in rankings]))}
+                ordered = sorted((r for r in rankings if r.team_id in positions), key=lambda r: positions[r.team_id])
+            else:
+                if group:
+                    rankings = [r for r in rankings if r.group == group]
+                ordered = order_rankings(tournament, rankings=rankings)
+            self._cache[key] = ordered
+        return self._cache[key]
+
+
+def rollover_season(season, year=None):
+    """
+    Crea la stagione successiva applicando le regole di qualificazione.
+
+    Vengono ricreati i tornei principali (quelli senza torneo padre); ogni squadra
+    resta nel proprio campionato salvo le regole di promozione e retrocessione, che la
+    spostano nel torneo di destinazione, e le regole con ``season_offset`` >= 1
+    (es. qualificazione a una coppa), che la iscrivono anche al torneo di
+    destinazione. Le regole dei playoff vengono seguite fino al torneo principale.
+
+    Args:
+        season: ``Season`` da chiudere
+        year: anno della nuova stagione (di default quello successivo)
+
+    Returns:
+        Tupla (nuova ``Season``, dizionario {id torneo precedente: nuovo ``Tournament``})
+    """
+    with transaction.atomic():
+        tournaments = list(season.tournaments.select_related('structure').prefetch_related('teams__team'))
+        main_tournaments = [tournament for tournament in tournaments if tournament.parent_tournament_id is None]
+        standings = FinalStandings(tournaments)
+
+        # Iscrizione di partenza: ogni squadra resta nel proprio campionato; alle coppe
+        # si accede di nuovo solo tramite le regole con ``season_offset``
+        primary = {}
+        extra = defaultdict(set)
+        for tournament in main_tournaments:
+            if tournament.structure.is_cup or tournament.structure.format == 'cup':
+                continue
+            for season_team in tournament.teams.all():
+                primary[season_team.team_id] = tournament.id
+
+        rules = list(
+            TournamentQualificationRule.objects.filter(from_tournament__in=tournaments, is_active=True)
+            .select_related('to_tournament')
+            .order_by('from_tournament_id', 'min_rank')
+        )
+
+        flagged = {}
+        main_ids = {tournament.id for tournament in main_tournaments}
+        for rule in rules:
+            ordered = standings.order(standings.tournaments[rule.from_tournament_id], rule.group)
+            selected = ordered[max(rule.min_rank, 1) - 1:rule.max_rank]
+
+            for ranking in selected:
+                if rule.qualification_type in QUALIFIED_TYPES:
+                    ranking.qualified = True
+                elif rule.qualification_type in RELEGATED_TYPES:
+                    ranking.relegated = True
+                flagged[ranking.id] = ranking
+
+            destination = rule.to_tournament_id
+            if destination not in main_ids:
+                # Torneo della stessa stagione che non viene ricreato (es. playoff)
+                continue
+            for ranking in selected:
+                team_id = ranking.team.team_id
+                if rule.qualification_type in MOVE_TYPES:
+                    primary[team_id] = destination
+                elif rule.season_offset >= 1 and primary.get(team_id) != destination:
+                    extra[team_id].add(destination)
+
+        TournamentRanking.objects.bulk_update(list(flagged.values()), ['qualified', 'relegated'])
+        # La stagione chiusa non verrà più scritta: posizioni e classifica materializzata
+        # (con i nuovi flag) vengono salvate ora, così le letture successive non devono ricalcolarle
+        for tournament in tournaments:
+            refresh_positions(tournament)
+        invalidate_tournaments(standings.tournaments)
+
+        # Nuova stagione con squadre, tornei, iscrizioni e classifiche
+        season.is_active = False
+        season.save(update_fields=['is_active'])
+        new_season = Season.objects.create(league=season.league, year=year or season.year + 1, is_active=True)
+
+        team_ids = sorted(set(primary) | set(extra))
+        season_teams = SeasonTeam.objects.bulk_create([SeasonTeam(team_id=team_id, season=new_season) for team_id in team_ids])
+        season_team_by_team = {season_team.team_id: season_team for season_team in season_teams}
+
+        new_tournaments = {
+            tournament.id: Tournament(
+                season=new_season, status='pending',
+                **{field: getattr(tournament, field) for field in TOURNAMENT_FIELDS}
+            )
+            for tournament in main_tournaments
+        }
+        Tournament.objects.bulk_create(new_tournaments.values())
+
+        memberships = [(tournament_id, team_id) for team_id, tournament_id in primary.items()]
+        memberships += [(tournament_id, team_id) for team_id, destinations in extra.items() for tournament_id in destinations]
+
+        Membership = Tournament.teams.through
+        Membership.objects.bulk_create([
+            Membership(tournament_id=new_tournaments[tournament_id].id, seasonteam_id=season_team_by_team[team_id].id)
+            for tournament_id, team_id in memberships
+        ])
+        TournamentRanking.objects.bulk_create([
+            TournamentRanking(tournament=new_tournaments[tournament_id], team=season_team_by_team[team_id])
+            for tournament_id, team_id in memberships
+        ])
+
+        # Le regole tra tornei principali valgono anche nella nuova stagione
+        TournamentQualificationRule.objects.bulk_create([
+            TournamentQualificationRule(
+                from_tournament=new_tournaments[rule.from_tournament_id],
+                to_tournament=new_tournaments[rule.to_tournament_id],
+                min_rank=rule.min_rank, max_rank=rule.max_rank,
+                qualification_type=rule.qualification_type, group=rule.group,
+                description=rule.description, season_offset=rule.season_offset,
+            )
+            for rule in rules
+            if rule.from_tournament_id in main_ids and rule.to_tournament_id in main_ids
+        ])
+
+    # Le scritture in blocco non inviano segnali: invalidiamo qui le risposte in cache
+    bump_versions(model_scope(Tournament), model_scope(SeasonTeam))
+
+    logger.info(
+        "Stagione %s chiusa: creata la stagione %s con %d tornei e %d squadre",
+        season.year, new_season.year, len(new_tournaments), len(season_teams),
+    )
+    return new_season, new_tournaments
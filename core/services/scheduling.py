@@ -0,0 +1,70 @@
+"""
+Generazione del calendario dei campionati all'italiana.
+
+Usa il metodo del cerchio (tabelle di Berger): una squadra resta fissa e le
+altre ruotano, così ogni giornata contiene ogni squadra al più una volta e il
+calendario è valido per costruzione in O(n²). Casa e trasferta sono alternate
+in modo da ridurre al minimo le doppie gare consecutive nello stesso campo; il
+ritorno è lo specchio dell'andata.
+"""
+import random
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+KICKOFF_TIME = time(15, 0)
+DAYS_BETWEEN_ROUNDS = 7
+
+
+def round_robin_rounds(teams, legs=1, seed=None):
+    """
+    Calcola le giornate di un girone all'italiana.
+
+    Con un numero dispari di squadre viene aggiunto un riposo: la squadra
+    abbinata al riposo salta la giornata e la partita non viene generata.
+
+    Args:
+        teams: sequenza di squadre (qualsiasi oggetto)
+        legs: numero di gironi; quelli pari invertono casa e trasferta
+        seed: seme per l'ordine di sorteggio, con lo stesso seme il calendario è identico
+
+    Returns:
+        Lista di giornate, ognuna lista di coppie (casa, trasferta)
+    """
+    teams = list(teams)
+    random.Random(seed).shuffle(teams)
+    if len(teams) % 2:
+        teams.append(None)  # riposo
+
+    n = len(teams)
+    if n < 2:
+        return []
+
+    fixed, rotating = teams[-1], teams[:-1]
+    size = n - 1
+
+    first_leg = []
+    for r in range(size):
+        # La squadra fissa alterna casa e trasferta a ogni giornata
+        opponent = rotating[r]
+        pairs = [(opponent, fixed) if r % 2 == 0 else (fixed, opponent)]
+        for k in range(1, n // 2):
+            a, b = rotating[(r + k) % size], rotating[(r - k) % size]
+            pairs.append((a, b) if k % 2 else (b, a))
+        first_leg.append([(home, away) for home, away in pairs if home is not None and away is not None])
+
+    rounds = []
+    for leg in range(legs):
+        if leg % 2:
+            rounds.extend([(away, home) for home, away in fixtures] for fixtures in first_leg)
+        else:
+            rounds.extend([list(fixtures) for fixtures in first_leg])
+    return rounds
+
+
+def kickoff_times(start_date, count, days_between=DAYS_BETWEEN_ROUNDS, kickoff=KICKOFF_TIME):
+    """
+    Restituisce gli orari di inizio (aware) di ``count`` giornate a partire da ``start_date``.
+    """
+    first = timezone.make_aware(datetime.combine(start_date, kickoff))
+    return [first + timedelta(days=days_between * i) for i in range(count)]
@@ -0,0 +1,193 @@
+"""
+Simulatore Monte Carlo dell'esito di una stagione.
+
+Prende un torneo in corso, carica una sola volta classifica attuale e partite
+rimanenti in array NumPy e ripete il resto della stagione N volte su un pool di
+processi, ognuno con il proprio flusso casuale. Le classifiche simulate sono
+ordinate con i criteri di spareggio della struttura del torneo, gli stessi di
+``core.services.ranking``.
+"""
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from core.models import Match
+from core.services.match_simulation import expected_goals, team_strengths
+from core.services.monte_carlo import PAIR_STATS, WEIGHT_KEYS, simulate_positions
+from core.services.ranking import tiebreaker_criteria
+
+logger = logging.getLogger("simulation")
+
+
+def _load_state(tournament):
+    """Carica squadre, classifica attuale, scontri diretti e partite rimanenti come array."""
+    season_teams = list(tournament.teams.select_related('team').order_by('id'))
+    index_by_team = {st.team_id: i for i, st in enumerate(season_teams)}
+    n_teams = len(season_teams)
+
+    weights = tournament.get_points_weights()
+    points = np.zeros(n_teams)
+    goal_diff = np.zeros(n_teams)
+    goals_for = np.zeros(n_teams)
+    away_goals = np.zeros(n_teams)
+    wins = np.zeros(n_teams)
+    pairs = {key: np.zeros((n_teams, n_teams)) for key in PAIR_STATS}
+
+    home_idx, away_idx = [], []
+    matches = Match.objects.filter(tournament=tournament, cancelled=False).values_list(
+        'home_team_id', 'away_team_id', 'played', 'home_score', 'away_score',
+        'extra_time_played', 'home_score_extra_time', 'away_score_extra_time',
+        'penalties_played', 'home_score_penalties', 'away_score_penalties',
+    )
+    allow_draws = tournament.structure.allow_draws
+    for home_id, away_id, played, hs, as_, extra_time, he, ae, penalties, hp, ap in matches:
+        if home_id not in index_by_team or away_id not in index_by_team:
+            continue
+        h, a = index_by_team[home_id], index_by_team[away_id]
+
+        if not played:
+            home_idx.append(h)
+            away_idx.append(a)
+            continue
+        if hs is None or as_ is None:
+            continue
+
+        goals_for[h] += hs
+        goals_for[a] += as_
+        goal_diff[h] += hs - as_
+        goal_diff[a] += as_ - hs
+        away_goals[a] += as_
+
+        # Scontri diretti sul risultato dei tempi regolamentari, come in core.services.ranking
+        pairs['goals_for'][h, a] += hs
+        pairs['goals_for'][a, h] += as_
+        pairs['goal_diff'][h, a] += hs - as_
+        pairs['goal_diff'][a, h] += as_ - hs
+        pairs['away_goals'][a, h] += as_
+        if hs != as_:
+            winner, loser = (h, a) if hs > as_ else (a, h)
+            pairs['points'][winner, loser] += weights['win']
+            pairs['points'][loser, winner] += weights['loss']
+        else:
+            pairs['points'][h, a] += weights['draw']
+            pairs['points'][a, h] += weights['draw']
+
+        if hs > as_:
+            points[h] += weights['win']
+            points[a] += weights['loss']
+            wins[h] += 1
+        elif as_ > hs:
+            points[a] += weights['win']
+            points[h] += weights['loss']
+            wins[a] += 1
+        elif not allow_draws and extra_time and he is not None and ae is not None and he != ae:
+            winner, loser = (h, a) if he > ae else (a, h)
+            points[winner] += weights['win_extra_time']
+            points[loser] += weights['loss_extra_time']
+        elif not allow_draws and penalties and hp is not None and ap is not None:
+            winner, loser = (h, a) if hp > ap else (a, h)
+            points[winner] += weights['win_penalty']
+            points[loser] += weights['loss_penalty']
+        else:
+            points[h] += weights['draw']
+            points[a] += weights['draw']
+
+    # Penalizzazioni già inflitte
+    points_penalty = dict(tournament.tournament_rankings.values_list('team_id', 'points_penalty'))
+    for i, st in enumerate(season_teams):
+        points[i] -= points_penalty.get(st.id, 0)
+
+    # Ultimo criterio: ordine alfabetico del nome della squadra
+    names = [st.team.name for st in season_teams]
+    name_rank = np.empty(n_teams)
+    name_rank[sorted(range(n_teams), key=names.__getitem__)] = np.arange(n_teams)
+
+    return {
+        'season_teams': season_teams,
+        'home_idx': np.asarray(home_idx, dtype=np.int64),
+        'away_idx': np.asarray(away_idx, dtype=np.int64),
+        'base': {
+            'points': points,
+            'goal_diff': goal_diff,
+            'goals_for': goals_for,
+            'away_goals': away_goals,
+            'win': wins,
+            'name_rank': name_rank,
+            'pairs': pairs,
+        },
+        'weights': tuple(float(weights[key]) for key in WEIGHT_KEYS),
+    }
+
+
+def simulate_season_outcomes(tournament, iterations=10000, workers=None, seed=None):
+    """
+    Stima le probabilità di ogni piazzamento finale e di ogni regola di qualificazione.
+
+    Args:
+        tournament: ``Tournament`` in corso
+        iterations: numero di stagioni da simulare (es. 100000)
+        workers: numero di processi; 1 esegue tutto nel processo corrente
+        seed: seme opzionale, con lo stesso seme e gli stessi worker il risultato è identico
+
+    Returns:
+        Dizionario con il numero di simulazioni e, per ogni ``SeasonTeam``, la lista
+        delle probabilità di posizione e delle probabilità per ogni regola di qualificazione
+    """
+    state = _load_state(tournament)
+    season_teams = state['season_teams']
+    n_teams = len(season_teams)
+    if n_teams == 0 or iterations <= 0:
+        return {'iterations': 0, 'teams': []}
+
+    team_ids = np.asarray([st.team_id for st in season_teams], dtype=np.int64)
+    strengths = team_strengths(team_ids, tournament.season_id)
+    home_lambda, away_lambda = expected_goals(strengths[state['home_idx']], strengths[state['away_idx']])
+
+    workers = workers or os.cpu_count() or 1
+    workers = max(1, min(workers, iterations))
+    chunks = [iterations // workers + (1 if i < iterations % workers else 0) for i in range(workers)]
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+
+    structure = tournament.structure
+    args = [
+        (seeds[i], chunks[i], state['home_idx'], state['away_idx'], home_lambda, away_lambda,
+         state['base'], state['weights'], structure.allow_draws, tiebreaker_criteria(structure),
+         structure.tiebreaker_head_to_head)
+        for i in range(workers)
+    ]
+
+    if workers == 1:
+        counts = simulate_positions(*args[0])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            counts = sum(executor.map(simulate_positions, *zip(*args)))
+
+    probabilities = counts / float(iterations)
+    cumulative = np.concatenate([np.zeros((n_teams, 1)), np.cumsum(probabilities, axis=1)], axis=1)
+
+    rules = list(tournament.qualification_rules.filter(is_active=True, group=''))
+    teams = []
+    for i, season_team in enumerate(season_teams):
+        qualification = []
+        for rule in rules:
+            low = max(rule.min_rank, 1) - 1
+            high = min(rule.max_rank, n_teams)
+            probability = cumulative[i, high] - cumulative[i, low] if high > low else 0.0
+            qualification.append({
+                'rule': rule,
+                'type': rule.qualification_type,
+                'probability': float(probability),
+            })
+
+        teams.append({
+            'team': season_team,
+            'positions': probabilities[i].tolist(),
+            'expected_position': float((probabilities[i] * np.arange(1, n_teams + 1)).sum()),
+            'qualification': qualification,
+        })
+
+    teams.sort(key=lambda row: row['expected_position'])
+    logger.info("Simulate %d stagioni per '%s' su %d processi", iterations, tournament.name, workers)
+    return {'iterations': iterations, 'teams': teams}
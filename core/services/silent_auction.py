@@ -0,0 +1,132 @@
+"""
+Asta silenziosa del fantacalcio.
+
+Le squadre inviano offerte in busta chiusa (``AuctionBid``) durante una
+finestra di tempo; alla chiusura ``resolve_silent_auction`` assegna tutti i
+giocatori in un solo passaggio. Le offerte vengono ordinate per importo
+decrescente e, a parità, per ``timestamp``: scorrendole, ogni giocatore va alla
+prima offerta ancora valida. Quando una squadra esaurisce budget o posti in
+rosa le sue offerte successive vengono scartate e il giocatore passa
+all'offerta seguente, così i vincoli di budget si propagano senza iterazioni.
+Il costo è dominato dall'ordinamento, O(n log n) nel numero di offerte.
+"""
+import logging
+import time
+from collections import Counter
+
+from django.db import transaction
+
+from core.models import AuctionBid, FantaTeam, FantaTeamPlayer, MarketTransaction, Player
+from core.services.auction import MIN_INCREMENT, ROLE_QUOTAS
+from core.services.market import settle_batch
+
+logger = logging.getLogger("transfer")
+
+
+def clear_bids(bids, budgets, rosters, quotas=None, min_increment=MIN_INCREMENT):
+    """
+    Assegna i giocatori alle offerte più alte che le squadre possono permettersi.
+
+    Args:
+        bids: sequenza di tuple (importo, timestamp, id offerta, id squadra, id giocatore, ruolo)
+        budgets: dizionario {id squadra: crediti disponibili}
+        rosters: dizionario {id squadra: Counter dei giocatori già in rosa per macro-ruolo}
+        quotas: posti in rosa per macro-ruolo
+        min_increment: crediti da tenere da parte per ogni altro posto libero in rosa
+
+    Returns:
+        Lista di tuple (id offerta, id squadra, id giocatore, importo) vincenti
+    """
+    quotas = quotas or ROLE_QUOTAS
+    total_slots = sum(quotas.values())
+    budgets = dict(budgets)
+    filled = {team_id: Counter(rosters.get(team_id, ())) for team_id in budgets}
+    sizes = {team_id: sum(roles.values()) for team_id, roles in filled.items()}
+
+    assigned = set()
+    winners = []
+    for amount, _, bid_id, team_id, player_id, role in sorted(bids, key=lambda bid: (-bid[0], bid[1], bid[2])):
+        if player_id in assigned or team_id not in budgets:
+            continue
+        if filled[team_id][role] >= quotas.get(role, 0):
+            continue
+        # La squadra deve poter completare la rosa con un credito per ogni altro posto libero
+        if amount > budgets[team_id] - (total_slots - sizes[team_id] - 1) * min_increment:
+            continue
+        assigned.add(player_id)
+        budgets[team_id] -= amount
+        filled[team_id][role] += 1
+        sizes[team_id] += 1
+        winners.append((bid_id, team_id, player_id, amount))
+    return winners
+
+
+def resolve_silent_auction(league, since=None, until=None, quotas=None):
+    """
+    Chiude la finestra di offerte di un'asta silenziosa e registra gli acquisti.
+
+    Args:
+        league: ``FantaLeague`` dell'asta
+        since: se indicato, considera solo le offerte inviate da questo istante
+        until: se indicato, considera solo le offerte inviate prima di questo istante
+        quotas: posti in rosa per macro-ruolo (di default ``ROLE_QUOTAS``)
+
+    Returns:
+        Dizionario con giocatori assegnati, giocatori con offerte rimasti senza
+        squadra e secondi impiegati
+    """
+    start = time.perf_counter()
+    with transaction.atomic():
+        team_ids = list(league.teams.order_by('pk').values_list('pk', flat=True))
+        teams = FantaTeam.objects.select_for_update().filter(pk__in=team_ids).order_by('pk')
+        budgets, owners = {}, {}
+        for team_id, budget, owner_id in teams.values_list('pk', 'budget', 'owner_id'):
+            budgets[team_id], owners[team_id] = budget, owner_id
+
+        rosters = {team_id: Counter() for team_id in team_ids}
+        owned = set()
+        rows = FantaTeamPlayer.objects.filter(fanta_team_id__in=team_ids, is_active=True)
+        for team_id, player_id, role in rows.values_list('fanta_team_id', 'player_id', 'player__main_role'):
+            rosters[team_id][Player.ROLE_CATEGORIES.get(role)] += 1
+            owned.add(player_id)
+
+        window = AuctionBid.objects.filter(league=league, team_id__in=team_ids)
+        if since is not None:
+            window = window.filter(timestamp__gte=since)
+        if until is not None:
+            window = window.filter(timestamp__lt=until)
+        bids = [
+            (amount, timestamp, bid_id, team_id, player_id, Player.ROLE_CATEGORIES.get(role))
+            for bid_id, team_id, player_id, amount, timestamp, role in window.values_list(
+                'pk', 'team_id', 'player_id', 'amount', 'timestamp', 'player__main_role'
+            )
+            if player_id not in owned
+        ]
+
+        winners = clear_bids(bids, budgets, rosters, quotas)
+
+        # I flag delle offerte su giocatori già in rosa restano: registrano acquisti precedenti
+        window.filter(is_winning=True).exclude(player_id__in=rows.values('player_id')).update(is_winning=False)
+        AuctionBid.objects.filter(pk__in=[bid_id for bid_id, _, _, _ in winners]).update(is_winning=True)
+        transactions = MarketTransaction.objects.bulk_create([
+            MarketTransaction(
+                transaction_type='buy', league=league, created_by_id=owners[team_id],
+                team_id=team_id, player_id=player_id, price=amount, notes="Asta silenziosa",
+            )
+            for _, team_id, player_id, amount in winners
+        ])
+        # Rose e budget sono aggiornati in blocco dall'esecutore del mercato, con le squadre già bloccate
+        completed, rejected = settle_batch([tx.pk for tx in transactions])
+    elapsed = time.perf_counter() - start
+
+    assigned = {tx.player_id: (tx.team_id, tx.price) for tx in completed}
+    report = {
+        'assigned': assigned,
+        'unassigned': sorted({bid[4] for bid in bids} - set(assigned)),
+        'seconds': elapsed,
+    }
+    logger.info(
+        "Asta silenziosa lega %s: %d offerte, %d giocatori assegnati, %d senza squadra, %d rifiutati in %.3fs",
+        league.id, len(bids), len(assigned), len(report['unassigned']), len(rejected), elapsed,
+    )
+    return report
@@ -1,12 +1,33 @@
-from core.models import Match, TournamentRule
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+
+from core.models import Match, Tournament, TournamentRanking
+from core.models.tournament_ranking import RESULT_COUNTERS, match_result_counters
+from core.cache import invalidate_tournaments
+from core.services.ranking import invalidate_positions, refresh_positions
+
+RANKING_FIELDS = RESULT_COUNTERS + ('goals_for', 'goals_against')
 
 
 def get_tournament_standings(tournament):
-    rules = tournament.rules.filter(is_active=True).order_by('priority')
-    matches = tournament.matches.filter(played=True)
+    """
+    Calcola la classifica di un torneo a partire dalle partite giocate.
+
+    Le regole punti vengono lette una sola volta e le partite sono estratte come
+    tuple di valori, quindi il numero di query non dipende dal numero di partite.
+
+    Returns:
+        Lista di coppie (SeasonTeam, statistiche) ordinata per punti e differenza reti
+    """
+    weights = tournament.get_points_weights()
+    rule_win, rule_draw, rule_loss = weights['win'], weights['draw'], weights['loss']
 
     standings = {}
-    for team in tournament.teams.all():
+    season_team_by_team = {}
+    for team in tournament.teams.select_related('team'):
+        season_team_by_team[team.team_id] = team
         standings[team] = {
             'points': 0,
             'goals_for': 0,
@@ -14,19 +35,17 @@ def get_tournament_standings(tournament):
             # altri criteri opzionali
         }
 
-    for match in matches:
-        h, a = match.home_team, match.away_team
-        hs, as_ = match.home_score, match.away_score
+    matches = tournament.matches.filter(played=True).values_list('home_team_id', 'away_team_id', 'home_score', 'away_score')
+    for home_id, away_id, hs, as_ in matches:
+        h, a = season_team_by_team.get(home_id), season_team_by_team.get(away_id)
+        if h is None or a is None or hs is None or as_ is None:
+            continue
 
         standings[h]['goals_for'] += hs
         standings[h]['goals_against'] += as_
         standings[a]['goals_for'] += as_
         standings[a]['goals_against'] += hs
 
-        rule_win = rules.get(rule_type='point_win').value
-        rule_draw = rules.get(rule_type='point_draw').value
-        rule_loss = rules.get(rule_type='point_loss').value
-
         if hs > as_:
             standings[h]['points'] += rule_win
             standings[a]['points'] += rule_loss
@@ -47,3 +66,107 @@ def get_tournament_standings(tournament):
     )
 
     return sorted_teams
+
+
+def _add_counters(totals, counters, sign):
+    for field, value in counters.items():
+        totals[field] += sign * value
+    totals['matches_played'] += sign * sum(counters.get(field, 0) for field in RESULT_COUNTERS)
+
+
+def apply_match_results(changes):
+    """
+    Applica alla classifica solo la variazione dovuta ai risultati modificati.
+
+    Per ogni partita si sottrae il contributo del risultato precedente e si somma
+    quello nuovo; le differenze vengono scritte sulle righe ``TournamentRanking``
+    coinvolte con espressioni ``F()`` in un'unica transazione.
+
+    È l'unico punto in cui la classifica segue i risultati: le scritture in blocco
+    sulle partite, che non inviano segnali, devono chiamarla esplicitamente (o
+    ricalcolare tutto con ``rebuild_tournament_rankings``), altrimenti la classifica
+    incrementale si disallinea.
+
+    Args:
+        changes: iterabile di coppie (risultato precedente, risultato attuale), dove
+            ogni risultato è un dizionario ``Match.result_snapshot()`` oppure None
+
+    Returns:
+        Insieme degli id dei tornei la cui classifica è cambiata
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    allow_draws = {}
+
+    changes = [(old, new) for old, new in changes if old != new]
+    tournament_ids = {r['tournament_id'] for change in changes for r in change if r}
+    if not tournament_ids:
+        return set()
+
+    tournaments = Tournament.objects.select_related('structure').in_bulk(tournament_ids)
+    for tournament_id, tournament in tournaments.items():
+        allow_draws[tournament_id] = tournament.structure.allow_draws
+
+    for old, new in changes:
+        for result, sign in ((old, -1), (new, 1)):
+            if not result:
+                continue
+            home, away = match_result_counters(result, allow_draws[result['tournament_id']])
+            if home is None:
+                continue
+            _add_counters(deltas[(result['tournament_id'], result['home_team_id'])], home, sign)
+            _add_counters(deltas[(result['tournament_id'], result['away_team_id'])], away, sign)
+
+    weights = {tournament_id: tournament.get_points_weights() for tournament_id, tournament in tournaments.items()}
+
+    updated = set()
+    with transaction.atomic():
+        for (tournament_id, team_id), delta in deltas.items():
+            delta = {field: value for field, value in delta.items() if value}
+            if not delta:
+                continue
+            points = sum(weights[tournament_id].get(field, 0) * value for field, value in delta.items())
+            update = {field: F(field) + value for field, value in delta.items()}
+            if points:
+                update['points'] = F('points') + points
+            TournamentRanking.objects.filter(tournament_id=tournament_id, team__team_id=team_id).update(**update)
+            updated.add(tournament_id)
+
+        # Le posizioni salvate non sono più valide: vengono ricalcolate dopo il commit
+        if updated:
+            invalidate_positions(updated)
+
+    return updated
+
+
+def rebuild_tournament_rankings(tournament):
+    """
+    Ricalcola da zero la classifica di un torneo (riparazione).
+
+    Legge tutte le partite giocate con una sola query, salva le righe con un
+    ``bulk_update`` e ricalcola le posizioni.
+    """
+    allow_draws = tournament.structure.allow_draws
+    totals = defaultdict(lambda: defaultdict(int))
+
+    for result in Match.objects.filter(tournament=tournament, played=True).values(*Match.RESULT_FIELDS):
+        home, away = match_result_counters(result, allow_draws)
+        if home is None:
+            continue
+        _add_counters(totals[result['home_team_id']], home, 1)
+        _add_counters(totals[result['away_team_id']], away, 1)
+
+    weights = tournament.get_points_weights()
+    rankings = list(TournamentRanking.objects.filter(tournament=tournament).select_related('team'))
+    for ranking in rankings:
+        counters = totals.get(ranking.team.team_id, {})
+        for field in RANKING_FIELDS + ('matches_played',):
+            setattr(ranking, field, counters.get(field, 0))
+        ranking.points = sum(counters.get(field, 0) * value for field, value in weights.items()) - ranking.points_penalty
+
+    TournamentRanking.objects.bulk_update(rankings, RANKING_FIELDS + ('matches_played', 'points'))
+    invalidate_tournaments([tournament.id])
+
+    positions = refresh_positions(tournament)
+    for ranking in rankings:
+        ranking.position = positions.get(ranking.id)
+    return rankings
@@ -0,0 +1,115 @@
+"""
+Classifiche materializzate.
+
+Le righe di ``StandingsSnapshot`` vengono riscritte da ``refresh_positions``
+ogni volta che le posizioni di un torneo vengono ricalcolate: le API leggono
+così righe già ordinate, con forma e differenza reti, senza ricalcolare gli
+spareggi a ogni richiesta.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from core.models import Match, StandingsSnapshot, TournamentRanking
+from core.models.tournament_ranking import match_result_counters
+
+FORM_LENGTH = 5
+FORM_WIN, FORM_DRAW, FORM_LOSS = 'V', 'N', 'P'
+
+
+def _form_letter(counters):
+    if counters.get('win') or counters.get('win_extra_time') or counters.get('win_penalty'):
+        return FORM_WIN
+    if counters.get('draw'):
+        return FORM_DRAW
+    return FORM_LOSS
+
+
+def recent_form(tournament, length=FORM_LENGTH):
+    """
+    Ultimi risultati di ogni squadra del torneo, letti con una sola query.
+
+    Returns:
+        Dizionario {id Team: stringa dal risultato più vecchio al più recente}
+    """
+    allow_draws = tournament.structure.allow_draws
+    form = defaultdict(list)
+    played = (
+        Match.objects.filter(tournament=tournament, played=True)
+        .order_by('-kickoff_datetime', '-id')
+        .values(*Match.RESULT_FIELDS)
+    )
+    for result in played:
+        home, away = match_result_counters(result, allow_draws)
+        if home is None:
+            continue
+        for team_id, counters in ((result['home_team_id'], home), (result['away_team_id'], away)):
+            if len(form[team_id]) < length:
+                form[team_id].append(_form_letter(counters))
+    return {team_id: ''.join(reversed(letters)) for team_id, letters in form.items()}
+
+
+def build_snapshot(tournament, ordered_groups):
+    """
+    Costruisce, senza salvarle, le righe materializzate della classifica di un torneo.
+
+    Args:
+        tournament: ``Tournament`` di riferimento
+        ordered_groups: dizionario {girone: righe ``TournamentRanking`` in ordine di classifica}
+    """
+    form = recent_form(tournament)
+    rows = []
+    for group, rankings in ordered_groups.items():
+        for position, ranking in enumerate(rankings, start=1):
+            rows.append(StandingsSnapshot(
+                tournament_id=tournament.id,
+                team=ranking.team,
+                group=group,
+                position=position,
+                played=ranking.matches_played,
+                win=ranking.win + ranking.win_extra_time + ranking.win_penalty,
+                draw=ranking.draw,
+                loss=ranking.loss + ranking.loss_extra_time + ranking.loss_penalty,
+                goals_for=ranking.goals_for,
+                goals_against=ranking.goals_against,
+                goal_difference=ranking.goals_for - ranking.goals_against,
+                points=ranking.points,
+                form=form.get(ranking.team.team_id, ''),
+                qualified=ranking.qualified,
+                relegated=ranking.relegated,
+            ))
+    return rows
+
+
+def write_snapshot(tournament, ordered_groups):
+    """Riscrive le righe materializzate della classifica di un torneo (vedi ``build_snapshot``)"""
+    rows = build_snapshot(tournament, ordered_groups)
+    with transaction.atomic():
+        StandingsSnapshot.objects.filter(tournament_id=tournament.id).delete()
+        StandingsSnapshot.objects.bulk_create(rows)
+    return rows
+
+
+def get_standings(tournament, group=None):
+    """
+    Righe della classifica di un torneo (o di un girone), pronte per le API.
+
+    Non scrive mai: la classifica materializzata viene riscritta dal lato delle
+    scritture, dopo il commit di ogni modifica (vedi ``invalidate_positions``).
+    Nel breve intervallo in cui le posizioni sono azzerate, o se la classifica
+    non è ancora stata materializzata, le righe vengono calcolate in memoria.
+    """
+    stale = TournamentRanking.objects.filter(tournament=tournament, position__isnull=True).exists()
+    if stale or not StandingsSnapshot.objects.filter(tournament=tournament).exists():
+        from core.services.ranking import compute_positions
+
+        _, ordered_groups = compute_positions(tournament)
+        rows = build_snapshot(tournament, ordered_groups)
+        if group is not None:
+            rows = [row for row in rows if row.group == group]
+        return sorted(rows, key=lambda row: (row.group, row.position))
+
+    rows = StandingsSnapshot.objects.filter(tournament=tournament).select_related('team__team')
+    if group is not None:
+        rows = rows.filter(group=group)
+    return rows.order_by('group', 'position')
@@ -0,0 +1,66 @@
+"""
+Generazione asincrona dei tornei.
+
+La creazione di un torneo (calendario, tabellone, playoff) viene accodata come
+task Celery e identificata da un id di job. Stato, avanzamento e risultato del
+job sono salvati nella cache di Django, così possono essere letti dall'API
+mentre il task è in esecuzione. Con un worker separato la cache deve essere
+condivisa tra i processi (``REDIS_URL``, verificata all'avvio del worker).
+L'esecuzione eager, usata senza broker, genera il torneo dentro la richiesta
+ed è pensata solo per lo sviluppo e i test.
+"""
+import logging
+import uuid
+
+from django.core.cache import cache
+
+logger = logging.getLogger("simulation")
+
+JOB_CACHE_KEY = "tournament_job:{}"
+JOB_CACHE_TIMEOUT = 60 * 60 * 24
+
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+
+
+def get_job(job_id):
+    """Restituisce lo stato del job, oppure None se non esiste (o è scaduto)"""
+    return cache.get(JOB_CACHE_KEY.format(job_id))
+
+
+def update_job(job_id, **fields):
+    """Aggiorna i campi dello stato del job e lo restituisce"""
+    state = get_job(job_id) or {'job_id': job_id}
+    state.update(fields)
+    cache.set(JOB_CACHE_KEY.format(job_id), state, JOB_CACHE_TIMEOUT)
+    return state
+
+
+def progress_reporter(job_id):
+    """Callback di avanzamento per ``TournamentFactory``: salva passo e messaggio nel job"""
+    def report(step, total, message):
+        update_job(job_id, status=JOB_RUNNING, progress=round(step * 100 / total), message=message)
+    return report
+
+
+def enqueue_tournament_generation(params):
+    """
+    Accoda la generazione di un torneo.
+
+    Args:
+        params: dizionario serializzabile in JSON con gli id di struttura,
+            stagione, squadre ed eventuali regole (vedi ``core.task.generate_tournament``)
+
+    Returns:
+        Stato iniziale del job, con il suo ``job_id``
+    """
+    from core.task import generate_tournament
+
+    job_id = uuid.uuid4().hex
+    state = update_job(job_id, status=JOB_PENDING, progress=0, message="In coda", tournament_id=None, error=None)
+    generate_tournament.apply_async(args=[job_id, params], task_id=job_id)
+    logger.info("Accodata la generazione del torneo '%s' (job %s)", params.get('name'), job_id)
+    # In modalità eager il task è già concluso: restituiamo lo stato aggiornato
+    return get_job(job_id) or state
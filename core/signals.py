@@ -0,0 +1,196 @@
+"""
+Segnali dell'applicazione core.
+
+Mantengono aggiornate le classifiche quando cambia il risultato di una partita,
+applicando solo la variazione invece di ricalcolare tutto, invalidano le
+posizioni salvate quando cambia una riga di classifica e i coefficienti
+compilati quando cambiano le regole di una lega fantacalcio. I risultati delle
+partite a eliminazione diretta fanno avanzare il tabellone. Le modifiche ai
+modelli letti dalle API in cache incrementano la versione del loro scope.
+Risultati ed eventi delle partite vengono inviati ai client iscritti al torneo
+via WebSocket, dopo il commit.
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from core.cache import bump_versions, invalidate_tournaments, model_scope, tournament_scope
+from core.models import (Continent, FantaLeagueRule, Match, MatchEvent, Nationality, Person, Player, Season,
+                         SeasonTeam, Team, Tournament, TournamentRanking, TournamentStructure, Trophy)
+from core.realtime import push, push_match_result, tournament_group
+
+# Modelli serializzati dalle API in cache (vedi core.cache)
+CACHED_MODELS = (
+    Continent, Nationality, Person, Player, Season, SeasonTeam, Team, Tournament, TournamentStructure, Trophy, User,
+)
+
+
+# Nomi dei campi del risultato come possono comparire in ``update_fields``
+RESULT_FIELD_NAMES = {field.removesuffix('_id') for field in Match.RESULT_FIELDS}
+
+
+def touches_result(update_fields):
+    """Indica se un salvataggio con questi ``update_fields`` può cambiare il risultato"""
+    if update_fields is None:
+        return True
+    return any(field.removesuffix('_id') in RESULT_FIELD_NAMES for field in update_fields)
+
+
+@receiver(pre_save, sender=Match)
+@receiver(pre_delete, sender=Match)
+def load_result_snapshot(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Legge dal database il risultato salvato delle partite caricate con ``only()``/``defer()``,
+    che non hanno lo snapshot, così la classifica riceve solo la variazione
+    """
+    if raw or instance._state.adding or hasattr(instance, '_result_snapshot') or not touches_result(update_fields):
+        return
+    instance._result_snapshot = Match.objects.filter(pk=instance.pk).values(*Match.RESULT_FIELDS).first()
+
+
+@receiver(post_save, sender=Match)
+def update_rankings_on_match_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Applica alla classifica la variazione del risultato della partita salvata"""
+    if raw or not touches_result(update_fields):
+        return
+
+    from core.services.standings import apply_match_results
+
+    previous = getattr(instance, '_result_snapshot', None)
+    current = instance.result_snapshot()
+    if previous != current:
+        apply_match_results([(previous, current)])
+        push_match_result(instance.pk, current)
+        if current['played'] and instance.round_id:
+            advance_knockout(instance.tournament_id)
+    instance._result_snapshot = current
+
+
+@receiver(post_save, sender=MatchEvent)
+def push_match_event(sender, instance, created, raw=False, **kwargs):
+    """Invia ai client del torneo ogni nuovo evento di una partita"""
+    if raw or not created:
+        return
+
+    tournament_id = instance.match.tournament_id
+    payload = {
+        'id': instance.pk,
+        'match': instance.match_id,
+        'minute': instance.minute,
+        'event_type': instance.event_type,
+        'team': instance.team_id,
+        'player': instance.player_id,
+        'description': instance.description,
+    }
+    transaction.on_commit(lambda: push(tournament_group(tournament_id), 'event', payload))
+
+
+def advance_knockout(tournament_id):
+    """Fa avanzare il tabellone se il torneo è a eliminazione diretta"""
+    tournament = Tournament.objects.filter(pk=tournament_id, bracket__isnull=False).first()
+    if tournament:
+        from core.services.bracket import advance_bracket
+
+        advance_bracket(tournament)
+
+
+@receiver(post_delete, sender=Match)
+def update_rankings_on_match_delete(sender, instance, **kwargs):
+    """Rimuove dalla classifica il contributo di una partita eliminata"""
+    from core.services.standings import apply_match_results
+
+    previous = getattr(instance, '_result_snapshot', None)
+    if previous:
+        apply_match_results([(previous, None)])
+
+
+# Nomi dei campi della classifica come possono comparire in ``update_fields``
+STANDINGS_FIELD_NAMES = {field.removesuffix('_id') for field in TournamentRanking.STANDINGS_FIELDS}
+
+
+@receiver(post_save, sender=TournamentRanking)
+def invalidate_positions_on_ranking_save(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    """Azzera le posizioni del torneo quando cambiano i dati della classifica di una riga"""
+    if raw:
+        return
+    current = instance.standings_snapshot()
+    if not created:
+        if update_fields is not None:
+            if not any(field.removesuffix('_id') in STANDINGS_FIELD_NAMES for field in update_fields):
+                return
+        elif getattr(instance, '_standings_snapshot', None) == current:
+            # Salvataggio completo che non cambia la classifica (es. cartellini o penalità già nei punti)
+            return
+
+    from core.services.ranking import invalidate_positions
+
+    invalidate_positions([instance.tournament_id])
+    instance.position = None
+    instance._standings_snapshot = current
+    # Le posizioni calcolate in memoria sul torneo già caricato non sono più valide
+    tournament = instance._state.fields_cache.get('tournament')
+    if tournament is not None:
+        tournament.__dict__.pop('_computed_positions', None)
+
+
+@receiver(post_save, sender=TournamentStructure)
+def invalidate_positions_on_structure_save(sender, instance, raw=False, **kwargs):
+    """I criteri di spareggio possono essere cambiati: azzera le posizioni dei tornei collegati"""
+    if raw:
+        return
+
+    from core.services.ranking import invalidate_positions
+
+    invalidate_positions(Tournament.objects.filter(structure=instance).values_list('id', flat=True))
+
+
+@receiver(post_save, sender=FantaLeagueRule)
+@receiver(post_delete, sender=FantaLeagueRule)
+def invalidate_league_coefficients_on_rule_change(sender, instance, **kwargs):
+    """Le regole della lega sono cambiate: il vettore compilato va ricalcolato"""
+    from core.services.fanta_scoring import invalidate_league_coefficients
+
+    invalidate_league_coefficients(instance.fanta_league_id)
+
+
+@receiver(post_delete, sender=TournamentRanking)
+def invalidate_standings_on_ranking_delete(sender, instance, **kwargs):
+    """Una riga di classifica eliminata cambia la classifica in cache"""
+    invalidate_tournaments([instance.tournament_id])
+
+
+def invalidate_cached_model(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Invalida le risposte in cache che serializzano il modello modificato"""
+    if raw:
+        return
+    # L'ultimo accesso viene salvato a ogni login ma non compare nelle API
+    if sender is User and update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+
+    scopes = [model_scope(sender)]
+    if sender is Tournament:
+        scopes.append(tournament_scope(instance.pk))
+    bump_versions(*scopes)
+
+
+for cached_model in CACHED_MODELS:
+    uid = cached_model._meta.label_lower
+    post_save.connect(invalidate_cached_model, sender=cached_model, dispatch_uid=f"cache_save_{uid}")
+    post_delete.connect(invalidate_cached_model, sender=cached_model, dispatch_uid=f"cache_delete_{uid}")
+
+
+@receiver(m2m_changed, sender=Tournament.teams.through)
+def invalidate_tournament_on_teams_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Le squadre iscritte fanno parte del dettaglio del torneo"""
+    if not action.startswith('post_'):
+        return
+    tournament_ids = (pk_set or ()) if reverse else [instance.pk]
+    bump_versions(model_scope(Tournament), *(tournament_scope(tournament_id) for tournament_id in tournament_ids))
+
+
+@receiver(m2m_changed, sender=Person.other_nationalities.through)
+def invalidate_person_on_nationalities_change(sender, action, **kwargs):
+    """Le altre nazionalità fanno parte dei dati serializzati di giocatori e persone"""
+    if action.startswith('post_'):
+        bump_versions(model_scope(Person))
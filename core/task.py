@@ -6,6 +6,9 @@ from django.contrib.auth.models import User
 from django.core.mail import send_mail
 from django.utils import timezone
 
+from core.services.tournament_jobs import (JOB_COMPLETED, JOB_FAILED,
+                                           progress_reporter, update_job)
+
 
 @shared_task
 def send_welcome_email(user_id):
@@ -25,3 +28,51 @@ def send_welcome_email(user_id):
     logging.info(f"Welcome email sent to user {user_id}")
 
     return f"Welcome email sent to user {user_id}"
+
+
+@shared_task
+def generate_tournament(job_id, params):
+    """
+    Crea un torneo con ``TournamentFactory`` (compresi calendario, tabellone e
+    playoff) aggiornando l'avanzamento del job nella cache.
+
+    Args:
+        job_id: id del job restituito dall'API
+        params: dizionario con ``structure``, ``season``, ``name``, ``teams`` (id)
+            e opzionalmente ``description``, ``start_date`` (ISO), ``other_tournament``,
+            ``direct_rule``, ``playoff_rule`` (id di ``TournamentQualificationRule``) e ``seed``
+
+    Returns:
+        Id del torneo creato, oppure None se la generazione è fallita
+    """
+    from datetime import date
+
+    from core.factories.tournament_factory import TournamentFactory
+    from core.models import (Season, Team, Tournament,
+                             TournamentQualificationRule, TournamentStructure)
+
+    def get_optional(model, key):
+        return model.objects.get(pk=params[key]) if params.get(key) else None
+
+    try:
+        factory = TournamentFactory(
+            structure=TournamentStructure.objects.get(pk=params['structure']),
+            season=Season.objects.get(pk=params['season']),
+            name=params['name'],
+            teams=list(Team.objects.filter(pk__in=params['teams']).order_by('id')),
+            description=params.get('description', ''),
+            start_date=date.fromisoformat(params['start_date']) if params.get('start_date') else None,
+            tournament_direct_qualification_rule=get_optional(TournamentQualificationRule, 'direct_rule'),
+            tournament_playoff_qualification_rule=get_optional(TournamentQualificationRule, 'playoff_rule'),
+            other_tournament=get_optional(Tournament, 'other_tournament'),
+            seed=params.get('seed'),
+            progress_callback=progress_reporter(job_id),
+        )
+        tournament = factory.create()
+    except Exception as e:
+        logging.getLogger("simulation").exception("Generazione del torneo fallita (job %s)", job_id)
+        update_job(job_id, status=JOB_FAILED, message="Generazione fallita", error=str(e))
+        return None
+
+    update_job(job_id, status=JOB_COMPLETED, progress=100, message="Torneo creato", tournament_id=tournament.id)
+    return tournament.id
@@ -0,0 +1,3 @@
+"""
+Test dei servizi di simulazione, classifica e fantacalcio
+"""
@@ -0,0 +1,185 @@
+"""
+Test per il motore dell'asta live
+"""
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from core.models import (AuctionBid, FantaLeague, FantaTeam, FantaTeamPlayer, League, MarketTransaction, Person,
+                         Player, Season, Tournament, TournamentStructure)
+from core.services.auction import OWNER_KEY, LiveAuction, close_live_auction, get_live_auction, tick_live_auctions
+
+
+class FakeClock:
+    """Orologio manuale per controllare i timer dell'asta"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class LiveAuctionTestCase(TestCase):
+    """Lega condivisa dai test dell'asta live"""
+
+    def setUp(self):
+        """Lega con due squadre da 20 crediti, rosa da un portiere e due attaccanti"""
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        league = League.objects.create(name="Serie A", owner=self.user)
+        season = Season.objects.create(year=2025, league=league)
+        structure = TournamentStructure.objects.create(name="Campionato")
+        tournament = Tournament.objects.create(name="Serie A 2025", structure=structure, season=season)
+        self.league = FantaLeague.objects.create(name="Lega", admin=self.user, season=season, tournament=tournament)
+        self.team_a = FantaTeam.objects.create(name="Squadra A", owner=self.user, season=season, budget=20)
+        self.team_b = FantaTeam.objects.create(name="Squadra B", owner=self.user, season=season, budget=20)
+        self.league.teams.set([self.team_a, self.team_b])
+
+        self.players = []
+        for i, role in enumerate(['P', 'PC', 'AS', 'P']):
+            person = Person.objects.create(name=f"Giocatore {i}", surname=f"S{i}", birth_date=date(1995, 1, 1))
+            self.players.append(Player.objects.create(person=person, main_role=role))
+
+        self.clock = FakeClock()
+        self.auction = LiveAuction(
+            self.league, quotas={'P': 1, 'A': 2}, timer=10, flush_size=100, clock=self.clock
+        )
+
+
+class TestLiveAuction(LiveAuctionTestCase):
+    """Test per offerte, timer e scritture in blocco dell'asta live"""
+
+    def test_highest_bid_wins_after_timer(self):
+        """Il rilancio riparte il timer e allo scadere vince l'offerta più alta"""
+        keeper = self.players[0].id
+        self.auction.bid(self.team_a.id, keeper, 5)
+        self.clock.now = 8
+        state = self.auction.bid(self.team_b.id, keeper, 7)
+        self.assertEqual((state['team'], state['amount'], state['remaining']), (self.team_b.id, 7, 10))
+
+        self.clock.now = 15
+        self.assertEqual(self.auction.tick(), [])
+        self.clock.now = 18
+        self.assertEqual(self.auction.tick(), [(keeper, self.team_b.id, 7)])
+
+        self.team_b.refresh_from_db()
+        self.assertEqual(self.team_b.budget, 13)
+        self.assertTrue(FantaTeamPlayer.objects.filter(fanta_team=self.team_b, player_id=keeper, is_active=True).exists())
+        self.assertEqual(AuctionBid.objects.count(), 2)
+        self.assertEqual(AuctionBid.objects.get(is_winning=True).amount, 7)
+        self.assertEqual(MarketTransaction.objects.get().status, 'completed')
+
+    def test_rejects_invalid_bids(self):
+        """Rilanci troppo bassi, oltre il budget o senza posti in rosa vengono rifiutati"""
+        keeper, striker, _, second_keeper = (player.id for player in self.players)
+        self.auction.bid(self.team_a.id, keeper, 5)
+
+        with self.assertRaises(ValueError):
+            self.auction.bid(self.team_b.id, keeper, 5)
+        with self.assertRaises(ValueError):
+            self.auction.bid(self.team_a.id, keeper, 6)
+        # Con tre posti da riempire la squadra deve tenere un credito per ciascuno degli altri due
+        with self.assertRaises(ValueError):
+            self.auction.bid(self.team_b.id, striker, 19)
+        # Il posto da portiere è già impegnato dall'offerta in testa
+        with self.assertRaises(ValueError):
+            self.auction.bid(self.team_a.id, second_keeper, 1)
+
+        self.assertEqual(self.auction.budget_state(self.team_a.id)['available'], 15)
+        self.assertEqual(AuctionBid.objects.count(), 0)
+
+    def test_outbid_releases_budget_and_slot(self):
+        """Chi viene superato recupera crediti e posto in rosa"""
+        keeper, _, _, second_keeper = (player.id for player in self.players)
+        self.auction.bid(self.team_a.id, keeper, 5)
+        self.auction.bid(self.team_b.id, keeper, 6)
+
+        state = self.auction.budget_state(self.team_a.id)
+        self.assertEqual((state['available'], state['open_slots']['P']), (20, 1))
+        self.auction.bid(self.team_a.id, second_keeper, 3)
+
+    def test_close_awards_open_lots_in_batch(self):
+        """La chiusura aggiudica i giocatori aperti e scrive tutto in blocco"""
+        _, striker, winger, _ = (player.id for player in self.players)
+        self.auction.bid(self.team_a.id, striker, 4)
+        self.auction.bid(self.team_b.id, winger, 3)
+
+        with self.assertNumQueries(0):
+            self.auction.bid(self.team_a.id, winger, 5)
+
+        won = self.auction.close()
+
+        self.assertEqual(sorted(won), sorted([(striker, self.team_a.id, 4), (winger, self.team_a.id, 5)]))
+        self.team_a.refresh_from_db()
+        self.assertEqual(self.team_a.budget, 11)
+        self.assertEqual(AuctionBid.objects.filter(is_winning=True).count(), 2)
+        with self.assertRaises(ValueError):
+            self.auction.bid(self.team_b.id, striker, 10)
+
+
+    def test_bid_time_survives_batching(self):
+        """Le offerte scritte nello stesso blocco mantengono l'istante in cui sono arrivate"""
+        keeper = self.players[0].id
+        start = datetime(2025, 8, 1, 21, 0, tzinfo=dt_timezone.utc)
+        times = iter([start, start + timedelta(seconds=3)])
+        with mock.patch('core.services.auction.timezone.now', side_effect=lambda: next(times)):
+            self.auction.bid(self.team_a.id, keeper, 5)
+            self.auction.bid(self.team_b.id, keeper, 6)
+        self.auction.flush()
+
+        self.assertEqual(
+            list(AuctionBid.objects.order_by('amount').values_list('timestamp', flat=True)),
+            [start, start + timedelta(seconds=3)]
+        )
+
+@override_settings(LIVE_AUCTION_TICK=0)
+class TestLiveAuctionApi(LiveAuctionTestCase):
+    """Test per /api/fanta_league/{id}/auction/ e per l'aggiudicazione periodica"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.rival = User.objects.create_user(username='rival', password='12345')
+        self.team_b.owner = self.rival
+        self.team_b.save()
+        self.url = f'/api/fanta_league/{self.league.id}/auction/'
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.auction = get_live_auction(self.league, quotas={'P': 1, 'A': 2}, timer=10, clock=self.clock)
+        self.addCleanup(close_live_auction, self.league)
+
+    def test_bid_and_award_without_new_bids(self):
+        """L'ultimo giocatore viene aggiudicato allo scadere del timer, senza altre offerte"""
+        keeper = self.players[0].id
+        response = self.client.post(self.url, {'player': keeper, 'amount': 4}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['team'], response.data['amount']), (self.team_a.id, 4))
+        self.assertEqual(self.client.post(self.url, {'player': keeper, 'amount': 4}, format='json').status_code, 400)
+
+        self.clock.now = 10
+        self.assertEqual(tick_live_auctions(), [(keeper, self.team_a.id, 4)])
+        self.assertTrue(FantaTeamPlayer.objects.filter(fanta_team=self.team_a, player_id=keeper).exists())
+
+        response = self.client.get(self.url)
+        self.assertEqual((response.data['lots'], response.data['budget']['budget']), ([], 16))
+
+    def test_requires_league_team(self):
+        """Chi non ha una squadra nella lega non può offrire né chiudere l'asta"""
+        outsider = User.objects.create_user(username='outsider', password='12345')
+        self.client.force_authenticate(outsider)
+
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.assertEqual(self.client.post(self.url, {'player': self.players[0].id, 'amount': 1}, format='json').status_code, 403)
+        self.assertEqual(self.client.delete(self.url).status_code, 403)
+
+    def test_single_process(self):
+        """Un'asta già aperta in un altro processo non viene duplicata"""
+        close_live_auction(self.league)
+        cache.set(OWNER_KEY.format(self.league.id), "altro-host:1")
+
+        response = self.client.post(self.url, {'player': self.players[0].id, 'amount': 1}, format='json')
+        self.assertEqual(response.status_code, 409)
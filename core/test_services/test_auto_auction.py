@@ -0,0 +1,104 @@
+"""
+Test per l'asta automatica
+"""
+import itertools
+from collections import Counter
+from datetime import date
+from io import StringIO
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from core.models import (AuctionPreference, FantaLeague, FantaTeam, FantaTeamPlayer, League, MarketTransaction,
+                         Person, Player, Season, Tournament, TournamentStructure)
+from core.services.auto_auction import allocate, allocate_auto_auction, solve_assignment
+
+
+class TestAllocation(SimpleTestCase):
+    """Test per l'algoritmo di assegnazione"""
+
+    def test_solve_assignment_is_optimal(self):
+        """Il costo trovato coincide con quello minimo calcolato per enumerazione"""
+        rng = np.random.default_rng(7)
+        for n, m in ((3, 3), (2, 4), (4, 2), (4, 5)):
+            cost = rng.integers(0, 20, (n, m)).astype(float)
+            pairs = solve_assignment(cost)
+
+            if n <= m:
+                best = min(sum(cost[i, p[i]] for i in range(n)) for p in itertools.permutations(range(m), n))
+            else:
+                best = min(sum(cost[p[j], j] for j in range(m)) for p in itertools.permutations(range(n), m))
+            self.assertEqual(len(pairs), min(n, m))
+            self.assertEqual(len({col for _, col in pairs}), min(n, m))
+            self.assertAlmostEqual(sum(cost[row, col] for row, col in pairs), best)
+
+    def test_respects_quotas_and_preferences(self):
+        """Ogni squadra riempie i posti di ogni ruolo e ottiene il suo preferito se nessuno lo contende"""
+        players = {i: ('PDCA'[i % 4], 100 - i) for i in range(40)}
+        teams = {1: Counter(), 2: Counter({'P': 1})}
+        quotas = {'P': 2, 'D': 3, 'C': 3, 'A': 2}
+
+        allocation = allocate(teams, players, {2: [36]}, quotas, seed=3)
+
+        self.assertEqual(Counter(players[p][0] for p in allocation[1]), Counter(quotas))
+        self.assertEqual(Counter(players[p][0] for p in allocation[2]), Counter({'P': 1, 'D': 3, 'C': 3, 'A': 2}))
+        self.assertIn(36, allocation[2])
+        # I due difensori di maggior valore vanno a squadre diverse
+        self.assertNotEqual(1 in allocation[1], 5 in allocation[1])
+        self.assertEqual(allocation, allocate(teams, players, {2: [36]}, quotas, seed=3))
+
+
+class TestAutoAuction(TestCase):
+    """Test per l'esecuzione dell'asta automatica sul database"""
+
+    def setUp(self):
+        """Lega automatica con due squadre e dodici giocatori"""
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        league = League.objects.create(name="Serie A", owner=self.user)
+        season = Season.objects.create(year=2025, league=league)
+        structure = TournamentStructure.objects.create(name="Campionato")
+        tournament = Tournament.objects.create(name="Serie A 2025", structure=structure, season=season)
+        self.league = FantaLeague.objects.create(
+            name="Lega", admin=self.user, season=season, tournament=tournament, auction_type='auto', initial_budget=50
+        )
+        self.teams = [
+            FantaTeam.objects.create(name=f"Squadra {i}", owner=self.user, season=season, budget=500) for i in range(2)
+        ]
+        self.league.teams.set(self.teams)
+        self.players = []
+        for i, role in enumerate(['P', 'DC', 'CC', 'PC'] * 3):
+            person = Person.objects.create(name=f"Giocatore {i}", surname=f"S{i}", birth_date=date(1995, 1, 1))
+            self.players.append(Player.objects.create(person=person, main_role=role, fanta_value=1000 * (i + 1)))
+
+    def test_persists_allocation_within_budget(self):
+        """Le rose vengono scritte in blocco e nessuna squadra supera il budget iniziale della lega"""
+        AuctionPreference.objects.create(league=self.league, team=self.teams[0], player=self.players[0], rank=1)
+        quotas = {'P': 1, 'D': 1, 'C': 1, 'A': 1}
+
+        report = allocate_auto_auction(self.league, quotas=quotas, seed=1)
+
+        self.assertEqual([len(report['allocation'][team.id]) for team in self.teams], [4, 4])
+        self.assertIn(self.players[0].id, report['allocation'][self.teams[0].id])
+        self.assertEqual(FantaTeamPlayer.objects.filter(is_active=True).count(), 8)
+        self.assertEqual(MarketTransaction.objects.filter(status='completed').count(), 8)
+        for team in self.teams:
+            spent = sum(report['prices'][player_id] for player_id in report['allocation'][team.id])
+            self.assertLessEqual(spent, 50)
+            team.refresh_from_db()
+            self.assertEqual(team.budget, 500 - spent)
+
+    def test_command_is_deterministic(self):
+        """Con lo stesso seed il comando produce la stessa assegnazione"""
+        expected = allocate(
+            {team.id: Counter() for team in self.teams},
+            {player.id: (player.role_category(), player.fanta_value) for player in self.players},
+            {}, seed=5,
+        )
+
+        call_command('resolve_auction', self.league.id, seed=5, stdout=StringIO())
+
+        for team in self.teams:
+            owned = FantaTeamPlayer.objects.filter(fanta_team=team).values_list('player_id', flat=True)
+            self.assertEqual(sorted(owned), sorted(expected[team.id]))
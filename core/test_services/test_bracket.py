@@ -0,0 +1,134 @@
+"""
+Test per il motore dei tabelloni a eliminazione diretta
+"""
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from core.models import League, Match, Round, Season, SeasonTeam, Team, Tournament, TournamentStructure
+from core.services.bracket import build_bracket, create_knockout, seeding_order
+from core.services.match_simulation import simulate_round
+
+
+class TestBuildBracket(SimpleTestCase):
+    """Test per il calcolo del tabellone"""
+
+    def test_seeding_order(self):
+        """Le prime due teste di serie stanno in metà opposte del tabellone"""
+        self.assertEqual(seeding_order(8), [1, 8, 4, 5, 2, 7, 3, 6])
+
+    def test_byes(self):
+        """Con 6 squadre le prime due teste di serie passano il primo turno"""
+        bracket = build_bracket([10, 20, 30, 40, 50, 60])
+        self.assertEqual([entry['label'] for entry in bracket['rounds']], ["Quarti di finale", "Semifinali", "Finale"])
+
+        first = bracket['rounds'][0]['ties']
+        self.assertEqual([tie['winner'] for tie in first], [10, None, 20, None])
+        self.assertEqual(bracket['rounds'][1]['ties'][0]['home'], 10)
+        self.assertEqual(bracket['rounds'][1]['ties'][1]['home'], 20)
+
+
+class TestKnockoutAdvance(TestCase):
+    """Test per l'avanzamento automatico del tabellone"""
+
+    def setUp(self):
+        user = User.objects.create_user(username='testuser', password='12345')
+        league = League.objects.create(name="Coppa", owner=user)
+        season = Season.objects.create(year=2025, league=league)
+        self.structure = TournamentStructure.objects.create(
+            name="Coppa", is_cup=True, format='cup', legs=2, allow_draws=False, tiebreaker_away_goals=True
+        )
+        self.tournament = Tournament.objects.create(name="Coppa 2025", structure=self.structure, season=season, status='active')
+        self.teams = [Team.objects.create(name=f"Team {i}", code=f"TM{i}", owner=user) for i in range(1, 5)]
+        self.season_teams = [SeasonTeam.objects.create(team=team, season=season) for team in self.teams]
+        self.tournament.teams.set(self.season_teams)
+        create_knockout(self.tournament, self.season_teams, draw=False)
+
+    def _play(self, round_number, home_score, away_score, **extra):
+        """Gioca tutte le gare ancora da disputare del turno, con lo stesso risultato"""
+        for match in Match.objects.filter(tournament=self.tournament, round__number=round_number, played=False):
+            match.home_score, match.away_score, match.played = home_score, away_score, True
+            for field, value in extra.items():
+                setattr(match, field, value)
+            match.save()
+
+    def test_lazy_return_leg_and_next_round(self):
+        """Il ritorno nasce dopo l'andata e la finale dopo le semifinali"""
+        self.assertEqual(Match.objects.filter(tournament=self.tournament).count(), 2)
+
+        # Andata: vincono le squadre di casa (teste di serie 1 e 2)
+        self._play(1, 2, 0)
+        self.assertEqual(Match.objects.filter(tournament=self.tournament).count(), 4)
+        self.assertFalse(Round.objects.filter(tournament=self.tournament, number=2).exists())
+
+        # Ritorno: 1-0 per chi gioca in casa, passano comunque le teste di serie
+        self._play(1, 1, 0)
+        final = Round.objects.get(tournament=self.tournament, number=2)
+        self.assertEqual(final.label, "Finale")
+        match = final.matches.get()
+        self.assertEqual({match.home_team, match.away_team}, {self.teams[0], self.teams[1]})
+
+        self._play(2, 0, 0)
+        self._play(2, 0, 0, penalties_played=True, home_score_penalties=4, away_score_penalties=5)
+        self.tournament.refresh_from_db()
+        self.assertEqual(self.tournament.status, 'completed')
+
+        # Due pareggi 0-0: passa ai rigori la squadra 1, in trasferta nel ritorno
+        self.assertEqual(self.tournament.get_winner(), self.season_teams[0])
+
+    def test_away_goals(self):
+        """A parità di risultato complessivo passa chi ha segnato più gol in trasferta"""
+        self._play(1, 0, 1)  # andata: vincono le squadre in trasferta
+        self._play(1, 2, 1)  # ritorno: 2-1 per chi ora è in casa
+        final = Round.objects.get(tournament=self.tournament, number=2).matches.get()
+        self.assertEqual({final.home_team, final.away_team}, {self.teams[2], self.teams[3]})
+
+    def test_level_tie_without_penalties_awaits_decision(self):
+        """Una parità senza rigori viene segnalata nel tabellone finché i rigori non la risolvono"""
+        self._play(1, 0, 0)
+        with self.assertLogs('simulation', level='WARNING') as logs:
+            self._play(1, 0, 0)
+        self.assertIn("serve una decisione", logs.output[0])
+
+        self.tournament.refresh_from_db()
+        ties = self.tournament.bracket['rounds'][0]['ties']
+        self.assertTrue(all(tie.get('awaiting_decision') and tie['winner'] is None for tie in ties))
+
+        return_leg = Match.objects.filter(tournament=self.tournament, round__number=1).order_by('-kickoff_datetime', '-id').first()
+        return_leg.penalties_played, return_leg.home_score_penalties, return_leg.away_score_penalties = True, 5, 4
+        return_leg.save()
+
+        self.tournament.refresh_from_db()
+        tie = next(tie for tie in self.tournament.bracket['rounds'][0]['ties'] if tie['winner'] is not None)
+        self.assertNotIn('awaiting_decision', tie)
+        self.assertEqual(tie['winner'], return_leg.home_team_id)
+
+    @mock.patch('core.services.match_simulation.expected_goals', lambda home, away: (np.zeros(len(home)), np.zeros(len(away))))
+    def test_simulated_level_aggregate(self):
+        """Con il totale in parità i rigori si tirano solo nel ritorno e l'accoppiamento viene deciso"""
+        first_round = Round.objects.get(tournament=self.tournament, number=1)
+        first_legs = simulate_round(first_round, seed=1)
+        self.assertFalse(any(match.extra_time_played or match.penalties_played for match in first_legs))
+
+        return_legs = simulate_round(first_round, seed=1)
+        self.assertTrue(all(match.penalties_played for match in return_legs))
+        self.assertTrue(Round.objects.filter(tournament=self.tournament, number=2).exists())
+
+    @mock.patch('core.services.match_simulation.expected_goals', lambda home, away: (np.zeros(len(home)), np.zeros(len(away))))
+    def test_simulated_single_leg_with_draws(self):
+        """In gara secca un pareggio si risolve anche se la struttura consente i pareggi"""
+        structure = TournamentStructure.objects.create(name="Coppa secca", is_cup=True, format='cup', legs=1)
+        tournament = Tournament.objects.create(
+            name="Coppa secca 2025", structure=structure, season=self.tournament.season, status='active'
+        )
+        tournament.teams.set(self.season_teams)
+        create_knockout(tournament, self.season_teams, draw=False)
+
+        simulate_round(Round.objects.get(tournament=tournament, number=1), seed=1)
+        simulate_round(Round.objects.get(tournament=tournament, number=2), seed=1)
+
+        tournament.refresh_from_db()
+        self.assertEqual(tournament.status, 'completed')
+        self.assertIsNotNone(tournament.get_winner())
@@ -0,0 +1,94 @@
+"""
+Test per la cache delle risposte delle API
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from core.cache import get_versions, standings_scope
+from core.models import (Continent, League, Match, Nationality, Season, SeasonTeam, Team, Tournament,
+                         TournamentRanking, TournamentStructure)
+
+
+class TestResponseCache(TestCase):
+    """Test per cache, ETag e invalidazione tramite segnali"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.continent = Continent.objects.create(name="Europa", code="EU")
+
+    def test_cached_list_and_etag(self):
+        """La seconda lettura non interroga il database e l'ETag corrente produce un 304"""
+        response = self.client.get('/api/continent/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/continent/')
+            not_modified = self.client.get('/api/continent/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_invalidation_on_save(self):
+        """Una modifica a un modello annidato invalida le risposte che lo contengono"""
+        Nationality.objects.create(name="Italia", code="IT", continent=self.continent)
+        response = self.client.get('/api/nationalities/')
+        etag = response['ETag']
+        self.assertEqual(response.data['results'][0]['continent_info']['name'], "Europa")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.continent.name = "Europe"
+            self.continent.save()
+
+        response = self.client.get('/api/nationalities/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['results'][0]['continent_info']['name'], "Europe")
+
+    def test_tournament_versions(self):
+        """Il dettaglio di un torneo è invalidato solo dalle modifiche a quel torneo"""
+        league = League.objects.create(name="Serie A", owner=self.user)
+        season = Season.objects.create(year=2023, league=league)
+        structure = TournamentStructure.objects.create(name="Campionato")
+        first = Tournament.objects.create(name="Serie A", structure=structure, season=season)
+        second = Tournament.objects.create(name="Serie B", structure=structure, season=season)
+
+        etag = self.client.get(f'/api/tournament/{first.id}/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            second.description = "Cadetteria"
+            second.save()
+        self.assertEqual(self.client.get(f'/api/tournament/{first.id}/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.description = "Massima serie"
+            first.save()
+        response = self.client.get(f'/api/tournament/{first.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['description'], "Massima serie")
+
+    def test_standings_version_on_result(self):
+        """Il risultato di una partita incrementa la versione della classifica del torneo"""
+        league = League.objects.create(name="Serie A", owner=self.user)
+        season = Season.objects.create(year=2023, league=league)
+        structure = TournamentStructure.objects.create(name="Campionato")
+        tournament = Tournament.objects.create(name="Serie A", structure=structure, season=season)
+        teams = []
+        for i in range(2):
+            team = Team.objects.create(name=f"Team {i}", code=f"T{i}", owner=self.user)
+            TournamentRanking.objects.create(tournament=tournament, team=SeasonTeam.objects.create(team=team, season=season))
+            teams.append(team)
+        match = Match.objects.create(tournament=tournament, home_team=teams[0], away_team=teams[1])
+
+        before = get_versions([standings_scope(tournament.id)])
+        with self.captureOnCommitCallbacks(execute=True):
+            match.home_score, match.away_score, match.played = 2, 1, True
+            match.save()
+            # Prima del commit una lettura concorrente vedrebbe ancora i dati vecchi: la versione non cambia
+            self.assertEqual(get_versions([standings_scope(tournament.id)]), before)
+        self.assertNotEqual(get_versions([standings_scope(tournament.id)]), before)
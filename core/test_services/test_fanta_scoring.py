@@ -0,0 +1,108 @@
+"""
+Test per il calcolo dei punteggi fantacalcio di una giornata
+"""
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from core.models import (FantaLeague, FantaLeagueRule, FantaScore, League, Match, Person, Player,
+                         Round, Season, Team, Tournament, TournamentStructure)
+from core.services.fanta_scoring import score_round, score_round_for_leagues
+
+
+class FantaScoringTestCase(TestCase):
+    """Giornata con voti per ruoli diversi condivisa dai test sui punteggi"""
+
+    def setUp(self):
+        """Prepara una giornata con voti per ruoli diversi"""
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        league = League.objects.create(name="Serie A", owner=self.user)
+        self.season = Season.objects.create(year=2025, league=league)
+        structure = TournamentStructure.objects.create(name="Campionato")
+        self.tournament = Tournament.objects.create(name="Serie A 2025", structure=structure, season=self.season)
+        home = Team.objects.create(name="Team A", code="TMA", owner=self.user)
+        away = Team.objects.create(name="Team B", code="TMB", owner=self.user)
+        self.round = Round.objects.create(tournament=self.tournament, number=1)
+        match = Match.objects.create(home_team=home, away_team=away, tournament=self.tournament, round=self.round)
+
+        scores = [
+            ('P', dict(vote=6.5, clean_sheet=True, penalties_saved=1, goals_conceded=0)),
+            ('P', dict(vote=5.0, goals_conceded=3, yellow_cards=1)),
+            ('DC', dict(vote=6.0, clean_sheet=True, assists=1)),
+            ('CC', dict(vote=None, minutes_played=10, goals=1)),
+            ('COC', dict(vote=None, minutes_played=30, assists=1)),
+            ('PC', dict(vote=7.5, goals=2, penalties_scored=1, penalties_missed=1, clean_sheet=True)),
+            ('AS', dict(vote=4.5, red_cards=1, own_goals=1)),
+        ]
+        self.players = []
+        for i, (role, values) in enumerate(scores):
+            person = Person.objects.create(name=f"Giocatore {i}", surname=f"S{i}", birth_date=date(1995, 1, 1))
+            player = Player.objects.create(person=person, main_role=role)
+            values.setdefault('minutes_played', 90)
+            FantaScore.objects.create(player=player, match=match, round=self.round, **values)
+            self.players.append(player)
+
+
+class TestRoundScoring(FantaScoringTestCase):
+    """Test per il calcolo vettoriale dei punteggi di una giornata"""
+
+    def test_matches_single_score(self):
+        """Il calcolo per giornata coincide con quello del singolo voto"""
+        results = score_round(self.round)
+
+        for score in FantaScore.objects.select_related('player'):
+            self.assertAlmostEqual(results[score.id], score.final_score)
+            self.assertAlmostEqual(score.final_score, score.calculate_final_score())
+
+        self.assertEqual(
+            sorted(results.values()),
+            sorted([10.5, 1.5, 8.0, 0.0, 7.0, 12.5, 1.5])
+        )
+
+    def test_fixed_number_of_queries(self):
+        """Il numero di query non dipende dal numero di voti"""
+        with self.assertNumQueries(4):
+            score_round(self.round)
+
+
+class TestLeagueScoring(FantaScoringTestCase):
+    """Test per i punteggi calcolati con le regole di più leghe"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.classic = FantaLeague.objects.create(name="Classica", admin=self.user, season=self.season, tournament=self.tournament)
+        self.custom = FantaLeague.objects.create(name="Personalizzata", admin=self.user, season=self.season, tournament=self.tournament)
+        self.rule = FantaLeagueRule.objects.create(
+            fanta_league=self.custom, name="Regole", description="Gol da 4 e niente malus per i cartellini",
+            goal_value=4.0, yellow_card_value=0.0, red_card_value=0.0
+        )
+
+    def test_scores_per_league(self):
+        """Ogni lega usa i propri coefficienti, quella senza regole il regolamento standard"""
+        results = score_round_for_leagues(self.round, [self.classic.id, self.custom.id])
+        goalkeeper, striker, winger = self.players[1], self.players[5], self.players[6]
+
+        self.assertEqual(results[self.classic.id][striker.id], 12.5)
+        self.assertEqual(results[self.custom.id][striker.id], 14.5)
+        self.assertEqual(results[self.classic.id][goalkeeper.id], 1.5)
+        self.assertEqual(results[self.custom.id][goalkeeper.id], 2.0)
+        self.assertEqual(results[self.custom.id][winger.id], 2.5)
+
+        standard = score_round(self.round)
+        by_player = dict(FantaScore.objects.values_list('player_id', 'id'))
+        for player_id, value in results[self.classic.id].items():
+            self.assertEqual(value, standard[by_player[player_id]])
+
+    def test_coefficients_cached_until_rule_changes(self):
+        """Le regole si leggono una volta; una modifica invalida la cache"""
+        score_round_for_leagues(self.round, [self.custom.id])
+        with self.assertNumQueries(1):
+            score_round_for_leagues(self.round, [self.custom.id])
+
+        self.rule.goal_value = 5.0
+        self.rule.save()
+        results = score_round_for_leagues(self.round, [self.custom.id])
+        self.assertEqual(results[self.custom.id][self.players[5].id], 16.5)
@@ -0,0 +1,71 @@
+"""
+Test per la chiusura di una giornata di fantacalcio
+"""
+from datetime import date
+
+from core.models import FantaLineup, FantaLineupPlayer, FantaLineupSubstitution, FantaTeam, Person, Player
+from core.services.lineup_scoring import close_round
+from core.test_services.test_fanta_scoring import FantaScoringTestCase
+
+
+class TestCloseRound(FantaScoringTestCase):
+    """Test per le sostituzioni automatiche e il totale delle formazioni"""
+
+    def setUp(self):
+        """Formazione con un centrocampista senza voto e un difensore senza partita"""
+        super().setUp()
+        goalkeeper, reserve_goalkeeper, defender, unrated, midfielder, striker, winger = self.players
+        person = Person.objects.create(name="Riserva", surname="Assente", birth_date=date(1995, 1, 1))
+        absent = Player.objects.create(person=person, main_role='DS')
+
+        self.fanta_team = FantaTeam.objects.create(name="Fanta A", owner=self.user, season=self.season)
+        self.lineup = FantaLineup.objects.create(
+            fanta_team=self.fanta_team, round=self.round, tournament=self.tournament, formation="4-3-3"
+        )
+        layout = [
+            (goalkeeper, 1, True, False), (defender, 2, True, False), (absent, 3, True, False),
+            (unrated, 4, True, False), (striker, 5, True, True),
+            (reserve_goalkeeper, 12, False, False), (winger, 13, False, False), (midfielder, 14, False, False),
+        ]
+        for player, position, starter, captain in layout:
+            FantaLineupPlayer.objects.create(
+                fanta_lineup=self.lineup, player=player, position=position, is_starter=starter, is_captain=captain
+            )
+
+    def test_close_round(self):
+        """Entra la riserva dello stesso ruolo e il totale coincide con calculate_score"""
+        close_round(self.round)
+        self.lineup.refresh_from_db()
+
+        substitutions = list(FantaLineupSubstitution.objects.select_related('player_out__player', 'substitute__player'))
+        self.assertEqual(len(substitutions), 1)
+        self.assertEqual(substitutions[0].player_out.player, self.players[3])
+        self.assertEqual(substitutions[0].substitute.player, self.players[4])
+
+        # 10.5 + 8.0 + 12.5 * 1.1 (capitano) + 7.0 dalla panchina
+        self.assertAlmostEqual(self.lineup.total_score, 39.25)
+        self.assertAlmostEqual(self.lineup.calculate_score(), 39.25)
+
+    def test_close_round_is_repeatable(self):
+        """Richiudere la giornata non duplica le sostituzioni"""
+        close_round(self.round)
+        close_round(self.round)
+
+        self.assertEqual(FantaLineupSubstitution.objects.count(), 1)
+
+    def test_manual_substitutions_are_kept(self):
+        """Richiudere la giornata rigenera solo le sostituzioni automatiche"""
+        players = {lp.position: lp for lp in self.lineup.players.all()}
+        manual = FantaLineupSubstitution.objects.create(
+            fanta_lineup=self.lineup, player_out=players[2], substitute=players[13], reason="Scelta dell'allenatore"
+        )
+
+        close_round(self.round)
+
+        self.assertTrue(FantaLineupSubstitution.objects.filter(pk=manual.pk).exists())
+        self.assertEqual(FantaLineupSubstitution.objects.count(), 2)
+
+    def test_fixed_number_of_queries(self):
+        """Il numero di query non dipende dal numero di formazioni"""
+        with self.assertNumQueries(9):
+            close_round(self.round)
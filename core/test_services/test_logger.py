@@ -0,0 +1,43 @@
+"""
+Test per l'accesso ai logger del progetto
+"""
+import logging
+from logging.handlers import BufferingHandler
+
+from django.test import SimpleTestCase
+
+from core import logger as core_logger
+from core.logger import enable_queue_logging, get_logger
+
+
+class TestLogger(SimpleTestCase):
+    """Test per get_logger e per la modalità non bloccante"""
+
+    def test_get_logger_keeps_configuration(self):
+        """get_logger non modifica gli handler definiti in settings.LOGGING"""
+        handlers = list(logging.getLogger("django").handlers)
+        self.assertIs(get_logger(), logging.getLogger("django"))
+        self.assertIs(get_logger("simulation"), logging.getLogger("simulation"))
+        self.assertEqual(logging.getLogger("django").handlers, handlers)
+
+    def test_queue_logging(self):
+        """I record passano dal QueueHandler agli handler originali nel thread del listener"""
+        logger = logging.getLogger("test_queue_logging")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        target = BufferingHandler(capacity=10)
+        logger.addHandler(target)
+
+        previous = core_logger._listener
+        core_logger._listener = None
+        try:
+            listener = enable_queue_logging(["test_queue_logging"])
+            self.assertIs(enable_queue_logging(["test_queue_logging"]), listener)
+            self.assertNotIn(target, logger.handlers)
+
+            logger.info("Torneo '%s' creato", "Serie A")
+            listener.stop()
+            self.assertEqual([record.getMessage() for record in target.buffer], ["Torneo 'Serie A' creato"])
+        finally:
+            core_logger._listener = previous
+            logger.handlers.clear()
@@ -0,0 +1,115 @@
+"""
+Test per l'esecuzione delle transazioni di mercato
+"""
+from datetime import date
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from core.models import (FantaLeague, FantaTeam, FantaTeamPlayer, League, MarketTransaction, Person, Player,
+                         Season, Tournament, TournamentStructure)
+from core.services.market import settle_pending
+
+
+class TestMarketSettlement(TestCase):
+    """Test per il regolamento a blocchi di acquisti, vendite e scambi"""
+
+    def setUp(self):
+        """Lega con due squadre da 100 crediti e tre giocatori"""
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        league = League.objects.create(name="Serie A", owner=self.user)
+        season = Season.objects.create(year=2025, league=league)
+        structure = TournamentStructure.objects.create(name="Campionato")
+        tournament = Tournament.objects.create(name="Serie A 2025", structure=structure, season=season)
+        self.league = FantaLeague.objects.create(name="Lega", admin=self.user, season=season, tournament=tournament)
+        self.team_a = FantaTeam.objects.create(name="Squadra A", owner=self.user, season=season, budget=100)
+        self.team_b = FantaTeam.objects.create(name="Squadra B", owner=self.user, season=season, budget=100)
+        self.players = []
+        for i in range(3):
+            person = Person.objects.create(name=f"Giocatore {i}", surname=f"S{i}", birth_date=date(1995, 1, 1))
+            self.players.append(Player.objects.create(person=person))
+
+    def transaction(self, transaction_type, team, player, **fields):
+        return MarketTransaction.objects.create(
+            transaction_type=transaction_type, league=self.league, created_by=self.user,
+            team=team, player=player, **fields
+        )
+
+    def test_batch_settlement(self):
+        """Acquisti, vendite e scambi dello stesso blocco si applicano in ordine"""
+        first, second, third = self.players
+        self.transaction('buy', self.team_a, first, price=30)
+        self.transaction('buy', self.team_b, second, price=20)
+        self.transaction(
+            'trade', self.team_a, first, team_counterparty=self.team_b, player_counterparty=second, price_adjustment=5
+        )
+        self.transaction('sell', self.team_a, second, price=25)
+        self.transaction('buy', self.team_a, third, price=10)
+
+        report = settle_pending(batch_size=2)
+
+        self.assertEqual((report['completed'], report['rejected']), (5, 0))
+        self.assertGreaterEqual(report['per_second'], 0)
+        self.team_a.refresh_from_db()
+        self.team_b.refresh_from_db()
+        self.assertEqual(self.team_a.budget, 100 - 30 - 5 + 25 - 10)
+        self.assertEqual(self.team_b.budget, 100 - 20 + 5)
+
+        active = set(FantaTeamPlayer.objects.filter(is_active=True).values_list('fanta_team_id', 'player_id'))
+        self.assertEqual(active, {(self.team_b.id, first.id), (self.team_a.id, third.id)})
+        # Lo scambio conserva il prezzo d'acquisto originale
+        self.assertEqual(FantaTeamPlayer.objects.get(fanta_team=self.team_b, player=first).purchase_price, 30)
+        self.assertFalse(MarketTransaction.objects.filter(status='pending').exists())
+
+    def test_rejects_invalid_transactions(self):
+        """Budget insufficiente, giocatore già in rosa o assente vengono rifiutati"""
+        first, second, _ = self.players
+        self.transaction('buy', self.team_a, first, price=80)
+        over_budget = self.transaction('buy', self.team_a, second, price=30)
+        duplicate = self.transaction('buy', self.team_a, first, price=1)
+        missing = self.transaction('sell', self.team_b, first, price=10)
+
+        report = settle_pending()
+
+        self.assertEqual((report['completed'], report['rejected']), (1, 3))
+        for tx in (over_budget, duplicate, missing):
+            tx.refresh_from_db()
+            self.assertEqual(tx.status, 'rejected')
+        self.team_a.refresh_from_db()
+        self.assertEqual(self.team_a.budget, 20)
+
+    def test_rebuy_reactivates_roster_row(self):
+        """Riacquistare un giocatore venduto riattiva la riga di rosa esistente"""
+        first = self.players[0]
+        self.transaction('buy', self.team_a, first, price=10)
+        self.transaction('sell', self.team_a, first, price=15)
+        self.transaction('buy', self.team_a, first, price=12)
+
+        settle_pending()
+
+        row = FantaTeamPlayer.objects.get(fanta_team=self.team_a, player=first)
+        self.assertTrue(row.is_active)
+        self.assertEqual(row.purchase_price, 12)
+
+    def test_complete_transaction(self):
+        """Il metodo del modello usa lo stesso esecutore e non regola due volte"""
+        tx = self.transaction('buy', self.team_a, self.players[0], price=40)
+
+        self.assertTrue(tx.complete_transaction())
+        self.assertEqual(tx.status, 'completed')
+        self.assertIsNotNone(tx.completed_at)
+        self.assertFalse(tx.complete_transaction())
+        self.team_a.refresh_from_db()
+        self.assertEqual(self.team_a.budget, 60)
+
+    def test_command_filters_league(self):
+        """Il comando rifiuta una lega inesistente e regola quella indicata"""
+        self.transaction('buy', self.team_a, self.players[0], price=10)
+
+        with self.assertRaises(CommandError):
+            call_command('settle_market', league=self.league.id + 1)
+        call_command('settle_market', league=self.league.id, batch_size=10, stdout=StringIO())
+
+        self.assertEqual(MarketTransaction.objects.get().status, 'completed')
@@ -0,0 +1,106 @@
+"""
+Test per il motore di simulazione delle partite
+"""
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from core.models import (League, Match, Person, Player, RosterSlot, Round, Season,
+                         SeasonTeam, Team, Tournament, TournamentRanking, TournamentStructure)
+from core.services.match_simulation import simulate_round, team_strengths
+from core.services.standings import rebuild_tournament_rankings
+
+
+class TestMatchSimulation(TestCase):
+    """Test per la simulazione vettoriale di una giornata"""
+
+    def setUp(self):
+        """Prepara un torneo con una giornata da simulare"""
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        league = League.objects.create(name="Serie A", owner=self.user)
+        self.season = Season.objects.create(year=2025, league=league)
+        self.teams = [
+            Team.objects.create(name=f"Team {i}", code=f"TM{i}", owner=self.user)
+            for i in range(1, 5)
+        ]
+        self.season_teams = [SeasonTeam.objects.create(team=team, season=self.season) for team in self.teams]
+
+    def _create_round(self, structure):
+        tournament = Tournament.objects.create(name=f"Torneo {structure.name}", structure=structure, season=self.season)
+        round_obj = Round.objects.create(tournament=tournament, number=1)
+        for season_team in self.season_teams:
+            TournamentRanking.objects.create(tournament=tournament, team=season_team)
+        for home, away in [(0, 1), (2, 3)]:
+            Match.objects.create(home_team=self.teams[home], away_team=self.teams[away], tournament=tournament, round=round_obj)
+        return round_obj
+
+    def _reset_round(self, round_obj):
+        """
+        Riporta la giornata a non giocata.
+
+        ``QuerySet.update`` non invia segnali: la classifica va ricalcolata da zero,
+        altrimenti la nuova simulazione si sommerebbe ai risultati precedenti.
+        """
+        round_obj.matches.update(
+            played=False, home_score=None, away_score=None, extra_time_played=False, penalties_played=False,
+            home_score_extra_time=None, away_score_extra_time=None, home_score_penalties=None, away_score_penalties=None,
+        )
+        rebuild_tournament_rankings(round_obj.tournament)
+
+    def _assert_standings_match_results(self, round_obj):
+        """La classifica incrementale coincide con quella ricalcolata dalle partite giocate"""
+        rankings = TournamentRanking.objects.filter(tournament=round_obj.tournament).order_by('team_id')
+        incremental = list(rankings.values_list('team_id', 'matches_played', 'points', 'goals_for', 'goals_against'))
+        self.assertEqual(sum(row[1] for row in incremental), 4)
+
+        rebuild_tournament_rankings(round_obj.tournament)
+        self.assertEqual(
+            list(rankings.values_list('team_id', 'matches_played', 'points', 'goals_for', 'goals_against')), incremental
+        )
+
+    def _add_starters(self, season_team, overall, injured=False):
+        for i in range(11):
+            person = Person.objects.create(name=f"P{season_team.id}-{i}", birth_date=date(1995, 1, 1))
+            player = Player.objects.create(person=person, overall=overall, is_injured=injured)
+            RosterSlot.objects.create(team=season_team, player=player, is_starting=True, shirt_number=i + 1)
+
+    def test_team_strengths(self):
+        """La forza dipende dai titolari disponibili"""
+        self._add_starters(self.season_teams[0], overall=80)
+        self._add_starters(self.season_teams[1], overall=80, injured=True)
+
+        strengths = team_strengths([self.teams[0].id, self.teams[1].id, self.teams[2].id], self.season.id)
+
+        self.assertAlmostEqual(strengths[0], 80.0)
+        self.assertAlmostEqual(strengths[1], 0.0)
+        self.assertAlmostEqual(strengths[2], 50.0)  # nessun titolare: forza di default
+
+    def test_simulate_round(self):
+        """Tutte le partite della giornata vengono giocate e la simulazione è riproducibile"""
+        structure = TournamentStructure.objects.create(name="Campionato", legs=1)
+        round_obj = self._create_round(structure)
+
+        first = [(m.home_score, m.away_score) for m in simulate_round(round_obj, seed=42)]
+        self.assertFalse(round_obj.matches.filter(played=False).exists())
+
+        self._reset_round(round_obj)
+        second = [(m.home_score, m.away_score) for m in simulate_round(round_obj, seed=42)]
+        self.assertEqual(first, second)
+        self._assert_standings_match_results(round_obj)
+
+        # Una giornata già giocata non viene simulata di nuovo
+        self.assertEqual(simulate_round(round_obj, seed=1), [])
+
+    def test_simulate_round_without_draws(self):
+        """Se il torneo non consente pareggi ogni partita ha un vincitore"""
+        structure = TournamentStructure.objects.create(name="Coppa", is_cup=True, legs=1, allow_draws=False, draw_resolution='extra_time_penalties')
+
+        round_obj = self._create_round(structure)
+
+        for seed in range(10):
+            self._reset_round(round_obj)
+            simulate_round(round_obj, seed=seed)
+            for match in Match.objects.filter(round=round_obj):
+                self.assertIsNotNone(match.get_winner())
+            self._assert_standings_match_results(round_obj)
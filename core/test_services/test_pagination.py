@@ -0,0 +1,88 @@
+"""
+Test per la paginazione delle API
+"""
+from datetime import date, datetime, timezone
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from core.models import League, Match, Person, Player, Season, Team, Tournament, TournamentStructure
+
+
+class TestPagination(TestCase):
+    """Test per la paginazione a pagine e a cursore"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='12345')
+
+    def test_page_number_pagination(self):
+        """Le liste del router restituiscono pagine con count e link"""
+        league = League.objects.create(name="Serie A", owner=self.user)
+        for year in range(2000, 2012):
+            Season.objects.create(year=year, league=league)
+
+        response = self.client.get('/api/season/', {'page_size': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 12)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_player_cursor_pagination(self):
+        """Scorrendo le pagine a cursore si leggono tutti i giocatori una sola volta, in ordine di id"""
+        players = [
+            Player.objects.create(person=Person.objects.create(
+                name=f"Nome {i}", surname=f"Cognome {i}", birth_date=date(2000, 1, 1)
+            ), main_role='A')
+            for i in range(25)
+        ]
+
+        seen = []
+        url = '/api/player/?page_size=10'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            seen.extend(player['id'] for player in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(seen, [player.id for player in players])
+
+    def test_match_cursor_with_null_kickoff(self):
+        """Le partite senza data di inizio non interrompono lo scorrimento delle pagine"""
+        league = League.objects.create(name="Serie A", owner=self.user)
+        season = Season.objects.create(year=2025, league=league)
+        structure = TournamentStructure.objects.create(name="Campionato")
+        tournament = Tournament.objects.create(name="Serie A 2025", structure=structure, season=season)
+        home = Team.objects.create(name="Team A", code="TMA", owner=self.user)
+        away = Team.objects.create(name="Team B", code="TMB", owner=self.user)
+        matches = [
+            Match.objects.create(
+                home_team=home, away_team=away, tournament=tournament,
+                kickoff_datetime=datetime(2025, 9, i + 1, tzinfo=timezone.utc) if i % 2 else None,
+            )
+            for i in range(15)
+        ]
+
+        seen = []
+        url = '/api/match/?page_size=4'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(match['id'] for match in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(seen, [match.id for match in matches])
+
+    def test_tournament_filters(self):
+        """I filtri della lista dei tornei vengono applicati dal server"""
+        league = League.objects.create(name="Serie A", owner=self.user)
+        structure = TournamentStructure.objects.create(name="Campionato")
+        seasons = [Season.objects.create(year=year, league=league) for year in (2024, 2025)]
+        for season in seasons:
+            Tournament.objects.create(name=f"Serie A {season.year}", structure=structure, season=season)
+
+        response = self.client.get('/api/tournament/', {'season': seasons[1].id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([t['name'] for t in response.data['results']], ["Serie A 2025"])
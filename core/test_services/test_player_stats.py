@@ -0,0 +1,59 @@
+"""
+Test per l'aggiornamento delle statistiche fantacalcio dei giocatori
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from core.models import PlayerStatistics
+from core.services.fanta_scoring import score_round
+from core.services.player_stats import refresh_fanta_stats
+from core.test_services.test_fanta_scoring import FantaScoringTestCase
+
+
+class TestRefreshFantaStats(FantaScoringTestCase):
+    """Test per il ricalcolo aggregato delle statistiche fantacalcio"""
+
+    def setUp(self):
+        super().setUp()
+        score_round(self.round)
+
+    def test_refresh_creates_and_matches_single_update(self):
+        """Il ricalcolo di gruppo coincide con quello del singolo giocatore"""
+        self.assertEqual(refresh_fanta_stats(season=self.season), 6)
+
+        # Il punteggio dell'attaccante non ha il bonus porta inviolata, le sue statistiche sì
+        striker = PlayerStatistics.objects.get(player=self.players[5], season=self.season)
+        self.assertAlmostEqual(striker.fanta_total, 12.5)
+        self.assertAlmostEqual(striker.bonus_points, 9.0)
+        self.assertAlmostEqual(striker.malus_points, 3.0)
+
+        # Il difensore centrale prende il bonus porta inviolata, il portiere il malus dei gol subiti
+        defender = PlayerStatistics.objects.get(player=self.players[2], season=self.season)
+        self.assertAlmostEqual(defender.bonus_points, 2.0)
+        goalkeeper = PlayerStatistics.objects.get(player=self.players[1], season=self.season)
+        self.assertAlmostEqual(goalkeeper.malus_points, 3.5)
+
+        expected = {stats.player_id: [getattr(stats, f) for f in ('fanta_total', 'fanta_average', 'bonus_points', 'malus_points')]
+                    for stats in PlayerStatistics.objects.all()}
+        PlayerStatistics.objects.update(fanta_total=0, fanta_average=0, bonus_points=0, malus_points=0)
+        for stats in PlayerStatistics.objects.select_related('player'):
+            stats.update_fanta_stats()
+            for value, expected_value in zip([stats.fanta_total, stats.fanta_average, stats.bonus_points, stats.malus_points], expected[stats.player_id]):
+                self.assertAlmostEqual(value, expected_value)
+
+    def test_refresh_fixed_number_of_queries(self):
+        """Il ricalcolo usa un numero fisso di query"""
+        refresh_fanta_stats(season=self.season)
+        with self.assertNumQueries(5):
+            refresh_fanta_stats(season=self.season)
+
+    def test_refresh_touches_updated_at(self):
+        """Il ricalcolo in blocco aggiorna anche la data di modifica delle righe esistenti"""
+        refresh_fanta_stats(season=self.season)
+        PlayerStatistics.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        before = timezone.now()
+
+        refresh_fanta_stats(season=self.season)
+        for stats in PlayerStatistics.objects.all():
+            self.assertGreaterEqual(stats.updated_at, before)
@@ -0,0 +1,86 @@
+"""
+Test per l'ottimizzazione delle queryset dei viewset
+"""
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from core.models import (Continent, League, Nationality, Person, Player, Season, SeasonTeam, Team, Tournament,
+                         TournamentStructure)
+from core.querysets import serializer_relations
+from core.serializers import PlayerSerializer, TournamentSerializer
+
+
+class TestSerializerRelations(TestCase):
+    """Test per le relazioni ricavate dall'albero dei serializer"""
+
+    def test_player_relations(self):
+        """Nazionalità e continente della persona vengono caricati in anticipo"""
+        select, prefetch = serializer_relations(PlayerSerializer)
+        self.assertEqual(select, ('person__main_nationality__continent',))
+        self.assertEqual(prefetch, ('person__other_nationalities__continent',))
+
+    def test_tournament_relations(self):
+        """Le squadre del torneo passano da prefetch_related"""
+        select, prefetch = serializer_relations(TournamentSerializer)
+        self.assertEqual(select, ('season', 'structure', 'trophy'))
+        self.assertEqual(prefetch, ('teams__season', 'teams__team__owner'))
+
+
+class TestViewSetQueries(TestCase):
+    """Il numero di query delle liste non dipende dal numero di oggetti"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        continent = Continent.objects.create(name="Europa", code="EU")
+        self.nationalities = [
+            Nationality.objects.create(name=f"Nazione {i}", code=f"N{i}", continent=continent) for i in range(3)
+        ]
+        self.client = APIClient()
+
+    def _create_players(self, start, count):
+        for i in range(start, start + count):
+            person = Person.objects.create(name=f"Nome {i}", surname=f"Cognome {i}", birth_date=date(2000, 1, 1),
+                                           main_nationality=self.nationalities[0])
+            person.other_nationalities.set(self.nationalities[1:])
+            Player.objects.create(person=person, main_role='A')
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_player_list(self):
+        """La lista dei giocatori usa lo stesso numero di query con 5 o 50 giocatori"""
+        self._create_players(0, 5)
+        few = self._count_queries('/api/player/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_players(5, 45)
+        self.assertEqual(self._count_queries('/api/player/'), few)
+        self.assertLessEqual(few, 4)
+
+    def test_tournament_list(self):
+        """La lista dei tornei usa lo stesso numero di query con 1 o 10 tornei"""
+        league = League.objects.create(name="Serie A", owner=self.user)
+        season = Season.objects.create(year=2023, league=league)
+        structure = TournamentStructure.objects.create(name="Campionato")
+        season_teams = [
+            SeasonTeam.objects.create(team=Team.objects.create(name=f"Team {i}", code=f"T{i}", owner=self.user), season=season)
+            for i in range(6)
+        ]
+
+        def create_tournaments(start, count):
+            for i in range(start, start + count):
+                tournament = Tournament.objects.create(name=f"Torneo {i}", structure=structure, season=season)
+                tournament.teams.set(season_teams)
+
+        create_tournaments(0, 1)
+        few = self._count_queries('/api/tournament/')
+        with self.captureOnCommitCallbacks(execute=True):
+            create_tournaments(1, 9)
+        self.assertEqual(self._count_queries('/api/tournament/'), few)
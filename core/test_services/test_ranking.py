@@ -0,0 +1,154 @@
+"""
+Test per il motore di ordinamento delle classifiche e degli spareggi
+"""
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from core.models import (League, Match, Season, SeasonTeam, StandingsSnapshot, Team, Tournament,
+                         TournamentQualificationRule, TournamentRanking, TournamentStructure)
+from core.services.ranking import order_rankings, refresh_positions
+
+
+class RankingTestCase(TestCase):
+    """Torneo a quattro squadre condiviso dai test di classifica"""
+
+    def setUp(self):
+        """A e B chiudono a pari punti: A vince lo scontro diretto, B ha la differenza reti migliore"""
+        user = User.objects.create_user(username='testuser', password='12345')
+        league = League.objects.create(name="Serie A", owner=user)
+        season = Season.objects.create(year=2025, league=league)
+        self.structure = TournamentStructure.objects.create(name="Campionato", legs=1)
+        self.tournament = Tournament.objects.create(name="Serie A 2025", structure=self.structure, season=season)
+        self.teams = {code: Team.objects.create(name=f"Team {code}", code=code, owner=user) for code in "ABCD"}
+        self.season_teams = {code: SeasonTeam.objects.create(team=team, season=season) for code, team in self.teams.items()}
+        self.tournament.teams.set(self.season_teams.values())
+        for season_team in self.season_teams.values():
+            TournamentRanking.objects.create(tournament=self.tournament, team=season_team)
+
+        results = [("A", "B", 1, 0), ("B", "C", 5, 0), ("B", "D", 5, 0), ("A", "C", 0, 1), ("A", "D", 1, 0), ("C", "D", 0, 0)]
+        for home, away, hs, as_ in results:
+            Match.objects.create(
+                home_team=self.teams[home], away_team=self.teams[away], tournament=self.tournament,
+                home_score=hs, away_score=as_, played=True
+            )
+
+
+class TestRankingOrder(RankingTestCase):
+    """Test per i criteri di spareggio della struttura del torneo"""
+
+    def _order(self):
+        return [ranking.team.team.code for ranking in order_rankings(self.tournament)]
+
+    def test_goal_difference_without_head_to_head(self):
+        """Senza scontri diretti decide la differenza reti"""
+        self.assertEqual(self._order(), ["B", "A", "C", "D"])
+
+    def test_head_to_head_first(self):
+        """Con gli scontri diretti attivi A precede B"""
+        self.structure.tiebreaker_head_to_head = 'all'
+        self.structure.save()
+
+        self.assertEqual(self._order(), ["A", "B", "C", "D"])
+
+        ranking_a = TournamentRanking.objects.get(tournament=self.tournament, team=self.season_teams["A"])
+        self.assertEqual(ranking_a.get_ranking_position(), 1)
+        self.assertEqual([row['team'].team.code for row in ranking_a.get_complete_ranking()], ["A", "B", "C", "D"])
+
+        rule = TournamentQualificationRule.objects.create(
+            from_tournament=self.tournament, to_tournament=self.tournament,
+            min_rank=1, max_rank=1, qualification_type='qualification'
+        )
+        self.assertEqual(rule.apply_rule(), [self.season_teams["A"]])
+
+
+class TestCachedPositions(RankingTestCase):
+    """Test per le posizioni salvate in classifica"""
+
+    def test_position_is_cached(self):
+        """Dopo il primo calcolo la posizione si legge senza query"""
+        refresh_positions(self.tournament)
+        ranking_b = TournamentRanking.objects.get(tournament=self.tournament, team=self.season_teams["B"])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(ranking_b.get_ranking_position(), 1)
+
+    def test_positions_invalidated_by_results(self):
+        """Un nuovo risultato azzera le posizioni, ricalcolate alla lettura successiva (B scende sotto A)"""
+        refresh_positions(self.tournament)
+        Match.objects.create(
+            home_team=self.teams["D"], away_team=self.teams["B"], tournament=self.tournament,
+            home_score=9, away_score=0, played=True
+        )
+        self.assertFalse(TournamentRanking.objects.filter(tournament=self.tournament, position__isnull=False).exists())
+
+        ranking_d = TournamentRanking.objects.get(tournament=self.tournament, team=self.season_teams["D"])
+        self.assertEqual(ranking_d.get_ranking_position(), 3)
+        # La lettura non scrive: le posizioni vengono salvate solo da refresh_positions
+        self.assertFalse(TournamentRanking.objects.filter(tournament=self.tournament, position__isnull=False).exists())
+
+        refresh_positions(self.tournament)
+        self.assertEqual(
+            list(TournamentRanking.objects.filter(tournament=self.tournament).order_by('position').values_list('team__team__code', flat=True)),
+            ["A", "B", "D", "C"]
+        )
+
+    def test_positions_invalidated_by_structure(self):
+        """Cambiare i criteri di spareggio azzera le posizioni salvate"""
+        self.assertEqual(set(refresh_positions(self.tournament).values()), {1, 2, 3, 4})
+        self.structure.tiebreaker_head_to_head = 'all'
+        self.structure.save()
+
+        ranking_a = TournamentRanking.objects.get(tournament=self.tournament, team=self.season_teams["A"])
+        self.assertIsNone(ranking_a.position)
+        self.assertEqual(ranking_a.get_ranking_position(), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(ranking_a.get_ranking_position(), 1)
+
+    def test_rows_share_computed_positions(self):
+        """Con le posizioni azzerate una lista di righe calcola l'ordine una sola volta"""
+        rankings = list(self.tournament.tournament_rankings.all())
+        self.assertIsNone(rankings[0].position)
+
+        first = rankings[0].get_ranking_position()
+        with self.assertNumQueries(0):
+            positions = [first] + [ranking.get_ranking_position() for ranking in rankings[1:]]
+
+        self.assertEqual(sorted(positions), [1, 2, 3, 4])
+        self.assertFalse(TournamentRanking.objects.filter(tournament=self.tournament, position__isnull=False).exists())
+
+    def test_unrelated_fields_keep_positions(self):
+        """Salvare campi che non entrano in classifica non azzera le posizioni"""
+        refresh_positions(self.tournament)
+        ranking = TournamentRanking.objects.get(tournament=self.tournament, team=self.season_teams["C"])
+
+        ranking.yellow_cards = 3
+        ranking.save()
+        ranking.red_cards = 1
+        ranking.save(update_fields=['red_cards'])
+        self.assertFalse(TournamentRanking.objects.filter(tournament=self.tournament, position__isnull=True).exists())
+
+        ranking.goals_for += 10
+        ranking.save()
+        self.assertFalse(TournamentRanking.objects.filter(tournament=self.tournament, position__isnull=False).exists())
+
+    def test_rule_keeps_positions(self):
+        """Applicare una regola aggiorna solo i flag, senza azzerare le posizioni salvate"""
+        refresh_positions(self.tournament)
+        rule = TournamentQualificationRule.objects.create(
+            from_tournament=self.tournament, to_tournament=self.tournament,
+            min_rank=4, max_rank=4, qualification_type='relegation'
+        )
+
+        self.assertEqual(rule.apply_rule(), [self.season_teams["D"]])
+
+        self.assertFalse(TournamentRanking.objects.filter(tournament=self.tournament, position__isnull=True).exists())
+        snapshot = StandingsSnapshot.objects.get(tournament=self.tournament, team=self.season_teams["D"])
+        self.assertEqual((snapshot.position, snapshot.relegated), (4, True))
+
+    def test_winner(self):
+        """Il vincitore di un torneo concluso è la squadra in prima posizione"""
+        self.tournament.status = 'completed'
+        self.tournament.save()
+
+        self.assertEqual(self.tournament.get_winner(), self.season_teams["B"])
+        self.assertFalse(TournamentRanking.objects.filter(tournament=self.tournament, position__isnull=False).exists())
@@ -0,0 +1,200 @@
+"""
+Test per gli aggiornamenti in tempo reale via WebSocket
+"""
+import asyncio
+import json
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from core.models import FantaLeague, FantaTeam, League, Match, MatchEvent, Round, Season, SeasonTeam, Team, Tournament, TournamentStructure
+from core.realtime import (Subscription, get_channel_layer, league_group, push, tournament_group,
+                           websocket_application)
+from core.services.match_simulation import simulate_round
+
+
+class TestSubscription(SimpleTestCase):
+    """Test per la coalescenza e il limite del buffer di un socket"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def test_coalesces_same_key(self):
+        """I messaggi con la stessa chiave si sostituiscono, quelli senza chiave arrivano tutti"""
+        subscription = Subscription(self.loop)
+        subscription.put({'score': 1}, key='match:1')
+        subscription.put({'event': 'goal'})
+        subscription.put({'score': 2}, key='match:1')
+        subscription.put({'event': 'goal'})
+
+        messages, overflow = subscription.drain()
+
+        self.assertEqual(messages, [{'score': 2}, {'event': 'goal'}, {'event': 'goal'}])
+        self.assertFalse(overflow)
+
+    def test_overflow_requests_resync(self):
+        """Oltre il limite il buffer viene svuotato e il client deve rileggere lo stato"""
+        subscription = Subscription(self.loop, max_pending=3)
+        for i in range(4):
+            subscription.put({'event': i})
+        subscription.put({'event': 4})
+
+        self.assertEqual(subscription.drain(), ([{'event': 4}], True))
+        self.assertEqual(subscription.drain(), ([], False))
+
+
+def connect(path, publish, headers=()):
+    """Apre un socket, pubblica con ``publish`` e restituisce i messaggi ASGI inviati al client"""
+    async def scenario():
+        sent = []
+        received = asyncio.Queue()
+        await received.put({'type': 'websocket.connect'})
+
+        async def send(message):
+            sent.append(message)
+            if message['type'] == 'websocket.send':
+                await received.put({'type': 'websocket.disconnect', 'code': 1000})
+
+        scope = {'type': 'websocket', 'path': path, 'headers': list(headers)}
+        app = asyncio.create_task(websocket_application(scope, received.get, send))
+        # Attende l'iscrizione prima di pubblicare
+        while not sent:
+            await asyncio.sleep(0)
+        publish()
+        await asyncio.wait_for(app, 5)
+        return sent
+
+    # Eseguito con async_to_sync: i controlli di accesso leggono il database nel thread del test
+    return async_to_sync(scenario)()
+
+
+class TestWebSocketApplication(SimpleTestCase):
+    """Test per l'applicazione ASGI dei socket"""
+
+    def connect(self, path, publish):
+        return connect(path, publish)
+
+    def test_pushes_coalesced_frame(self):
+        """I messaggi pubblicati prima dell'invio arrivano in un unico frame già coalescato"""
+        group = tournament_group(5)
+
+        def publish():
+            push(group, 'score', {'home_score': 1}, key='match:1')
+            push(group, 'event', {'minute': 10})
+            push(group, 'score', {'home_score': 2}, key='match:1')
+
+        sent = self.connect('/ws/tournaments/5/', publish)
+
+        self.assertEqual(sent[0]['type'], 'websocket.accept')
+        self.assertEqual(json.loads(sent[1]['text'])['messages'], [
+            {'type': 'score', 'home_score': 2},
+            {'type': 'event', 'minute': 10},
+        ])
+        self.assertEqual(get_channel_layer().subscribers(group), 0)
+
+    def test_unknown_path_is_closed(self):
+        """Un percorso senza gruppo viene chiuso senza accettare il socket"""
+        sent = self.connect('/ws/unknown/', lambda: None)
+
+        self.assertEqual(sent, [{'type': 'websocket.close', 'code': 4404}])
+
+
+class TestLeagueSocketAccess(TestCase):
+    """Test per l'accesso ai socket dell'asta di una lega"""
+
+    def setUp(self):
+        """Lega con una squadra di ``member``"""
+        self.member = User.objects.create_user(username='member', password='12345')
+        self.outsider = User.objects.create_user(username='outsider', password='12345')
+        league = League.objects.create(name="Serie A", owner=self.member)
+        season = Season.objects.create(year=2025, league=league)
+        structure = TournamentStructure.objects.create(name="Campionato")
+        tournament = Tournament.objects.create(name="Serie A 2025", structure=structure, season=season)
+        admin = User.objects.create_user(username='admin', password='12345')
+        self.league = FantaLeague.objects.create(name="Lega", admin=admin, season=season, tournament=tournament)
+        team = FantaTeam.objects.create(name="Squadra", owner=self.member, season=season)
+        self.league.teams.set([team])
+        self.path = f'/ws/leagues/{self.league.id}/'
+
+    def _session_headers(self, user):
+        self.client.force_login(user)
+        cookie = f"{settings.SESSION_COOKIE_NAME}={self.client.cookies[settings.SESSION_COOKIE_NAME].value}"
+        return [(b'cookie', cookie.encode())]
+
+    def test_anonymous_is_refused(self):
+        """Senza sessione il socket viene chiuso prima di essere accettato"""
+        self.assertEqual(connect(self.path, lambda: None), [{'type': 'websocket.close', 'code': 4403}])
+
+    def test_outsider_is_refused(self):
+        """Un utente senza squadra nella lega non riceve le offerte"""
+        sent = connect(self.path, lambda: None, self._session_headers(self.outsider))
+        self.assertEqual(sent, [{'type': 'websocket.close', 'code': 4403}])
+
+    def test_member_receives_bids(self):
+        """Una squadra della lega riceve le offerte"""
+        sent = connect(
+            self.path, lambda: push(league_group(self.league.id), 'bid', {'amount': 5}), self._session_headers(self.member)
+        )
+
+        self.assertEqual(sent[0]['type'], 'websocket.accept')
+        self.assertEqual(json.loads(sent[1]['text'])['messages'], [{'type': 'bid', 'amount': 5}])
+
+
+class TestMatchPush(TestCase):
+    """Test per l'invio di risultati ed eventi delle partite"""
+
+    def setUp(self):
+        """Torneo con una partita e un iscritto al gruppo del torneo"""
+        user = User.objects.create_user(username='testuser', password='12345')
+        league = League.objects.create(name="Serie A", owner=user)
+        season = Season.objects.create(year=2025, league=league)
+        structure = TournamentStructure.objects.create(name="Campionato")
+        self.tournament = Tournament.objects.create(name="Serie A 2025", structure=structure, season=season)
+        home = Team.objects.create(name="Team A", code="TMA", owner=user)
+        away = Team.objects.create(name="Team B", code="TMB", owner=user)
+        self.home = SeasonTeam.objects.create(team=home, season=season)
+        self.match = Match.objects.create(home_team=home, away_team=away, tournament=self.tournament)
+
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        self.subscription = Subscription(loop)
+        group = tournament_group(self.tournament.id)
+        get_channel_layer().subscribe(group, self.subscription)
+        self.addCleanup(get_channel_layer().unsubscribe, group, self.subscription)
+
+    def test_pushes_score_and_events_after_commit(self):
+        """Risultato ed eventi arrivano solo dopo il commit, con i punteggi accorpati"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.match.home_score, self.match.away_score = 1, 0
+            self.match.save()
+            MatchEvent.objects.create(match=self.match, minute=12, team=self.home, event_type='goal')
+            self.match.home_score = 2
+            self.match.save()
+            self.assertEqual(self.subscription.drain(), ([], False))
+
+        messages, _ = self.subscription.drain()
+
+        self.assertEqual([message['type'] for message in messages], ['score', 'event'])
+        self.assertEqual((messages[0]['match'], messages[0]['home_score']), (self.match.id, 2))
+        self.assertEqual((messages[1]['minute'], messages[1]['event_type']), (12, 'goal'))
+
+    def test_pushes_simulated_round(self):
+        """Le partite simulate in blocco inviano il risultato dopo il commit"""
+        round_obj = Round.objects.create(tournament=self.tournament, number=1)
+        Match.objects.filter(pk=self.match.pk).update(round=round_obj)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            simulated = simulate_round(round_obj, seed=1)
+            self.assertEqual(self.subscription.drain(), ([], False))
+
+        messages, _ = self.subscription.drain()
+
+        self.assertEqual([message['type'] for message in messages], ['score'])
+        self.assertEqual(messages[0]['match'], self.match.id)
+        self.assertTrue(messages[0]['played'])
+        self.assertEqual(
+            (messages[0]['home_score'], messages[0]['away_score']), (simulated[0].home_score, simulated[0].away_score)
+        )
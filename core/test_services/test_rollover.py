@@ -0,0 +1,103 @@
+"""
+Test per il passaggio alla stagione successiva
+"""
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.models import (League, Match, Season, SeasonTeam, StandingsSnapshot, Team, Tournament,
+                         TournamentQualificationRule, TournamentRanking, TournamentStructure)
+from core.services.bracket import create_knockout
+from core.services.rollover import rollover_season
+
+
+class TestSeasonRollover(TestCase):
+    """Test per promozioni, retrocessioni, playoff e qualificazioni tra stagioni"""
+
+    def setUp(self):
+        """Serie A e Serie B a quattro squadre, playoff di Serie B e una coppa con squadre dei due campionati"""
+        user = User.objects.create_user(username='testuser', password='12345')
+        league = League.objects.create(name="Campionato Italiano", owner=user)
+        self.season = Season.objects.create(year=2025, league=league)
+        structure = TournamentStructure.objects.create(name="Campionato", legs=1)
+        cup_structure = TournamentStructure.objects.create(name="Coppa", is_cup=True, legs=1, allow_draws=False)
+
+        self.serie_a = Tournament.objects.create(name="Serie A", structure=structure, season=self.season)
+        self.serie_b = Tournament.objects.create(name="Serie B", structure=structure, season=self.season)
+        self.cup = Tournament.objects.create(name="Supercoppa", structure=cup_structure, season=self.season)
+        self.playoff = Tournament.objects.create(
+            name="Serie B Playoff", structure=cup_structure, season=self.season, parent_tournament=self.serie_b
+        )
+
+        self.teams = {}
+        for tournament, prefix in ((self.serie_a, "A"), (self.serie_b, "B")):
+            season_teams = []
+            for i in range(1, 5):
+                team = Team.objects.create(name=f"Team {prefix}{i}", code=f"T{prefix}{i}", owner=user)
+                season_team = SeasonTeam.objects.create(team=team, season=self.season)
+                # La squadra i chiude in posizione i
+                TournamentRanking.objects.create(tournament=tournament, team=season_team, points=20 - i)
+                self.teams[f"{prefix}{i}"] = season_team
+                season_teams.append(season_team)
+            tournament.teams.set(season_teams)
+
+        # La coppa della stagione che si chiude è giocata da squadre dei due campionati;
+        # i tornei sono ordinati per nome, quindi viene letta dopo i campionati
+        self.cup.teams.set([self.teams["A1"], self.teams["A3"], self.teams["B2"]])
+
+        # Playoff tra seconda e terza di Serie B: vince la terza
+        playoff_teams = [self.teams["B2"], self.teams["B3"]]
+        self.playoff.teams.set(playoff_teams)
+        for season_team in playoff_teams:
+            TournamentRanking.objects.create(tournament=self.playoff, team=season_team)
+        create_knockout(self.playoff, playoff_teams, draw=False)
+        match = Match.objects.get(tournament=self.playoff)
+        match.home_score, match.away_score, match.played = 0, 1, True
+        match.save()
+
+        rules = [
+            (self.serie_a, self.serie_b, 4, 4, 'relegation', 0),
+            (self.serie_b, self.serie_a, 1, 1, 'promotion', 0),
+            (self.serie_b, self.playoff, 2, 3, 'playoff', 0),
+            (self.playoff, self.serie_a, 1, 1, 'promotion', 0),
+            (self.serie_a, self.cup, 1, 2, 'qualification', 1),
+        ]
+        for from_tournament, to_tournament, min_rank, max_rank, qualification_type, offset in rules:
+            TournamentQualificationRule.objects.create(
+                from_tournament=from_tournament, to_tournament=to_tournament, min_rank=min_rank, max_rank=max_rank,
+                qualification_type=qualification_type, season_offset=offset
+            )
+
+    def _members(self, tournament):
+        return sorted(tournament.teams.values_list('team__code', flat=True))
+
+    def test_rollover(self):
+        """La nuova stagione applica retrocessione, promozione diretta, playoff e qualificazione"""
+        new_season, tournaments = rollover_season(self.season)
+
+        self.assertEqual(new_season.year, 2026)
+        self.season.refresh_from_db()
+        self.assertFalse(self.season.is_active)
+        self.assertEqual(set(t.name for t in tournaments.values()), {"Serie A", "Serie B", "Supercoppa"})
+
+        serie_a, serie_b, cup = tournaments[self.serie_a.id], tournaments[self.serie_b.id], tournaments[self.cup.id]
+        self.assertEqual(self._members(serie_a), ["TA1", "TA2", "TA3", "TB1", "TB3"])
+        self.assertEqual(self._members(serie_b), ["TA4", "TB2", "TB4"])
+        self.assertEqual(self._members(cup), ["TA1", "TA2"])
+
+        self.assertEqual(SeasonTeam.objects.filter(season=new_season).count(), 8)
+        self.assertEqual(TournamentRanking.objects.filter(tournament__season=new_season).count(), 10)
+        self.assertEqual(TournamentQualificationRule.objects.filter(from_tournament__season=new_season).count(), 3)
+
+        relegated = TournamentRanking.objects.get(tournament=self.serie_a, team=self.teams["A4"])
+        self.assertTrue(relegated.relegated)
+
+        # Posizioni e classifica materializzata della stagione chiusa restano salvate
+        self.assertEqual(relegated.position, 4)
+        self.assertFalse(TournamentRanking.objects.filter(tournament__season=self.season, position__isnull=True).exists())
+        self.assertTrue(StandingsSnapshot.objects.get(tournament=self.serie_a, team=self.teams["A4"]).relegated)
+
+    def test_command(self):
+        """Il comando crea la stagione con l'anno indicato"""
+        call_command('rollover_season', self.season.id, year=2030, stdout=open('/dev/null', 'w'))
+        self.assertTrue(Season.objects.filter(league=self.season.league, year=2030).exists())
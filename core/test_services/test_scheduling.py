@@ -0,0 +1,58 @@
+"""
+Test per la generazione del calendario all'italiana
+"""
+from datetime import date, timedelta
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from core.services.scheduling import kickoff_times, round_robin_rounds
+
+
+class TestRoundRobin(SimpleTestCase):
+    """Test per il calendario con il metodo del cerchio"""
+
+    def test_valid_calendar(self):
+        """Ogni squadra gioca al più una volta per giornata e incontra tutte le altre una volta"""
+        for n in range(2, 13):
+            teams = list(range(n))
+            rounds = round_robin_rounds(teams, seed=1)
+            self.assertEqual(len(rounds), n - 1 if n % 2 == 0 else n)
+
+            pairs = set()
+            for fixtures in rounds:
+                playing = [team for match in fixtures for team in match]
+                self.assertEqual(len(playing), len(set(playing)))
+                self.assertEqual(len(fixtures), n // 2)
+                pairs.update(frozenset(match) for match in fixtures)
+            self.assertEqual(len(pairs), n * (n - 1) // 2)
+
+    def test_home_away_balance(self):
+        """Nel girone di andata le gare consecutive nello stesso campo sono il minimo possibile (n - 2)"""
+        teams = list(range(20))
+        venues = {team: [] for team in teams}
+        for fixtures in round_robin_rounds(teams, seed=3):
+            for home, away in fixtures:
+                venues[home].append('H')
+                venues[away].append('A')
+
+        breaks = sum(v[i] == v[i - 1] for v in venues.values() for i in range(1, len(v)))
+        self.assertEqual(breaks, len(teams) - 2)
+
+    def test_mirrored_second_leg(self):
+        """Il ritorno ripete l'andata a campi invertiti"""
+        rounds = round_robin_rounds(list(range(7)), legs=2, seed=5)
+        first, second = rounds[:7], rounds[7:]
+        self.assertEqual(second, [[(away, home) for home, away in fixtures] for fixtures in first])
+
+    def test_seed_is_deterministic(self):
+        """Con lo stesso seme il calendario è identico"""
+        teams = list(range(10))
+        self.assertEqual(round_robin_rounds(teams, seed=42), round_robin_rounds(teams, seed=42))
+
+    def test_kickoff_times(self):
+        """Una giornata a settimana alle 15:00, con orari aware"""
+        kickoffs = kickoff_times(date(2025, 8, 24), 3)
+        self.assertTrue(all(timezone.is_aware(kickoff) for kickoff in kickoffs))
+        self.assertEqual(timezone.localtime(kickoffs[0]).hour, 15)
+        self.assertEqual(kickoffs[2] - kickoffs[0], timedelta(days=14))
@@ -0,0 +1,88 @@
+"""
+Test per il simulatore Monte Carlo delle stagioni
+"""
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from core.models import (League, Match, Round, Season, SeasonTeam, Team, Tournament,
+                         TournamentQualificationRule, TournamentStructure)
+from core.services.ranking import order_rankings
+from core.services.season_simulation import simulate_season_outcomes
+from core.test_services.test_ranking import RankingTestCase
+
+
+class TestSeasonSimulation(TestCase):
+    """Test per le probabilità di piazzamento e qualificazione"""
+
+    def setUp(self):
+        """Prepara un campionato a 4 squadre con metà partite giocate"""
+        user = User.objects.create_user(username='testuser', password='12345')
+        league = League.objects.create(name="Serie A", owner=user)
+        season = Season.objects.create(year=2025, league=league)
+        structure = TournamentStructure.objects.create(name="Campionato", legs=1)
+        self.tournament = Tournament.objects.create(name="Serie A 2025", structure=structure, season=season)
+        self.teams = [Team.objects.create(name=f"Team {i}", code=f"TM{i}", owner=user) for i in range(1, 5)]
+        self.tournament.teams.set([SeasonTeam.objects.create(team=team, season=season) for team in self.teams])
+
+        round_obj = Round.objects.create(tournament=self.tournament, number=1)
+        fixtures = [(0, 1, 5, 0), (2, 3, 4, 0), (0, 2, None, None), (1, 3, None, None)]
+        for home, away, hs, as_ in fixtures:
+            Match.objects.create(
+                home_team=self.teams[home], away_team=self.teams[away], tournament=self.tournament,
+                round=round_obj, home_score=hs, away_score=as_, played=hs is not None
+            )
+
+        self.relegation = TournamentQualificationRule.objects.create(
+            from_tournament=self.tournament, to_tournament=self.tournament,
+            min_rank=4, max_rank=4, qualification_type='relegation'
+        )
+
+    def test_probabilities_are_consistent(self):
+        """Ogni squadra ha probabilità totale 1 e ogni posizione è occupata da una sola squadra"""
+        result = simulate_season_outcomes(self.tournament, iterations=2000, workers=1, seed=7)
+
+        self.assertEqual(result['iterations'], 2000)
+        self.assertEqual(len(result['teams']), 4)
+        for row in result['teams']:
+            self.assertAlmostEqual(sum(row['positions']), 1.0)
+        for position in range(4):
+            self.assertAlmostEqual(sum(row['positions'][position] for row in result['teams']), 1.0)
+
+        by_team = {row['team'].team_id: row for row in result['teams']}
+        # Chi ha vinto 5-0 non può retrocedere, chi ha perso 5-0 non può vincere
+        self.assertEqual(by_team[self.teams[0].id]['qualification'][0]['probability'], 0.0)
+        self.assertEqual(by_team[self.teams[1].id]['positions'][0], 0.0)
+
+    def test_parallel_workers_are_reproducible(self):
+        """Con lo stesso seme e gli stessi worker il risultato non cambia"""
+        first = simulate_season_outcomes(self.tournament, iterations=1000, workers=2, seed=3)
+        second = simulate_season_outcomes(self.tournament, iterations=1000, workers=2, seed=3)
+
+        self.assertEqual(
+            [row['positions'] for row in first['teams']],
+            [row['positions'] for row in second['teams']],
+        )
+
+
+class TestSeasonSimulationTiebreakers(RankingTestCase):
+    """Test per i criteri di spareggio usati dal simulatore"""
+
+    def _simulated_order(self):
+        result = simulate_season_outcomes(self.tournament, iterations=50, workers=1, seed=1)
+        by_code = {row['team'].team.code: row['positions'] for row in result['teams']}
+        return sorted(by_code, key=lambda code: by_code[code].index(1.0))
+
+    def test_goal_difference_without_head_to_head(self):
+        """Senza scontri diretti la simulazione ordina come la classifica: B precede A"""
+        expected = [ranking.team.team.code for ranking in order_rankings(self.tournament)]
+        self.assertEqual(expected, ["B", "A", "C", "D"])
+        self.assertEqual(self._simulated_order(), expected)
+
+    def test_head_to_head_first(self):
+        """Con gli scontri diretti attivi la simulazione mette A davanti a B"""
+        self.structure.tiebreaker_head_to_head = 'all'
+        self.structure.save()
+
+        expected = [ranking.team.team.code for ranking in order_rankings(self.tournament)]
+        self.assertEqual(expected, ["A", "B", "C", "D"])
+        self.assertEqual(self._simulated_order(), expected)
@@ -0,0 +1,125 @@
+"""
+Test per la risoluzione dell'asta silenziosa
+"""
+from datetime import date, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from core.models import (AuctionBid, FantaLeague, FantaTeam, FantaTeamPlayer, League, MarketTransaction, Person,
+                         Player, Season, Tournament, TournamentStructure)
+from core.services.silent_auction import clear_bids, resolve_silent_auction
+
+QUOTAS = {'P': 1, 'A': 2}
+
+
+class TestClearBids(SimpleTestCase):
+    """Test per l'assegnazione in un solo passaggio"""
+
+    def test_cascades_budget_constraints(self):
+        """Chi vince troppo perde le offerte successive, che passano al secondo miglior offerente"""
+        now = timezone.now()
+        bids = [
+            (15, now, 1, 'A', 'x', 'A'),
+            (14, now, 2, 'A', 'y', 'A'),
+            (10, now, 3, 'B', 'y', 'A'),
+            (5, now, 4, 'B', 'x', 'A'),
+        ]
+
+        winners = clear_bids(bids, {'A': 20, 'B': 20}, {}, QUOTAS)
+
+        self.assertEqual(winners, [(1, 'A', 'x', 15), (3, 'B', 'y', 10)])
+
+    def test_ties_and_quotas(self):
+        """A parità vince l'offerta più vecchia; oltre i posti del ruolo l'offerta è scartata"""
+        now = timezone.now()
+        bids = [
+            (5, now + timedelta(seconds=1), 1, 'A', 'p1', 'P'),
+            (5, now, 2, 'B', 'p1', 'P'),
+            (4, now, 3, 'B', 'p2', 'P'),
+            (3, now, 4, 'A', 'p2', 'P'),
+        ]
+
+        winners = clear_bids(bids, {'A': 20, 'B': 20}, {}, QUOTAS)
+
+        self.assertEqual(winners, [(2, 'B', 'p1', 5), (4, 'A', 'p2', 3)])
+
+
+class TestResolveSilentAuction(TestCase):
+    """Test per la chiusura di un'asta silenziosa sul database"""
+
+    def setUp(self):
+        """Lega silenziosa con due squadre da 20 crediti e tre attaccanti"""
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        league = League.objects.create(name="Serie A", owner=self.user)
+        season = Season.objects.create(year=2025, league=league)
+        structure = TournamentStructure.objects.create(name="Campionato")
+        tournament = Tournament.objects.create(name="Serie A 2025", structure=structure, season=season)
+        self.league = FantaLeague.objects.create(
+            name="Lega", admin=self.user, season=season, tournament=tournament, auction_type='silent'
+        )
+        self.team_a = FantaTeam.objects.create(name="Squadra A", owner=self.user, season=season, budget=20)
+        self.team_b = FantaTeam.objects.create(name="Squadra B", owner=self.user, season=season, budget=20)
+        self.league.teams.set([self.team_a, self.team_b])
+        self.players = []
+        for i in range(3):
+            person = Person.objects.create(name=f"Giocatore {i}", surname=f"S{i}", birth_date=date(1995, 1, 1))
+            self.players.append(Player.objects.create(person=person, main_role='PC'))
+
+    def bid(self, team, player, amount):
+        return AuctionBid.objects.create(league=self.league, team=team, player=player, amount=amount)
+
+    def test_persists_winners_in_bulk(self):
+        """Acquisti, rose, budget e offerte vincenti vengono scritti alla chiusura"""
+        first, second, third = self.players
+        self.bid(self.team_a, first, 12)
+        self.bid(self.team_b, first, 8)
+        winning = self.bid(self.team_b, second, 6)
+        self.bid(self.team_a, second, 9)
+        FantaTeamPlayer.objects.create(fanta_team=self.team_b, player=third, purchase_price=1)
+        self.bid(self.team_a, third, 15)
+
+        report = resolve_silent_auction(self.league, quotas=QUOTAS)
+
+        # Dopo 12 crediti la Squadra A deve tenerne uno per l'ultimo posto: può offrire al massimo 7
+        self.assertEqual(report['assigned'], {first.id: (self.team_a.id, 12), second.id: (self.team_b.id, 6)})
+        self.assertEqual(report['unassigned'], [])
+        self.team_a.refresh_from_db()
+        self.team_b.refresh_from_db()
+        self.assertEqual((self.team_a.budget, self.team_b.budget), (8, 14))
+        self.assertEqual(FantaTeamPlayer.objects.filter(is_active=True).count(), 3)
+        self.assertEqual(MarketTransaction.objects.filter(status='completed').count(), 2)
+        winning.refresh_from_db()
+        self.assertTrue(winning.is_winning)
+        self.assertEqual(AuctionBid.objects.filter(is_winning=True).count(), 2)
+
+    def test_reopened_window_keeps_previous_winners(self):
+        """Rieseguire l'asta sulla stessa finestra non cancella le offerte vincenti già registrate"""
+        first, second, _ = self.players
+        won = self.bid(self.team_a, first, 5)
+        resolve_silent_auction(self.league, quotas=QUOTAS)
+
+        self.bid(self.team_b, second, 4)
+        report = resolve_silent_auction(self.league, quotas=QUOTAS)
+
+        self.assertEqual(report['assigned'], {second.id: (self.team_b.id, 4)})
+        won.refresh_from_db()
+        self.assertTrue(won.is_winning)
+        self.assertEqual(AuctionBid.objects.filter(is_winning=True).count(), 2)
+
+    def test_command(self):
+        """Il comando chiude l'asta della lega indicata e rifiuta le aste non silenziose"""
+        # Con la rosa completa da 25 giocatori servono almeno 24 crediti oltre all'offerta
+        FantaTeam.objects.filter(pk=self.team_a.pk).update(budget=100)
+        self.bid(self.team_a, self.players[0], 5)
+
+        call_command('resolve_auction', self.league.id, stdout=StringIO())
+        self.assertTrue(FantaTeamPlayer.objects.filter(fanta_team=self.team_a, player=self.players[0]).exists())
+
+        self.league.auction_type = 'live'
+        self.league.save()
+        with self.assertRaises(CommandError):
+            call_command('resolve_auction', self.league.id)
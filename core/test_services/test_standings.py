@@ -0,0 +1,139 @@
+"""
+Test per l'aggiornamento incrementale delle classifiche
+"""
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from core.models import (League, Match, Round, Season, SeasonTeam, Team, Tournament,
+                         TournamentRanking, TournamentRule, TournamentStructure)
+from core.services.standings import get_tournament_standings, rebuild_tournament_rankings
+
+STAT_FIELDS = ('matches_played', 'win', 'draw', 'loss', 'goals_for', 'goals_against', 'points')
+
+
+class TestIncrementalStandings(TestCase):
+    """Test per l'applicazione delle sole variazioni di risultato"""
+
+    def setUp(self):
+        """Prepara un campionato a 4 squadre con le classifiche iniziali"""
+        user = User.objects.create_user(username='testuser', password='12345')
+        league = League.objects.create(name="Serie A", owner=user)
+        season = Season.objects.create(year=2025, league=league)
+        structure = TournamentStructure.objects.create(name="Campionato", legs=1)
+        self.tournament = Tournament.objects.create(name="Serie A 2025", structure=structure, season=season)
+        self.teams = [Team.objects.create(name=f"Team {i}", code=f"TM{i}", owner=user) for i in range(1, 5)]
+        self.season_teams = [SeasonTeam.objects.create(team=team, season=season) for team in self.teams]
+        self.tournament.teams.set(self.season_teams)
+        for season_team in self.season_teams:
+            TournamentRanking.objects.create(tournament=self.tournament, team=season_team)
+        self.round = Round.objects.create(tournament=self.tournament, number=1)
+
+    def _stats(self):
+        rankings = TournamentRanking.objects.filter(tournament=self.tournament).order_by('team_id')
+        return [tuple(getattr(r, field) for field in STAT_FIELDS) for r in rankings]
+
+    def _ranking(self, index):
+        return TournamentRanking.objects.get(tournament=self.tournament, team=self.season_teams[index])
+
+    def test_result_updates_only_affected_rankings(self):
+        """Una partita giocata aggiorna le due squadre coinvolte"""
+        match = Match.objects.create(home_team=self.teams[0], away_team=self.teams[1], tournament=self.tournament, round=self.round)
+        self.assertEqual(self._ranking(0).matches_played, 0)
+
+        match.home_score, match.away_score, match.played = 2, 1, True
+        match.save()
+
+        home, away = self._ranking(0), self._ranking(1)
+        self.assertEqual((home.win, home.goals_for, home.goals_against, home.points), (1, 2, 1, 3))
+        self.assertEqual((away.loss, away.goals_for, away.goals_against, away.points), (1, 1, 2, 0))
+        self.assertEqual(self._ranking(2).matches_played, 0)
+
+    def test_score_correction_applies_delta(self):
+        """Correggere un risultato sostituisce il contributo precedente"""
+        match = Match.objects.create(
+            home_team=self.teams[0], away_team=self.teams[1], tournament=self.tournament,
+            round=self.round, home_score=2, away_score=1, played=True
+        )
+        match = Match.objects.get(pk=match.pk)
+        match.away_score = 2
+        match.save()
+
+        home, away = self._ranking(0), self._ranking(1)
+        self.assertEqual((home.matches_played, home.win, home.draw, home.points), (1, 0, 1, 1))
+        self.assertEqual((away.matches_played, away.loss, away.draw, away.points), (1, 0, 1, 1))
+
+        match.delete()
+        self.assertEqual(self._ranking(0).matches_played, 0)
+        self.assertEqual(self._ranking(0).points, 0)
+
+    def test_deferred_instance_is_not_counted_twice(self):
+        """Salvare una partita letta con only() o defer() non ne somma di nuovo il risultato"""
+        match = Match.objects.create(
+            home_team=self.teams[0], away_team=self.teams[1], tournament=self.tournament,
+            round=self.round, home_score=2, away_score=1, played=True
+        )
+
+        partial = Match.objects.only('id', 'home_score').get(pk=match.pk)
+        partial.save()
+        deferred = Match.objects.defer('away_score').get(pk=match.pk)
+        deferred.referee = "Rossi"
+        deferred.save(update_fields=['referee'])
+
+        home = self._ranking(0)
+        self.assertEqual((home.matches_played, home.win, home.points), (1, 1, 3))
+
+        partial = Match.objects.only('id', 'home_score').get(pk=match.pk)
+        partial.home_score = 1
+        partial.save()
+        partial.delete()
+        self.assertEqual((self._ranking(0).matches_played, self._ranking(1).matches_played), (0, 0))
+
+    def test_incremental_matches_full_rebuild(self):
+        """Il risultato incrementale coincide con il ricalcolo completo"""
+        results = [(0, 1, 3, 0), (2, 3, 1, 1), (0, 2, 0, 2), (1, 3, 4, 2)]
+        for home, away, hs, as_ in results:
+            Match.objects.create(
+                home_team=self.teams[home], away_team=self.teams[away], tournament=self.tournament,
+                round=self.round, home_score=hs, away_score=as_, played=True
+            )
+        incremental = self._stats()
+
+        TournamentRanking.objects.filter(tournament=self.tournament).update(win=0, draw=0, loss=0, points=0, matches_played=0)
+        rebuild_tournament_rankings(self.tournament)
+        self.assertEqual(incremental, self._stats())
+
+        # Anche il ricalcolo per singola squadra produce gli stessi valori
+        for ranking in TournamentRanking.objects.filter(tournament=self.tournament):
+            ranking.update_match_stats()
+        self.assertEqual(incremental, self._stats())
+
+
+class TestTournamentStandings(TestCase):
+    """Test per il calcolo della classifica con un numero fisso di query"""
+
+    def setUp(self):
+        user = User.objects.create_user(username='testuser', password='12345')
+        league = League.objects.create(name="Serie A", owner=user)
+        season = Season.objects.create(year=2025, league=league)
+        structure = TournamentStructure.objects.create(name="Campionato", legs=2)
+        self.tournament = Tournament.objects.create(name="Serie A 2025", structure=structure, season=season)
+        self.teams = [Team.objects.create(name=f"Team {i}", code=f"TM{i}", owner=user) for i in range(1, 4)]
+        self.season_teams = [SeasonTeam.objects.create(team=team, season=season) for team in self.teams]
+        self.tournament.teams.set(self.season_teams)
+        for rule_type, value in [('point_win', 3), ('point_draw', 1), ('point_loss', 0)]:
+            TournamentRule.objects.create(tournament=self.tournament, rule_type=rule_type, value=value)
+
+    def test_standings_query_count(self):
+        """Il numero di query non cresce con il numero di partite"""
+        results = [(0, 1, 2, 0), (1, 2, 1, 1), (2, 0, 0, 1), (1, 0, 3, 3), (2, 1, 0, 2), (0, 2, 1, 0)]
+        for home, away, hs, as_ in results:
+            Match.objects.create(
+                home_team=self.teams[home], away_team=self.teams[away], tournament=self.tournament,
+                home_score=hs, away_score=as_, played=True
+            )
+
+        with self.assertNumQueries(3):
+            standings = get_tournament_standings(self.tournament)
+
+        self.assertEqual([team for team, _ in standings], [self.season_teams[0], self.season_teams[1], self.season_teams[2]])
+        self.assertEqual(standings[0][1], {'points': 10, 'goals_for': 7, 'goals_against': 3})
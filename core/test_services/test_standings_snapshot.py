@@ -0,0 +1,95 @@
+"""
+Test per la classifica materializzata e le sue API
+"""
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import (League, Match, Season, SeasonTeam, StandingsSnapshot, Team, Tournament, TournamentRanking,
+                         TournamentStructure)
+
+
+class TestStandingsApi(TestCase):
+    """Test per /api/tournament/{id}/standings/ e /standings/{group}/"""
+
+    def setUp(self):
+        """Due gironi da due squadre: A1-A2 e B1-B2"""
+        cache.clear()
+        self.client = APIClient()
+        user = User.objects.create_user(username='testuser', password='12345')
+        league = League.objects.create(name="Serie A", owner=user)
+        season = Season.objects.create(year=2025, league=league)
+        structure = TournamentStructure.objects.create(name="Gironi", legs=1)
+        self.tournament = Tournament.objects.create(name="Coppa 2025", structure=structure, season=season)
+
+        self.teams = {}
+        for code in ("A1", "A2", "B1", "B2"):
+            team = Team.objects.create(name=f"Team {code}", code=code, owner=user)
+            season_team = SeasonTeam.objects.create(team=team, season=season)
+            TournamentRanking.objects.create(tournament=self.tournament, team=season_team, group=code[0])
+            self.teams[code] = team
+        self.kickoff = timezone.now()
+
+    def _play(self, home, away, home_score, away_score, days=0):
+        match = Match.objects.create(
+            tournament=self.tournament, home_team=self.teams[home], away_team=self.teams[away],
+            kickoff_datetime=self.kickoff + timedelta(days=days)
+        )
+        match.home_score, match.away_score, match.played = home_score, away_score, True
+        match.save()
+
+    def test_standings_rows(self):
+        """Le righe sono ordinate per girone e posizione, con forma e differenza reti"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._play("A1", "A2", 1, 2, days=0)
+            self._play("A2", "A1", 0, 0, days=7)
+            self._play("B1", "B2", 3, 0)
+
+        response = self.client.get(f'/api/tournament/{self.tournament.id}/standings/')
+        self.assertEqual(response.status_code, 200)
+        rows = [(row['group'], row['position'], row['team_code']) for row in response.data]
+        self.assertEqual(rows, [("A", 1, "A2"), ("A", 2, "A1"), ("B", 1, "B1"), ("B", 2, "B2")])
+
+        leader = response.data[0]
+        self.assertEqual((leader['points'], leader['goal_difference'], leader['form']), (4, 1, "VN"))
+        self.assertEqual(response.data[1]['form'], "PN")
+        self.assertEqual(StandingsSnapshot.objects.filter(tournament=self.tournament).count(), 4)
+        self.assertFalse(TournamentRanking.objects.filter(tournament=self.tournament, position__isnull=True).exists())
+
+    def test_read_does_not_write(self):
+        """Con le posizioni azzerate la lettura calcola le righe in memoria senza scrivere"""
+        self._play("B1", "B2", 0, 1)
+        self.assertFalse(StandingsSnapshot.objects.filter(tournament=self.tournament).exists())
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/tournament/{self.tournament.id}/standings/B/')
+        self.assertEqual([row['team_code'] for row in response.data], ["B2", "B1"])
+        self.assertEqual(response.data[0]['form'], "V")
+        self.assertFalse([query for query in queries if not query['sql'].lstrip().upper().startswith('SELECT')])
+        self.assertFalse(StandingsSnapshot.objects.filter(tournament=self.tournament).exists())
+
+    def test_group_standings(self):
+        """La classifica di un girone contiene solo le sue squadre"""
+        response = self.client.get(f'/api/tournament/{self.tournament.id}/standings/B/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['team_code'] for row in response.data], ["B1", "B2"])
+        self.assertEqual(self.client.get(f'/api/tournament/{self.tournament.id}/standings/Z/').status_code, 404)
+
+    def test_refresh_after_result(self):
+        """Un nuovo risultato invalida la risposta in cache e aggiorna la classifica"""
+        url = f'/api/tournament/{self.tournament.id}/standings/B/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._play("B2", "B1", 2, 0)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['team_code'], "B2")
+        self.assertEqual(response.data[0]['form'], "V")
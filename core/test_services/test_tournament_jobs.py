@@ -0,0 +1,108 @@
+"""
+Test per la generazione asincrona dei tornei
+"""
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from core.models import (League, Season, Team, Tournament, TournamentQualificationRule,
+                         TournamentStructure)
+from fantacalcio_backend.celery import check_shared_cache
+
+
+class TestTournamentGenerationJob(TestCase):
+    """Test per l'API di generazione dei tornei (broker in memoria, esecuzione eager)"""
+
+    def setUp(self):
+        """Prepara stagione, struttura e squadre"""
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        league = League.objects.create(name="Serie A", owner=self.user)
+        self.season = Season.objects.create(year=2023, league=league)
+        self.structure = TournamentStructure.objects.create(name="Serie A", is_cup=False, format='league', legs=2)
+        self.teams = [
+            Team.objects.create(name=f"Team {i}", code=f"TM{i}", owner=self.user)
+            for i in range(1, 9)
+        ]
+        self.client = APIClient()
+
+    def _generate(self, **extra):
+        data = {
+            'structure': self.structure.id,
+            'season': self.season.id,
+            'name': "Serie A 2023",
+            'teams': [team.id for team in self.teams],
+            'seed': 1,
+        }
+        data.update(extra)
+        return self.client.post('/api/tournament/generate/', data, format='json')
+
+    def test_generate_league(self):
+        """Il job crea il torneo e il suo stato è consultabile"""
+        response = self._generate()
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data['job_id']
+
+        response = self.client.get(f'/api/tournament/generate/{job_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'completed')
+        self.assertEqual(response.data['progress'], 100)
+
+        tournament = Tournament.objects.get(pk=response.data['tournament_id'])
+        self.assertEqual(tournament.status, 'active')
+        self.assertEqual(tournament.matches.count(), 8 * 7)
+
+    def test_generate_with_playoff(self):
+        """Con promozione e playoff il job genera anche il torneo playoff"""
+        TournamentStructure.objects.create(name="Playoff", is_cup=True, has_playoff=False, legs=1, allow_draws=False)
+        self.structure.has_playoff = True
+        self.structure.relegation_enabled = True
+        self.structure.save()
+
+        serie_b = Tournament.objects.create(name="Serie B 2023", structure=self.structure, season=self.season)
+        previous = Tournament.objects.create(name="Serie A 2022", structure=self.structure, season=self.season)
+        direct_rule = TournamentQualificationRule.objects.create(
+            from_tournament=previous, to_tournament=serie_b, min_rank=1, max_rank=1, qualification_type='promotion'
+        )
+        playoff_rule = TournamentQualificationRule.objects.create(
+            from_tournament=previous, to_tournament=serie_b, min_rank=2, max_rank=5, qualification_type='playoff'
+        )
+
+        response = self._generate(other_tournament=serie_b.id, direct_rule=direct_rule.id, playoff_rule=playoff_rule.id)
+        self.assertEqual(response.data['status'], 'completed')
+
+        tournament = Tournament.objects.get(pk=response.data['tournament_id'])
+        playoff = Tournament.objects.get(parent_tournament=tournament)
+        self.assertEqual(playoff.teams.count(), 4)
+        self.assertIsNotNone(playoff.bracket)
+
+    def test_failed_generation(self):
+        """Un errore della factory viene riportato nello stato del job"""
+        self.structure.has_playoff = True
+        self.structure.save()
+
+        response = self._generate()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'failed')
+        self.assertIn("playoff", response.data['error'])
+        self.assertFalse(Tournament.objects.filter(name="Serie A 2023").exists())
+
+    def test_invalid_request(self):
+        """Parametri non validi e job inesistenti"""
+        self.assertEqual(self._generate(teams=[self.teams[0].id]).status_code, 400)
+        self.assertEqual(self.client.get('/api/tournament/generate/unknown/').status_code, 404)
+
+
+class TestWorkerStartup(SimpleTestCase):
+    """Test per il controllo della cache all'avvio di un worker Celery"""
+
+    @override_settings(REDIS_URL=None)
+    def test_worker_requires_shared_cache(self):
+        """Senza REDIS_URL il worker non parte, mentre le impostazioni restano caricabili"""
+        with self.assertRaises(ImproperlyConfigured):
+            check_shared_cache()
+
+    @override_settings(REDIS_URL='redis://localhost:6379/1')
+    def test_worker_with_shared_cache(self):
+        """Con REDIS_URL il worker parte"""
+        check_shared_cache()
@@ -1,7 +1,9 @@
 """
 Test per la factory di creazione dei tornei
 """
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from core.factories.tournament_factory import TournamentFactory
@@ -220,3 +222,22 @@ class TestTournamentFactory(TestCase):
         # Verifica che il torneo è stato creato correttamente
         self.assertEqual(serie_a_2024.teams.count(), len(teams_a))
         self.assertEqual(serie_a_2024.status, 'active')
+
+    def test_create_league_with_few_queries(self):
+        """Verifica che la generazione di un campionato non esegua una query per partita"""
+        league = League.objects.create(name="Serie A", owner=self.user)
+        season = Season.objects.create(year=2023, league=league)
+        structure = TournamentStructure.objects.create(name="Serie A", is_cup=False, format='league', legs=2)
+        teams = [
+            Team.objects.create(name=f"Team {i}", code=f"TM{i}", owner=self.user)
+            for i in range(1, 21)  # 20 squadre
+        ]
+
+        factory = TournamentFactory(structure=structure, season=season, name="Serie A 2023", teams=teams)
+        with CaptureQueriesContext(connection) as queries:
+            tournament = factory.create()
+
+        self.assertEqual(tournament.matches.count(), 380)
+        self.assertEqual(tournament.rounds.count(), 38)
+        self.assertEqual(SeasonTeam.objects.filter(season=season).count(), 20)
+        self.assertLess(len(queries), 30)
@@ -6,7 +6,9 @@ from rest_framework.routers import DefaultRouter
 
 from .views import (ContinentViewSet, LeagueViewSet, NationalityViewSet,
                     PlayerViewSet, RegisterView, SeasonViewSet, TeamViewSet,
-                    TournamentStructureViewSet, TournamentViewSet, TrophyViewSet, SeasonTeamViewSet)
+                    TournamentStructureViewSet, TournamentViewSet, TrophyViewSet, SeasonTeamViewSet,
+                    TournamentGenerationView, TournamentJobView, MatchViewSet,
+                    FantaScoreViewSet, MarketTransactionViewSet, LiveAuctionView)
 
 router = DefaultRouter()
 router.register(r'leagues', LeagueViewSet)
@@ -19,8 +21,15 @@ router.register(r'tournament', TournamentViewSet)
 router.register(r'trophy', TrophyViewSet)
 router.register(r'player', PlayerViewSet)
 router.register(r'season_team', SeasonTeamViewSet)
+router.register(r'match', MatchViewSet)
+router.register(r'fanta_score', FantaScoreViewSet)
+router.register(r'market_transaction', MarketTransactionViewSet)
 
 urlpatterns = [
+    # Prima del router, altrimenti 'generate' verrebbe letto come id di un torneo
+    path('tournament/generate/', TournamentGenerationView.as_view(), name='tournament-generate'),
+    path('tournament/generate/<str:job_id>/', TournamentJobView.as_view(), name='tournament-generate-status'),
+    path('fanta_league/<int:league_id>/auction/', LiveAuctionView.as_view(), name='live-auction'),
     path('', include(router.urls)),
     path('register/', RegisterView.as_view(), name='register'),
 ]
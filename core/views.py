@@ -1,21 +1,35 @@
+from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import generics, viewsets
+from rest_framework import generics, status, viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
 from rest_framework.serializers import ModelSerializer
+from rest_framework.views import APIView
 
+from core.cache import CachedResponseMixin, model_scope, standings_scope, tournament_scope
 from core.filters.player_filter import PlayerFilter
 from core.logger import get_logger
+from core.pagination import KeysetPagination
 from core.permissions import IsSuperUser
+from core.querysets import OptimizedQuerysetMixin
+from core.services.auction import AuctionUnavailable, close_live_auction, get_live_auction
+from core.services.standings_snapshot import get_standings
+from core.services.tournament_jobs import enqueue_tournament_generation, get_job
 
 from django.contrib.auth.models import User
-from .models import (Continent, League, Nationality, Player, Season, Team,
+from .models import (Continent, FantaLeague, FantaScore, League, MarketTransaction, Match,
+                     Nationality, Person, Player, Season, Team,
                      TournamentStructure, Trophy, SeasonTeam, Tournament)
-from .serializers import (ContinentSerializer, LeagueSerializer,
-                          NationalitySerializer, PlayerSerializer,
+from .serializers import (ContinentSerializer, FantaScoreSerializer,
+                          LeagueSerializer, LiveBidSerializer, MarketTransactionSerializer,
+                          MatchSerializer, NationalitySerializer,
+                          PlayerSerializer,
                           SeasonSerializer, TeamSerializer,
                           TournamentStructureSerializer, TrophySerializer,
-                          SeasonTeamSerializer, TournamentSerializer,
-                          UserSerializer)
+                          SeasonTeamSerializer, StandingsSnapshotSerializer,
+                          TournamentSerializer,
+                          TournamentGenerationSerializer, UserSerializer)
 
 logger = get_logger()
 
@@ -23,7 +37,7 @@ logger = get_logger()
 permission = AllowAny
 
 
-class LeagueViewSet(viewsets.ModelViewSet):
+class LeagueViewSet(OptimizedQuerysetMixin, viewsets.ModelViewSet):
     queryset = League.objects.all()
     serializer_class = LeagueSerializer
     permission_classes = [permission]
@@ -32,7 +46,7 @@ class LeagueViewSet(viewsets.ModelViewSet):
         serializer.save(owner=self.request.user)
 
 
-class TeamViewSet(viewsets.ModelViewSet):
+class TeamViewSet(OptimizedQuerysetMixin, viewsets.ModelViewSet):
     queryset = Team.objects.all()
     serializer_class = TeamSerializer
     permission_classes = [permission]
@@ -41,36 +55,40 @@ class TeamViewSet(viewsets.ModelViewSet):
         serializer.save(owner=self.request.user)
 
 
-class SeasonTeamViewSet(viewsets.ModelViewSet):
+class SeasonTeamViewSet(OptimizedQuerysetMixin, viewsets.ModelViewSet):
     queryset = SeasonTeam.objects.all()
     serializer_class = SeasonTeamSerializer
     permission_classes = [permission]
 
 
-class ContinentViewSet(viewsets.ModelViewSet):
+class ContinentViewSet(CachedResponseMixin, OptimizedQuerysetMixin, viewsets.ModelViewSet):
     queryset = Continent.objects.all()
     serializer_class = ContinentSerializer
     permission_classes = [permission]
 
 
-class NationalityViewSet(viewsets.ModelViewSet):
+class NationalityViewSet(CachedResponseMixin, OptimizedQuerysetMixin, viewsets.ModelViewSet):
     queryset = Nationality.objects.all()
     serializer_class = NationalitySerializer
     permission_classes = [permission]
+    cache_models = (Continent,)
 
 
-class PlayerViewSet(viewsets.ModelViewSet):
+class PlayerViewSet(CachedResponseMixin, OptimizedQuerysetMixin, viewsets.ModelViewSet):
     queryset = Player.objects.all()
     serializer_class = PlayerSerializer
     permission_classes = [permission]
+    cache_models = (Person, Nationality, Continent)
     filter_backends = [DjangoFilterBackend]
     filterset_class = PlayerFilter
+    pagination_class = KeysetPagination
+    cursor_ordering = 'id'
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
 
-class SeasonViewSet(viewsets.ModelViewSet):
+class SeasonViewSet(OptimizedQuerysetMixin, viewsets.ModelViewSet):
     queryset = Season.objects.all()
     serializer_class = SeasonSerializer
     permission_classes = [permission]
@@ -79,7 +97,7 @@ class SeasonViewSet(viewsets.ModelViewSet):
         serializer.save(owner=self.request.user)
 
 
-class TrophyViewSet(viewsets.ModelViewSet):
+class TrophyViewSet(OptimizedQuerysetMixin, viewsets.ModelViewSet):
     queryset = Trophy.objects.all()
     serializer_class = TrophySerializer
     permission_classes = [permission]
@@ -88,7 +106,7 @@ class TrophyViewSet(viewsets.ModelViewSet):
         serializer.save(owner=self.request.user)
 
 
-class TournamentStructureViewSet(viewsets.ModelViewSet):
+class TournamentStructureViewSet(OptimizedQuerysetMixin, viewsets.ModelViewSet):
     queryset = TournamentStructure.objects.all()
     serializer_class = TournamentStructureSerializer
     permission_classes = [permission]
@@ -97,10 +115,21 @@ class TournamentStructureViewSet(viewsets.ModelViewSet):
         serializer.save(owner=self.request.user)
 
 
-class TournamentViewSet(viewsets.ModelViewSet):
+class TournamentViewSet(CachedResponseMixin, OptimizedQuerysetMixin, viewsets.ModelViewSet):
     queryset = Tournament.objects.all()
     serializer_class = TournamentSerializer
     permission_classes = [permission]
+    cache_models = (TournamentStructure, Season, Trophy, SeasonTeam, Team, User)
+    filterset_fields = ['season', 'structure', 'status', 'is_active']
+
+    def get_cache_scopes(self):
+        # La classifica cambia con i risultati del torneo e con i nomi delle squadre
+        if self.action in ('standings', 'group_standings'):
+            return [standings_scope(self.kwargs['pk']), model_scope(Team)]
+        # Il dettaglio dipende solo dal proprio torneo, non dalle modifiche agli altri
+        if self.kwargs.get('pk') is not None:
+            return [tournament_scope(self.kwargs['pk'])] + [model_scope(model) for model in self.cache_models]
+        return super().get_cache_scopes()
 
     def perform_create(self, serializer):
         return super().perform_create(serializer)
@@ -108,6 +137,127 @@ class TournamentViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         return super().perform_update(serializer)
 
+    @action(detail=True, methods=['get'])
+    def standings(self, request, pk=None):
+        """Classifica completa del torneo, girone per girone"""
+        return self.cached_response(request, self._standings_response, pk=pk)
+
+    @action(detail=True, methods=['get'], url_path=r'standings/(?P<group>[^/.]+)')
+    def group_standings(self, request, pk=None, group=None):
+        """Classifica di un girone del torneo"""
+        return self.cached_response(request, self._standings_response, pk=pk, group=group)
+
+    def _standings_response(self, request, pk=None, group=None):
+        tournament = get_object_or_404(Tournament.objects.select_related('structure'), pk=pk)
+        rows = get_standings(tournament, group=group)
+        if group is not None and not rows:
+            return Response({'detail': "Girone non trovato"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(StandingsSnapshotSerializer(rows, many=True).data)
+
+
+class MatchViewSet(OptimizedQuerysetMixin, viewsets.ModelViewSet):
+    queryset = Match.objects.all()
+    serializer_class = MatchSerializer
+    permission_classes = [permission]
+    filterset_fields = ['tournament', 'round', 'played']
+    pagination_class = KeysetPagination
+    # Il cursore si posiziona sul primo campo, che deve essere univoco e non nullo (kickoff_datetime può essere NULL)
+    cursor_ordering = 'id'
+
+
+class FantaScoreViewSet(OptimizedQuerysetMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = FantaScore.objects.all()
+    serializer_class = FantaScoreSerializer
+    permission_classes = [permission]
+    filterset_fields = ['round', 'match', 'player']
+    pagination_class = KeysetPagination
+    cursor_ordering = 'id'
+
+
+class MarketTransactionViewSet(OptimizedQuerysetMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = MarketTransaction.objects.all()
+    serializer_class = MarketTransactionSerializer
+    permission_classes = [permission]
+    filterset_fields = ['league', 'team', 'player', 'status', 'transaction_type']
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-created_at', '-id')
+
+
+class TournamentGenerationView(APIView):
+    """Accoda la generazione di un torneo e restituisce l'id del job"""
+    permission_classes = [permission]
+
+    def post(self, request):
+        serializer = TournamentGenerationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = enqueue_tournament_generation(serializer.to_task_params())
+        return Response(job, status=status.HTTP_202_ACCEPTED)
+
+
+class TournamentJobView(APIView):
+    """Stato, avanzamento e risultato di un job di generazione"""
+    permission_classes = [permission]
+
+    def get(self, request, job_id):
+        job = get_job(job_id)
+        if job is None:
+            return Response({'detail': "Job non trovato"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(job)
+
+
+class LiveAuctionView(APIView):
+    """
+    Asta live di una lega (vedi ``core.services.auction``).
+
+    GET restituisce i giocatori all'asta e i crediti della squadra dell'utente,
+    POST registra un'offerta della squadra dell'utente, DELETE (solo
+    l'amministratore della lega) chiude l'asta aggiudicando i giocatori aperti.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def _league(self, request, league_id):
+        """Lega e id della squadra dell'utente; None se l'utente non partecipa e non la amministra"""
+        league = get_object_or_404(FantaLeague, pk=league_id)
+        team_id = league.teams.filter(owner=request.user).values_list('id', flat=True).first()
+        if team_id is None and league.admin_id != request.user.id:
+            return None, None
+        return league, team_id
+
+    def get(self, request, league_id):
+        league, team_id = self._league(request, league_id)
+        if league is None:
+            return Response({'detail': "Non partecipi a questa lega"}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            auction = get_live_auction(league)
+        except AuctionUnavailable as e:
+            return Response({'detail': str(e)}, status=status.HTTP_409_CONFLICT)
+        data = {'lots': auction.lots_state()}
+        if team_id is not None:
+            data['budget'] = auction.budget_state(team_id)
+        return Response(data)
+
+    def post(self, request, league_id):
+        league, team_id = self._league(request, league_id)
+        if team_id is None:
+            return Response({'detail': "Non hai una squadra in questa lega"}, status=status.HTTP_403_FORBIDDEN)
+        serializer = LiveBidSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            data = serializer.validated_data
+            state = get_live_auction(league).bid(team_id, data['player'], data['amount'])
+        except AuctionUnavailable as e:
+            return Response({'detail': str(e)}, status=status.HTTP_409_CONFLICT)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(state, status=status.HTTP_201_CREATED)
+
+    def delete(self, request, league_id):
+        league = get_object_or_404(FantaLeague, pk=league_id)
+        if league.admin_id != request.user.id:
+            return Response({'detail': "Solo l'amministratore può chiudere l'asta"}, status=status.HTTP_403_FORBIDDEN)
+        won = close_live_auction(league)
+        return Response({'awarded': [{'player': player, 'team': team, 'amount': amount} for player, team, amount in won]})
+
 
 class RegisterSerializer(ModelSerializer):
     class Meta:
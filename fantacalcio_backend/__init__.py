@@ -0,0 +1,4 @@
+# L'app Celery viene caricata con Django, così i task @shared_task la usano
+from .celery import app as celery_app
+
+__all__ = ('celery_app',)
@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "fantacalcio_backend.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Importato dopo l'inizializzazione di Django: i socket in /ws/ ricevono gli aggiornamenti in tempo reale
+from core.realtime import router  # noqa: E402
+
+application = router(django_application)
@@ -0,0 +1,30 @@
+"""
+Configurazione dell'applicazione Celery del progetto.
+
+Le impostazioni vengono lette da ``settings.py`` con il prefisso ``CELERY_``;
+i task dell'app ``core`` si trovano nel modulo ``core.task``.
+
+Un worker separato scrive lo stato dei job (``core.services.tournament_jobs``)
+nella cache di Django: all'avvio verifica che la cache sia condivisa con l'API
+(``REDIS_URL``), altrimenti quello stato non sarebbe visibile.
+"""
+import os
+
+from celery import Celery
+from celery.signals import worker_init
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "fantacalcio_backend.settings")
+
+app = Celery("fantacalcio_backend")
+app.config_from_object("django.conf:settings", namespace="CELERY")
+app.autodiscover_tasks(related_name="task")
+
+
+@worker_init.connect
+def check_shared_cache(**kwargs):
+    """Impedisce l'avvio di un worker che scriverebbe i job in una cache in memoria"""
+    from django.conf import settings
+    from django.core.exceptions import ImproperlyConfigured
+
+    if not settings.REDIS_URL:
+        raise ImproperlyConfigured("Il worker Celery richiede una cache condivisa con l'API: impostare REDIS_URL")
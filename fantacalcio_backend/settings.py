@@ -11,8 +11,10 @@ https://docs.djangoproject.com/it/5.2.3/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -145,12 +147,54 @@ REST_FRAMEWORK = {
 
     # ],
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.StandardPagination',
+    'PAGE_SIZE': 50,
+}
+
+# Cache
+# Con REDIS_URL (es. redis://localhost:6379/1) la cache è condivisa tra processi e worker Celery
+REDIS_URL = os.environ.get('REDIS_URL')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
 }
 
+# Celery
+# Senza un broker configurato i task vengono eseguiti subito nel processo che li invia (modalità eager):
+# vale solo per lo sviluppo e i test, perché ad esempio /api/tournament/generate/ genera il torneo dentro
+# la richiesta. In produzione impostare CELERY_BROKER_URL e REDIS_URL e avviare un worker
+# (celery -A fantacalcio_backend worker), che all'avvio verifica la cache condivisa
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'memory://')
+CELERY_TASK_ALWAYS_EAGER = os.environ.get(
+    'CELERY_TASK_ALWAYS_EAGER', str(CELERY_BROKER_URL == 'memory://')
+).lower() in ('1', 'true', 'yes')
+CELERY_TASK_IGNORE_RESULT = True  # stato e risultato dei job sono salvati nella cache di Django
+CELERY_TIMEZONE = TIME_ZONE
+
+# WebSocket (vedi core.realtime)
+# Il layer in memoria vale per un solo processo ASGI; con più processi serve un layer su broker condiviso
+REALTIME_CHANNEL_LAYER = os.environ.get('REALTIME_CHANNEL_LAYER', 'core.realtime.InMemoryChannelLayer')
+REALTIME_MAX_PENDING = int(os.environ.get('REALTIME_MAX_PENDING', 256))
+
+# Asta live (vedi core.services.auction): ogni asta vive in un solo processo, che aggiudica i
+# giocatori scaduti ogni LIVE_AUCTION_TICK secondi (0 disattiva il thread, es. nei test)
+LIVE_AUCTION_TICK = float(os.environ.get('LIVE_AUCTION_TICK', 1))
+
 # Logging configuration
 LOG_DIR = os.path.join(BASE_DIR, "logs")
 os.makedirs(LOG_DIR, exist_ok=True)
 
+# Durante i test il logger 'django' scrive in tests.log invece che in django.log
+# (con pytest, anche avviato come ``python -m pytest``, il modulo è già importato quando vengono lette le impostazioni)
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
+# Scrittura dei log in un thread dedicato (QueueHandler/QueueListener), vedi core.logger
+LOG_QUEUE = os.environ.get('LOG_QUEUE', 'false').lower() in ('1', 'true', 'yes')
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -215,7 +259,7 @@ LOGGING = {
 
     'loggers': {
         'django': {
-            'handlers': ['file_django'],
+            'handlers': ['file_tests' if TESTING else 'file_django'],
             'level': 'INFO',
             'propagate': True,
         },
@@ -5,6 +5,9 @@ import type { Player } from '../services/playerApi';
 
 export default function Players() {
     const [players, setPlayers] = useState<Player[]>([]);
+    // Link alla pagina successiva (cursore o numero di pagina), null se la lista è finita
+    const [next, setNext] = useState<string | null>(null);
+    const [loading, setLoading] = useState(false);
     const [error, setError] = useState<string | null>(null);
 
     const ROLE_LABELS: Record<string, string> = {
@@ -27,13 +30,38 @@ export default function Players() {
         return filters;
     }
 
+    // Con nuovi filtri si riparte dalla prima pagina
     useEffect(() => {
+        let cancelled = false;
         const filters = parseFilters(search);
+        setPlayers([]);
+        setNext(null);
+        setLoading(true);
         fetchPlayers(filters)
-            .then(setPlayers)
-            .catch(e => setError(e.message));
+            .then(page => {
+                if (cancelled) return;
+                setPlayers(page.results);
+                setNext(page.next);
+            })
+            .catch(e => !cancelled && setError(e.message))
+            .finally(() => !cancelled && setLoading(false));
+        return () => {
+            cancelled = true;
+        };
     }, [search]);
 
+    function loadMore() {
+        if (!next || loading) return;
+        setLoading(true);
+        fetchPlayers(undefined, next)
+            .then(page => {
+                setPlayers(current => [...current, ...page.results]);
+                setNext(page.next);
+            })
+            .catch(e => setError(e.message))
+            .finally(() => setLoading(false));
+    }
+
     if (error) return <div>Error: {error}</div>;
 
     return (
@@ -67,6 +95,11 @@ export default function Players() {
                     </li>
                 ))}
             </ol>
+            {next && (
+                <button onClick={loadMore} disabled={loading}>
+                    {loading ? 'Caricamento...' : 'Carica altri'}
+                </button>
+            )}
         </div>
     );
 }
@@ -5,6 +5,9 @@ import type { Tournament } from '../services/tournamentsApi';
 
 export default function Tournaments() {
     const [tournaments, setTournaments] = useState<Tournament[]>([]);
+    // Link alla pagina successiva (cursore o numero di pagina), null se la lista è finita
+    const [next, setNext] = useState<string | null>(null);
+    const [loading, setLoading] = useState(false);
     const [error, setError] = useState<string | null>(null);
 
     const { search } = useLocation();
@@ -27,13 +30,38 @@ export default function Tournaments() {
         });
     }
 
+    // Con nuovi filtri si riparte dalla prima pagina
     useEffect(() => {
+        let cancelled = false;
         const filters = parseFilters(search);
+        setTournaments([]);
+        setNext(null);
+        setLoading(true);
         fetchTournaments(filters)
-            .then(setTournaments)
-            .catch(e => setError(e.message));
+            .then(page => {
+                if (cancelled) return;
+                setTournaments(page.results);
+                setNext(page.next);
+            })
+            .catch(e => !cancelled && setError(e.message))
+            .finally(() => !cancelled && setLoading(false));
+        return () => {
+            cancelled = true;
+        };
     }, [search]);
 
+    function loadMore() {
+        if (!next || loading) return;
+        setLoading(true);
+        fetchTournaments(undefined, next)
+            .then(page => {
+                setTournaments(current => [...current, ...page.results]);
+                setNext(page.next);
+            })
+            .catch(e => setError(e.message))
+            .finally(() => setLoading(false));
+    }
+
     if (error) return <div>Error: {error}</div>;
 
     return (
@@ -200,6 +228,11 @@ export default function Tournaments() {
                     </li>
                 ))}
             </ol>
+            {next && (
+                <button onClick={loadMore} disabled={loading}>
+                    {loading ? 'Caricamento...' : 'Carica altri'}
+                </button>
+            )}
         </div>
     );
 }
@@ -1,3 +1,42 @@
+// Risposta paginata delle liste API (a pagine: count presente; a cursore: solo next/previous)
+export interface Page<T> {
+    count?: number;
+    next: string | null;
+    previous: string | null;
+    results: T[];
+}
+
+export type Filters = Record<string, string | number | undefined>;
+
+// Aggiunge i filtri non vuoti alla query string: vengono applicati dal server
+export function withFilters(url: string, filters?: Filters): string {
+    if (!filters) return url;
+    const params = new URLSearchParams();
+    for (const key in filters) {
+        const val = filters[key];
+        if (val !== undefined && val !== null && val !== '') {
+            params.append(key, String(val));
+        }
+    }
+    const query = params.toString();
+    return query ? `${url}?${query}` : url;
+}
+
+// I link next/previous sono assoluti: si tiene solo percorso e query, così passano dallo stesso proxy della prima richiesta
+function pageLink(link: string | null): string | null {
+    if (!link) return null;
+    const url = new URL(link, window.location.origin);
+    return url.pathname + url.search;
+}
+
+// Scarica una sola pagina di una lista (paginazione per numero o a cursore); la successiva si chiede con 'next'
+export async function fetchPage<T>(url: string, errorMessage: string): Promise<Page<T>> {
+    const res = await apiFetch(url);
+    if (!res.ok) throw new Error(errorMessage);
+    const data: Page<T> = await res.json();
+    return { ...data, next: pageLink(data.next), previous: pageLink(data.previous) };
+}
+
 export async function apiFetch(input: RequestInfo, init?: RequestInit) {
     const accessToken = localStorage.getItem('token');
     const refreshToken = localStorage.getItem('refresh_token');
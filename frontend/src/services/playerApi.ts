@@ -1,4 +1,5 @@
-import { apiFetch } from './api';
+import { fetchPage, withFilters } from './api';
+import type { Filters, Page } from './api';
 
 export interface Player {
     id: number;
@@ -34,24 +35,9 @@ export interface Player {
     value: number;
 }
 
-export interface PlayerFilters {
-    [key: string]: string | number | undefined;
-}
-
-export async function fetchPlayers(filters?: PlayerFilters) {
-    let url = '/api/player/';
-    if (filters) {
-        const params = new URLSearchParams();
-        for (const key in filters) {
-            const val = filters[key];
-            if (val !== undefined && val !== null && val !== '') {
-                params.append(key, String(val));
-            }
-        }
-        url += `?${params.toString()}`;
-    }
+export type PlayerFilters = Filters;
 
-    const res = await apiFetch(url);
-    if (!res.ok) throw new Error('Failed to fetch players');
-    return res.json();
+// Prima pagina dei giocatori filtrati, oppure la pagina indicata dal link 'next' di quella precedente
+export async function fetchPlayers(filters?: PlayerFilters, pageUrl?: string | null): Promise<Page<Player>> {
+    return fetchPage<Player>(pageUrl ?? withFilters('/api/player/', filters), 'Failed to fetch players');
 }
@@ -1,5 +1,6 @@
 // src/api/tournaments.ts
-import { apiFetch } from './api';
+import { fetchPage, withFilters } from './api';
+import type { Filters, Page } from './api';
 
 export interface Tournament {
     id: number;
@@ -69,24 +70,9 @@ export interface Tournament {
     updated_at: string;
 }
 
-export interface TournamentFilters {
-    [key: string]: string | number | undefined;
-}
-
-export async function fetchTournaments(filters?: TournamentFilters): Promise<Tournament[]> {
-    let url = '/api/tournament/';
-    if (filters) {
-        const params = new URLSearchParams();
-        for (const key in filters) {
-            const val = filters[key];
-            if (val !== undefined && val !== null && val !== '') {
-                params.append(key, String(val));
-            }
-        }
-        url += `?${params.toString()}`;
-    }
+export type TournamentFilters = Filters;
 
-    const res = await apiFetch(url);
-    if (!res.ok) throw new Error('Failed to fetch tournaments');
-    return res.json();
+// Prima pagina dei tornei filtrati, oppure la pagina indicata dal link 'next' di quella precedente
+export async function fetchTournaments(filters?: TournamentFilters, pageUrl?: string | null): Promise<Page<Tournament>> {
+    return fetchPage<Tournament>(pageUrl ?? withFilters('/api/tournament/', filters), 'Failed to fetch tournaments');
 }